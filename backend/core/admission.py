@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+# Limits on a single source text submitted for review
+MAX_REVIEW_BYTES = int(os.getenv("MAX_REVIEW_BYTES", str(1024 * 1024)))
+MAX_REVIEW_LINES = int(os.getenv("MAX_REVIEW_LINES", "20000"))
+# Raw request body limit for review endpoints; a diff carries two sources plus JSON overhead
+MAX_REVIEW_BODY_BYTES = int(os.getenv("MAX_REVIEW_BODY_BYTES", str(2 * MAX_REVIEW_BYTES + 64 * 1024)))
+
+# Per-user token bucket: sustained requests per minute and burst size (0 disables)
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "120"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "20"))
+# Buckets of the least recently seen users are dropped beyond this many
+RATE_LIMIT_MAX_TRACKED = 10000
+
+# Reviews analyzed concurrently per worker; more are shed with 503
+MAX_IN_FLIGHT_REVIEWS = int(os.getenv("MAX_IN_FLIGHT_REVIEWS", str(2 * (os.cpu_count() or 1))))
+SHED_RETRY_AFTER_SECONDS = int(os.getenv("SHED_RETRY_AFTER_SECONDS", "1"))
+
+def source_limit_error(code: str, max_bytes: int = MAX_REVIEW_BYTES, max_lines: int = MAX_REVIEW_LINES) -> Optional[str]:
+    """Reason a source text is too large to review, or None if it is within limits"""
+    # Characters never outnumber UTF-8 bytes, so only borderline sizes need encoding
+    size = len(code)
+    if size * 4 > max_bytes:
+        size = len(code.encode('utf-8', errors='surrogatepass'))
+    if size > max_bytes:
+        return f"Source is {size} bytes; the limit is {max_bytes}"
+
+    lines = code.count('\n') + 1
+    if lines > max_lines:
+        return f"Source has {lines} lines; the limit is {max_lines}"
+    return None
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int, now: float):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Consume one token; return 0 if admitted, else seconds until a token is available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class RateLimiter:
+    """Token buckets keyed by user, bounded to the most recently seen users"""
+    def __init__(self, per_minute: float = RATE_LIMIT_PER_MINUTE, burst: int = RATE_LIMIT_BURST,
+                 max_tracked: int = RATE_LIMIT_MAX_TRACKED):
+        self.rate = per_minute / 60
+        self.burst = max(1, burst)
+        self.max_tracked = max_tracked
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: Hashable) -> float:
+        """0 if the request is admitted, else the number of seconds to wait"""
+        if self.rate <= 0:
+            return 0.0
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > self.max_tracked:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.take(now)
+
+class InFlightLimiter:
+    """Non-blocking counter of admitted work; callers that cannot acquire are shed, not queued"""
+    def __init__(self, limit: int = MAX_IN_FLIGHT_REVIEWS):
+        self.limit = limit
+        self.in_flight = 0
+        self.shed = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.limit:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import urllib.request
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from backend.core.ai_engine import AIEngine
+from backend.core.context_extractor import ContextExtractor, ExtractedContext
+
+# Configuration
+AI_MODEL_URL = os.getenv("AI_MODEL_URL")  # e.g. http://127.0.0.1:9000/v1/analyze
+AI_MODEL_VERSION = os.getenv("AI_MODEL_VERSION", "static-v1")
+AI_MAX_BATCH_SIZE = int(os.getenv("AI_MAX_BATCH_SIZE", "16"))
+AI_BATCH_WINDOW_MS = float(os.getenv("AI_BATCH_WINDOW_MS", "10"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+AI_TIMEOUT_SECONDS = float(os.getenv("AI_TIMEOUT_SECONDS", "5"))
+AI_CACHE_TTL_SECONDS = float(os.getenv("AI_CACHE_TTL_SECONDS", "3600"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "4096"))
+
+# Distinguishes a cached "no finding" (None) from a cache miss
+_NO_FINDING = object()
+
+class TTLCache:
+    """Small LRU cache whose entries expire after a fixed time-to-live."""
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, object]]" = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class AIClient:
+    """
+    Async front end for the model backend.
+
+    Snippets submitted within a short window (from one review or from
+    concurrent reviews) are coalesced into batched calls, identical pending
+    snippets share one request, and results are cached by
+    (snippet hash, context hash, model version). When no backend is
+    configured, or it errors or exceeds the timeout, the deterministic
+    AIEngine result is returned instead.
+    """
+    def __init__(
+        self,
+        model_url: Optional[str] = AI_MODEL_URL,
+        model_version: str = AI_MODEL_VERSION,
+        max_batch_size: int = AI_MAX_BATCH_SIZE,
+        batch_window_ms: float = AI_BATCH_WINDOW_MS,
+        max_concurrency: int = AI_MAX_CONCURRENCY,
+        timeout: float = AI_TIMEOUT_SECONDS,
+        cache_ttl: float = AI_CACHE_TTL_SECONDS,
+        cache_max_entries: int = AI_CACHE_MAX_ENTRIES,
+    ):
+        self.model_url = model_url
+        self.model_version = model_version
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache = TTLCache(cache_ttl, cache_max_entries)
+        self.static_engine = AIEngine()
+        self.extractor = ContextExtractor()
+
+        self._pending: List[Tuple[Tuple, str, str]] = []
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._flush_handle = None
+        self._semaphore = None
+        self._loop = None
+        self._tasks = set()
+
+        # Counters for monitoring and tests
+        self.stats = {"requests": 0, "cache_hits": 0, "batches": 0, "fallbacks": 0}
+
+    def _cache_key(self, snippet: str, context: str) -> Tuple[str, str, str]:
+        return (
+            hashlib.sha256(snippet.encode()).hexdigest(),
+            hashlib.sha256(context.encode()).hexdigest(),
+            self.model_version,
+        )
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures and semaphores belong to one event loop
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._pending = []
+            self._inflight = {}
+            self._flush_handle = None
+        return loop
+
+    async def analyze(self, snippet: str, context: str = "") -> Optional[str]:
+        """Analyze one snippet; the call is transparently batched with its neighbours."""
+        loop = self._bind_loop()
+        self.stats["requests"] += 1
+        key = self._cache_key(snippet, context)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return None if cached is _NO_FINDING else cached
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = loop.create_future()
+            self._inflight[key] = future
+            self._pending.append((key, snippet, context))
+
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_window, self._flush)
+
+        # Shield so one cancelled caller does not cancel a shared request
+        return await asyncio.shield(future)
+
+    async def analyze_many(self, items: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """Analyze (snippet, context) pairs from one review in as few calls as possible."""
+        return list(await asyncio.gather(*(self.analyze(s, c) for s, c in items)))
+
+    async def review(self, code: str, tree, violations: List) -> Tuple[ExtractedContext, List[Optional[str]]]:
+        """
+        Ask about a review's findings without sending the whole file: the
+        extractor cuts the regions around the flagged lines under its token
+        budget, each region holding flagged lines becomes one snippet, and the
+        extracted text is its context. Findings are returned in region order.
+        """
+        extracted = self.extractor.extract(code, tree, violations)
+        lines = code.split('\n')
+        items = [
+            ('\n'.join(lines[r.start - 1:r.end]), extracted.text)
+            for r in extracted.regions if r.flagged_lines
+        ]
+        return extracted, await self.analyze_many(items)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            # Keep a reference so the batch task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Tuple, str, str]]):
+        results = None
+        if self.model_url:
+            try:
+                # The timeout covers waiting for a concurrency slot as well as the call itself
+                deadline = time.monotonic() + self.timeout
+                results = await asyncio.wait_for(self._call_backend(batch, deadline), timeout=self.timeout)
+            except Exception as e:
+                print(f"AI backend unavailable ({type(e).__name__}); using static analysis")
+                self.stats["fallbacks"] += 1
+                results = None
+
+        for i, (key, snippet, context) in enumerate(batch):
+            if results is not None:
+                finding = results[i]
+                # Only model answers are cached; degraded results are retried next time
+                self.cache.set(key, _NO_FINDING if finding is None else finding)
+            else:
+                finding = self.static_engine.analyze_snippet(snippet, context)
+
+            future = self._inflight.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(finding)
+
+    async def _call_backend(self, batch: List[Tuple[Tuple, str, str]], deadline: float) -> List[Optional[str]]:
+        semaphore = self._semaphore
+        await semaphore.acquire()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            semaphore.release()
+            raise asyncio.TimeoutError()
+
+        def release(call: asyncio.Future):
+            semaphore.release()
+            if not call.cancelled():
+                call.exception()  # retrieved here in case the waiter already timed out
+
+        self.stats["batches"] += 1
+        call = asyncio.get_running_loop().run_in_executor(None, self._post_batch, batch, remaining)
+        # A timed-out wait does not stop the worker thread, so the slot is held
+        # until the thread returns; otherwise abandoned calls would not count
+        # against max_concurrency
+        call.add_done_callback(release)
+        return await asyncio.shield(call)
+
+    def _post_batch(self, batch: List[Tuple[Tuple, str, str]], timeout: float) -> List[Optional[str]]:
+        """
+        Blocking transport, run in a worker thread.
+        Request:  {"model": str, "items": [{"id": int, "snippet": str, "context": str}]}
+        Response: {"results": [{"id": int, "finding": str | null}]}
+        """
+        payload = json.dumps({
+            "model": self.model_version,
+            "items": [
+                {"id": i, "snippet": snippet, "context": context}
+                for i, (_, snippet, context) in enumerate(batch)
+            ],
+        }).encode()
+        req = urllib.request.Request(
+            self.model_url,
+            data=payload,
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = json.loads(resp.read())
+
+        by_id = {r["id"]: r.get("finding") for r in body["results"]}
+        return [by_id.get(i) for i in range(len(batch))]
+
+_ai_client: Optional[AIClient] = None
+
+def get_ai_client() -> AIClient:
+    """The worker's AI client, shared so reviews batch together and share the cache and concurrency limit"""
+    global _ai_client
+    if _ai_client is None:
+        _ai_client = AIClient()
+    return _ai_client
@@ -0,0 +1,192 @@
+import ast
+import hashlib
+import io
+import os
+import sys
+import threading
+import tokenize
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Number of recently analyzed sources whose artifacts are kept for reuse, and
+# the estimated memory they may hold together
+CONTEXT_CACHE_SIZE = int(os.getenv("CONTEXT_CACHE_SIZE", "64"))
+CONTEXT_CACHE_BYTES = int(os.getenv("CONTEXT_CACHE_BYTES", str(256 * 1024 * 1024)))
+# Larger sources get a context of their own that is not kept after the review
+CONTEXT_CACHE_MAX_CHARS = int(os.getenv("CONTEXT_CACHE_MAX_CHARS", str(256 * 1024)))
+
+# Measured CPython footprint of the artifacts, per item
+_LINE_BYTES = 64  # list slot and str header, on top of the characters
+_TOKEN_BYTES = 280  # TokenInfo with its position tuples and string
+_TREE_BYTES_PER_TOKEN = 230  # AST nodes for a token's worth of source
+_SPAN_BYTES = 200
+# Used for the tree when the source was not tokenized
+_TOKENS_PER_CHAR = 0.25
+
+_NOT_BUILT = object()
+
+# Token types whose text is not code; f-string parts are separate tokens on 3.12+
+_NON_CODE_TOKENS = {tokenize.COMMENT, tokenize.STRING}
+if hasattr(tokenize, 'FSTRING_MIDDLE'):
+    _NON_CODE_TOKENS.add(tokenize.FSTRING_MIDDLE)
+
+class AnalysisContext:
+    """
+    Artifacts derived from one source text, shared by every rule that runs on it.
+
+    Each artifact (line list, newline offsets, token stream, comment/string
+    spans, AST) is built on first access and memoized, so it is computed at
+    most once per source and only if some active rule asks for it. The
+    `built` set records which artifacts were actually materialized.
+    """
+    def __init__(self, code: str, content_hash: Optional[str] = None):
+        self.code = code
+        self._content_hash = content_hash
+        self._lines = None
+        self._line_index = None
+        self._tokens = None
+        self._tokenized_lines = 0
+        self._non_code_spans = None
+        self._tree = _NOT_BUILT
+        self.built = set()
+        self._size: Tuple[int, int] = (-1, 0)  # (artifacts built, estimated bytes)
+
+    @property
+    def content_hash(self) -> str:
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self.code.encode('utf-8', errors='surrogatepass')).hexdigest()
+        return self._content_hash
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.code.split('\n')
+            self.built.add("lines")
+        return self._lines
+
+    @property
+    def line_index(self):
+        """Newline-offset index (character offsets) of the source"""
+        if self._line_index is None:
+            from backend.core.line_index import LineIndex
+            self._line_index = LineIndex.from_text(self.code)
+            self.built.add("line_index")
+        return self._line_index
+
+    @property
+    def tokens(self) -> List[tokenize.TokenInfo]:
+        """Token stream; on a tokenize error, the tokens produced before it"""
+        if self._tokens is None:
+            tokens = []
+            try:
+                for tok in tokenize.generate_tokens(io.StringIO(self.code).readline):
+                    tokens.append(tok)
+                self._tokenized_lines = len(self.lines)
+            except (tokenize.TokenError, IndentationError, SyntaxError):
+                # Lines from the failing token onwards are not covered
+                self._tokenized_lines = tokens[-1].start[0] - 1 if tokens else 0
+            self._tokens = tokens
+            self.built.add("tokens")
+        return self._tokens
+
+    @property
+    def non_code_spans(self) -> Dict[int, List[Tuple[int, int]]]:
+        """Per-line (start_col, end_col) spans covered by comments and string literals"""
+        if self._non_code_spans is None:
+            spans: Dict[int, List[Tuple[int, int]]] = {}
+            for tok in self.tokens:
+                if tok.type not in _NON_CODE_TOKENS:
+                    continue
+                (r1, c1), (r2, c2) = tok.start, tok.end
+                if r1 == r2:
+                    spans.setdefault(r1, []).append((c1, c2))
+                    continue
+                # Multi-line strings cover the tail of the first line through the head of the last
+                spans.setdefault(r1, []).append((c1, len(self.lines[r1 - 1]) + 1))
+                for r in range(r1 + 1, r2):
+                    spans.setdefault(r, []).append((0, len(self.lines[r - 1]) + 1))
+                spans.setdefault(r2, []).append((0, c2))
+            self._non_code_spans = spans
+            self.built.add("non_code_spans")
+        return self._non_code_spans
+
+    @property
+    def tree(self) -> Optional[ast.AST]:
+        """Parsed module, or None if the source does not parse"""
+        if self._tree is _NOT_BUILT:
+            try:
+                self._tree = ast.parse(self.code)
+            except (SyntaxError, ValueError):
+                self._tree = None
+            self.built.add("tree")
+        return self._tree
+
+    def estimated_bytes(self) -> int:
+        """Approximate memory held by the source and the artifacts built so far"""
+        if self._size[0] == len(self.built):
+            return self._size[1]
+        size = sys.getsizeof(self.code)
+        if self._lines is not None:
+            size += len(self.code) + _LINE_BYTES * len(self._lines)
+        if self._line_index is not None:
+            size += self._line_index.nbytes
+        if self._tokens is not None:
+            size += _TOKEN_BYTES * len(self._tokens)
+        if self._non_code_spans is not None:
+            size += _SPAN_BYTES * sum(len(spans) for spans in self._non_code_spans.values())
+        if self._tree is not _NOT_BUILT and self._tree is not None:
+            tokens = len(self._tokens) if self._tokens is not None else len(self.code) * _TOKENS_PER_CHAR
+            size += int(_TREE_BYTES_PER_TOKEN * tokens)
+        self._size = (len(self.built), size)
+        return size
+
+    def in_code(self, line: int, col: int) -> bool:
+        """True if the character at (1-based line, 0-based col) is outside comments and strings"""
+        spans = self.non_code_spans
+        if line > self._tokenized_lines:
+            # Not covered by the token stream: fall back to the whole-line comment check
+            return not self.lines[line - 1].lstrip().startswith('#')
+        for start, end in spans.get(line, ()):
+            if start <= col < end:
+                return False
+        return True
+
+_context_cache: "OrderedDict[str, AnalysisContext]" = OrderedDict()
+# Reviews are analyzed on worker threads
+_context_lock = threading.Lock()
+
+def get_context(code: str, content_hash: Optional[str] = None) -> AnalysisContext:
+    """
+    Return the shared context for this source, reusing artifacts across calls
+    by content hash (pass it when already known, e.g. hashed from the upload).
+    Sources over CONTEXT_CACHE_MAX_CHARS are not cached. Artifacts are built
+    after a context is handed out, so the byte budget is enforced on each
+    call from the artifacts built by then.
+    """
+    ctx = AnalysisContext(code, content_hash)
+    if len(code) > CONTEXT_CACHE_MAX_CHARS:
+        return ctx
+    key = ctx.content_hash
+    with _context_lock:
+        cached = _context_cache.get(key)
+        if cached is not None:
+            _context_cache.move_to_end(key)
+            ctx = cached
+        else:
+            _context_cache[key] = ctx
+        _trim_context_cache()
+    return ctx
+
+def _trim_context_cache():
+    """Evict least recently used contexts beyond CONTEXT_CACHE_SIZE or CONTEXT_CACHE_BYTES"""
+    while len(_context_cache) > CONTEXT_CACHE_SIZE:
+        _context_cache.popitem(last=False)
+    total = sum(ctx.estimated_bytes() for ctx in _context_cache.values())
+    while total > CONTEXT_CACHE_BYTES and len(_context_cache) > 1:
+        _, evicted = _context_cache.popitem(last=False)
+        total -= evicted.estimated_bytes()
+
+def context_cache_bytes() -> int:
+    """Estimated memory held by the cached contexts"""
+    with _context_lock:
+        return sum(ctx.estimated_bytes() for ctx in _context_cache.values())
@@ -1,113 +1,363 @@
 import ast
 import re
+import os
+import mmap
 import hashlib
-from typing import List, Dict
-from backend.models.schemas import Violation
+import tokenize
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Union
+from backend.core.analysis_context import AnalysisContext, get_context
+from backend.core.deadline import Deadline
+from backend.core.result_cache import Record, ResultCache, get_result_cache
+
+# The pydantic models are only needed once violations are returned; analysis
+# itself produces plain records, which keeps the pre-commit path light. For the
+# same reason each check stage imports its engine (and the profiler) when it runs
+if TYPE_CHECKING:
+    from backend.models.schemas import Violation
+
+# Sources at least this large are scanned as one buffer instead of line by line
+BUFFER_SCAN_THRESHOLD = int(os.getenv("BUFFER_SCAN_THRESHOLD", str(1024 * 1024)))
+
+_compiled_patterns: Dict[Tuple[str, bool], "re.Pattern"] = {}
 
 def generate_violation_id(rule_id: str, line: int, message: str) -> str:
     unique_str = f"{rule_id}:{line}:{message}"
     return hashlib.md5(unique_str.encode()).hexdigest()
 
+def compile_pattern(pattern: str, as_bytes: bool = False) -> "re.Pattern":
+    """Compile a policy pattern once; bytes patterns are used for mmap'ed files"""
+    key = (pattern, as_bytes)
+    compiled = _compiled_patterns.get(key)
+    if compiled is None:
+        source = pattern.encode('utf-8') if as_bytes else pattern
+        # MULTILINE keeps ^/$ anchored to lines when scanning a whole buffer
+        compiled = re.compile(source, re.MULTILINE)
+        _compiled_patterns[key] = compiled
+    return compiled
+
+def violation_message(policy: Dict, message: Optional[str] = None) -> str:
+    return message or policy['description'] + " detected"
+
+def policy_violation(policy: Dict, line: int, message: Optional[str] = None) -> "Violation":
+    from backend.models.schemas import Violation
+
+    v_message = violation_message(policy, message)
+    v_rule_id = policy['id']
+
+    return Violation(
+        id=generate_violation_id(v_rule_id, line, v_message),
+        line=line,
+        severity=policy['severity'],
+        message=v_message,
+        rule_id=v_rule_id,
+        risk_explanation=policy.get('risk_explanation'),
+        exploit_scenario=policy.get('exploit_scenario'),
+        fix_recommendation=policy.get('fix_recommendation'),
+        secure_code_example=policy.get('secure_code_example')
+    )
+
+class ViolationRecord:
+    """
+    Compact in-memory violation: the policy is held by reference and the id is
+    computed on first access. Exposes the Violation attributes the scoring and
+    feedback code reads; to_model() builds the pydantic model for responses.
+    """
+    __slots__ = ("policy", "line", "message", "status", "_id")
+
+    def __init__(self, policy: Dict, line: int, message: str, status: str = "OPEN"):
+        self.policy = policy
+        self.line = line
+        self.message = message
+        self.status = status
+        self._id = None
+
+    @property
+    def rule_id(self) -> str:
+        return self.policy['id']
+
+    @property
+    def severity(self) -> str:
+        return self.policy['severity']
+
+    @property
+    def id(self) -> str:
+        if self._id is None:
+            self._id = generate_violation_id(self.policy['id'], self.line, self.message)
+        return self._id
+
+    def to_model(self) -> "Violation":
+        v = policy_violation(self.policy, self.line, self.message)
+        v.status = self.status
+        return v
+
+def to_models(records: List[ViolationRecord]) -> List["Violation"]:
+    return [r.to_model() for r in records]
+
 class StaticAnalyzer:
-    def analyze(self, code: str, policies: List[Dict]) -> List[Violation]:
-        violations = []
-        lines = code.split('\n')
-        
+    def __init__(self, cache: Optional[ResultCache] = None):
+        # Falls back to the on-disk cache configured by ANALYSIS_CACHE_PATH, if any
+        self.cache = cache if cache is not None else get_result_cache()
+
+    def analyze(self, code: Union[str, AnalysisContext], policies: List[Dict]) -> List["Violation"]:
+        return to_models(self.analyze_compact(code, policies))
+
+    def analyze_compact(self, code: Union[str, AnalysisContext], policies: List[Dict],
+                        deadline: Optional[Deadline] = None, scanned: Optional[List[Record]] = None) -> List[ViolationRecord]:
+        """Like analyze, but returns ViolationRecords; convert with to_models() at the response boundary"""
+        return self._from_records(self.analyze_records(code, policies, deadline, scanned), policies)
+
+    def analyze_records(self, code: Union[str, AnalysisContext], policies: List[Dict],
+                        deadline: Optional[Deadline] = None, scanned: Optional[List[Record]] = None) -> List[Record]:
+        """
+        Like analyze, but returns plain (rule_id, line, message) tuples, the cache
+        format. With a deadline, analysis stops once it passes and returns the
+        records found so far; the unfinished policies are listed in deadline.incomplete.
+        `scanned` holds the regex records if the source was already scanned
+        (e.g. while it was uploaded), so that stage is skipped.
+        """
+        ctx = code if isinstance(code, AnalysisContext) else get_context(code)
+        if self.cache is None:
+            return self._analyze_records(ctx, policies, deadline, scanned)
+
+        key = self.cache.key(ctx.content_hash, policies)
+        records = self.cache.get(key)
+        if records is None:
+            records = self._analyze_records(ctx, policies, deadline, scanned)
+            # Results that may be partial are not cached
+            if deadline is None or not deadline.expired:
+                self.cache.put(key, records)
+        return records
+
+    def _analyze(self, ctx: AnalysisContext, policies: List[Dict]) -> List["Violation"]:
+        return to_models(self._from_records(self._analyze_records(ctx, policies), policies))
+
+    def _analyze_records(self, ctx: AnalysisContext, policies: List[Dict], deadline: Optional[Deadline] = None,
+                         scanned: Optional[List[Record]] = None) -> List[Record]:
         # 1. Regex Checks
-        for policy in policies:
-            if policy.get('type') == 'regex':
-                pattern = policy.get('pattern')
-                for i, line in enumerate(lines):
-                    if re.search(pattern, line):
-                        # Skip if it's a comment (simple check)
-                        if line.strip().startswith('#'):
-                            continue
-                        
-                        v_message = policy['description'] + " detected"
-                        v_rule_id = policy['id']
-                        v_line = i + 1
-                        
-                        violations.append(Violation(
-                            id=generate_violation_id(v_rule_id, v_line, v_message),
-                            line=v_line,
-                            severity=policy['severity'],
-                            message=v_message,
-                            rule_id=v_rule_id,
-                            risk_explanation=policy.get('risk_explanation'),
-                            exploit_scenario=policy.get('exploit_scenario'),
-                            fix_recommendation=policy.get('fix_recommendation'),
-                            secure_code_example=policy.get('secure_code_example')
-                        ))
+        if scanned is not None:
+            records = list(scanned)
+        elif len(ctx.code) >= BUFFER_SCAN_THRESHOLD:
+            records = self._scan_buffer(ctx.code, policies, ctx, deadline)
+        else:
+            records = self._scan_lines(ctx, policies, deadline)
 
         # 2. AST Checks
-        try:
-            tree = ast.parse(code)
-            ast_analyzer = ASTAnalyzer(policies, violations)
-            ast_analyzer.visit(tree)
-        except SyntaxError:
+        self._run_ast_checks(ctx, policies, records, deadline)
+
+        # 3. Entropy Checks
+        self._run_entropy_checks(ctx, policies, records, deadline)
+
+        # 4. Call Graph Checks
+        self._run_call_graph_checks(ctx, policies, records, deadline)
+
+        # 5. Complexity Checks
+        self._run_complexity_checks(ctx, policies, records, deadline)
+        return records
+
+    def _from_records(self, records, policies: List[Dict]) -> List[ViolationRecord]:
+        by_id = {p['id']: p for p in policies}
+        return [
+            ViolationRecord(by_id[rule_id], line, message)
+            for rule_id, line, message in records
+            if rule_id in by_id
+        ]
+
+    def analyze_with_tree(self, code: Union[str, AnalysisContext], policies: List[Dict]) -> Tuple[List["Violation"], Optional[ast.AST]]:
+        """Analyze code and also return the parsed AST (None if the code does not parse)"""
+        ctx = code if isinstance(code, AnalysisContext) else get_context(code)
+        return self.analyze(ctx, policies), ctx.tree
+
+    def analyze_file(self, path: str, policies: List[Dict]) -> List[ViolationRecord]:
+        """
+        Analyze a file on disk, scanning the regex policies over an mmap of its
+        bytes. Returns compact records, since large scans can yield many matches.
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return self.analyze_compact("", policies)
+
+            ctx = None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                key = None
+                if self.cache is not None:
+                    # Hash the raw bytes, matching AnalysisContext.content_hash for UTF-8 files
+                    key = self.cache.key(hashlib.sha256(buf).hexdigest(), policies)
+                    records = self.cache.get(key)
+                    if records is not None:
+                        return self._from_records(records, policies)
+
+                records = self._scan_buffer(buf, policies)
+                if any(p.get('type') in ('ast', 'entropy', 'async_blocking', 'complexity') for p in policies):
+                    ctx = AnalysisContext(buf[:].decode('utf-8', errors='replace'))
+
+        if ctx is not None:
+            self._run_ast_checks(ctx, policies, records)
+            self._run_entropy_checks(ctx, policies, records)
+            self._run_call_graph_checks(ctx, policies, records)
+            self._run_complexity_checks(ctx, policies, records)
+        if key is not None:
+            self.cache.put(key, records)
+        return self._from_records(records, policies)
+
+    def _scan_lines(self, ctx: AnalysisContext, policies: List[Dict], deadline: Optional[Deadline] = None) -> List[Record]:
+        records = []
+        regex_policies = [p for p in policies if p.get('type') == 'regex']
+        if not regex_policies:
+            return records
+        from backend.core.prefilter import compile_prefilter
+        from backend.core.profiler import tag
+
+        lines = ctx.lines
+        # Lines holding none of a policy's required literals cannot match it
+        candidates = compile_prefilter([p['pattern'] for p in regex_policies]).candidate_lines(ctx.code)
+
+        for index, (policy, candidate_lines) in enumerate(zip(regex_policies, candidates)):
+            if deadline is not None and deadline.skip(regex_policies[index:]):
+                break
+            pattern = compile_pattern(policy.get('pattern'))
+            message = violation_message(policy)
+            with tag("regex", policy['id']):
+                for i in (range(len(lines)) if candidate_lines is None else candidate_lines):
+                    line = lines[i]
+                    # Only matches outside comments and string literals count
+                    for m in pattern.finditer(line):
+                        if ctx.in_code(i + 1, m.start()):
+                            records.append((policy['id'], i + 1, message))
+                            break
+        return records
+
+    def scan_buffer(self, buf, policies: List[Dict], ctx: Optional[AnalysisContext] = None) -> List[ViolationRecord]:
+        """
+        Run each regex policy over the whole buffer (str, bytes or mmap) with one
+        compiled pattern, mapping match offsets to lines through a newline-offset
+        index. Reports the same lines as the line-by-line scan: at most one
+        violation per line per policy, matches in comments and strings skipped.
+        """
+        return self._from_records(self._scan_buffer(buf, policies, ctx), policies)
+
+    def _scan_buffer(self, buf, policies: List[Dict], ctx: Optional[AnalysisContext] = None,
+                     deadline: Optional[Deadline] = None) -> List[Record]:
+        from backend.core.line_index import LineIndex
+        from backend.core.profiler import tag
+
+        is_text = isinstance(buf, str)
+        if is_text:
+            index = ctx.line_index if ctx is not None else LineIndex.from_text(buf)
+        else:
+            index = LineIndex.from_buffer(buf)
+        n_lines = len(index)
+        records = []
+
+        def in_code(line: int, line_start: int, offset: int) -> bool:
+            nonlocal ctx
+            if ctx is None:
+                # Tokens are needed only once something matched; decode lazily
+                ctx = AnalysisContext(buf if is_text else buf[:].decode('utf-8', errors='replace'))
+            col = offset - line_start
+            if not is_text:
+                col = len(buf[line_start:offset].decode('utf-8', errors='replace'))
+            return ctx.in_code(line, col)
+
+        regex_policies = [p for p in policies if p.get('type') == 'regex']
+        for i, policy in enumerate(regex_policies):
+            if deadline is not None and deadline.skip(regex_policies[i:]):
+                break
+            pattern = compile_pattern(policy.get('pattern'), as_bytes=not is_text)
+            record = (policy['id'], violation_message(policy))
+
+            with tag("regex", policy['id']):
+                pos = 0
+                while pos <= index.length:
+                    m = pattern.search(buf, pos)
+                    if m is None:
+                        break
+
+                    line = index.line_of(m.start())
+                    line_start, line_end = index.bounds(line)
+                    # A match that runs past the newline (e.g. via \s) or sits in a
+                    # comment/string does not count; re-check the line on its own
+                    if m.end() <= line_end and in_code(line, line_start, m.start()):
+                        records.append((record[0], line, record[1]))
+                    elif any(in_code(line, line_start, lm.start()) for lm in pattern.finditer(buf, line_start, line_end)):
+                        records.append((record[0], line, record[1]))
+
+                    if line >= n_lines:
+                        break
+                    pos = int(index.starts[line])
+
+        return records
+
+    def _run_ast_checks(self, ctx: AnalysisContext, policies: List[Dict], records: List[Record],
+                        deadline: Optional[Deadline] = None):
+        # Parse only when an AST policy is active
+        ast_policies = [p for p in policies if p.get('type') == 'ast']
+        if not ast_policies or (deadline is not None and deadline.skip(ast_policies)):
+            return
+        from backend.core.profiler import tag
+
+        with tag("parse"):
+            tree = ctx.tree
+        if tree is None:
             # If code is invalid, we can't run AST checks, but that's okay
-            pass
-            
-        return violations
+            return
+
+        with tag("ast"):
+            ast_analyzer = ASTAnalyzer(policies, records, deadline)
+            ast_analyzer.visit(tree)
+
+    def _run_entropy_checks(self, ctx: AnalysisContext, policies: List[Dict], records: List[Record],
+                            deadline: Optional[Deadline] = None):
+        # Imported only when an entropy policy is active; NumPy only for large batches
+        entropy_policies = [p for p in policies if p.get('type') == 'entropy']
+        if not entropy_policies or (deadline is not None and deadline.skip(entropy_policies)):
+            return
+        from backend.core.entropy import scan_literals
+        from backend.core.profiler import tag
+
+        with tag("entropy"):
+            literals = [(tok.start[0], tok.string) for tok in ctx.tokens if tok.type == tokenize.STRING]
+            records.extend(scan_literals(literals, policies))
+
+    def _run_call_graph_checks(self, ctx: AnalysisContext, policies: List[Dict], records: List[Record],
+                               deadline: Optional[Deadline] = None):
+        graph_policies = [p for p in policies if p.get('type') == 'async_blocking']
+        if not graph_policies or (deadline is not None and deadline.skip(graph_policies)):
+            return
+        from backend.core.call_graph import module_records
+        from backend.core.profiler import tag
+
+        # The module index is cached per content hash; the tree is parsed only on a miss
+        with tag("callgraph"):
+            records.extend(module_records(ctx, policies))
+
+    def _run_complexity_checks(self, ctx: AnalysisContext, policies: List[Dict], records: List[Record],
+                               deadline: Optional[Deadline] = None):
+        complexity_policies = [p for p in policies if p.get('type') == 'complexity']
+        if not complexity_policies or (deadline is not None and deadline.skip(complexity_policies)):
+            return
+        from backend.core.complexity import hotspots
+        from backend.core.profiler import tag
+
+        with tag("parse"):
+            tree = ctx.tree
+        if tree is None:
+            return
+        with tag("complexity"):
+            records.extend(hotspots(tree, policies))
+
+class ASTAnalyzer:
+    """Runs every declarative AST query of the active policies in one tree walk"""
+    def __init__(self, policies: List[Dict], records: List[Record], deadline: Optional[Deadline] = None):
+        from backend.core.ast_query import compile_queries
 
-class ASTAnalyzer(ast.NodeVisitor):
-    def __init__(self, policies: List[Dict], violations: List[Violation]):
         self.policies = policies
-        self.violations = violations
-        self.loop_depth = 0
-
-    def visit_For(self, node):
-        self._check_loop(node)
-        
-    def visit_While(self, node):
-        self._check_loop(node)
-
-    def _check_loop(self, node):
-        self.loop_depth += 1
-        
-        # Check nested loops policy
-        nested_policy = next((p for p in self.policies if p['id'] == 'nested_loops'), None)
-        if nested_policy:
-            max_depth = nested_policy.get('max_depth', 3)
-            if self.loop_depth > max_depth:
-                v_message = "Deeply nested loops detected"
-                v_rule_id = 'nested_loops'
-                v_line = node.lineno
-                
-                self.violations.append(Violation(
-                    id=generate_violation_id(v_rule_id, v_line, v_message),
-                    line=v_line,
-                    severity=nested_policy['severity'],
-                    message=v_message,
-                    rule_id=v_rule_id,
-                    risk_explanation=nested_policy.get('risk_explanation'),
-                    exploit_scenario=nested_policy.get('exploit_scenario'),
-                    fix_recommendation=nested_policy.get('fix_recommendation'),
-                    secure_code_example=nested_policy.get('secure_code_example')
-                ))
-        
-        self.generic_visit(node)
-        self.loop_depth -= 1
-
-    def visit_ExceptHandler(self, node):
-        # Check empty except
-        error_policy = next((p for p in self.policies if p['id'] == 'error_handling'), None)
-        if error_policy and error_policy.get('check') == 'empty_except':
-            # Check if body is just 'pass' or '...'
-            if len(node.body) == 1 and isinstance(node.body[0], ast.Pass):
-                v_message = "Empty except block detected"
-                v_rule_id = 'error_handling'
-                v_line = node.lineno
-                
-                self.violations.append(Violation(
-                    id=generate_violation_id(v_rule_id, v_line, v_message),
-                    line=v_line,
-                    severity=error_policy['severity'],
-                    message=v_message,
-                    rule_id=v_rule_id,
-                    risk_explanation=error_policy.get('risk_explanation'),
-                    exploit_scenario=error_policy.get('exploit_scenario'),
-                    fix_recommendation=error_policy.get('fix_recommendation'),
-                    secure_code_example=error_policy.get('secure_code_example')
-                ))
-        self.generic_visit(node)
+        self.records = records
+        self.deadline = deadline
+        self.matcher = compile_queries(policies)
+
+    def visit(self, tree: ast.AST):
+        for query, node in self.matcher.run(tree, deadline=self.deadline):
+            self.records.append((query.policy['id'], node.lineno, violation_message(query.policy, query.message)))
+        # The walk stops early once the deadline passes
+        if self.deadline is not None and self.deadline.expired:
+            self.deadline.mark_incomplete([p for p in self.policies if p.get('type') == 'ast'])
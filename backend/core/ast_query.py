@@ -0,0 +1,216 @@
+"""
+Declarative structural rules for policies of type "ast".
+
+A policy carries a "query" object; every key narrows the match:
+
+    "node":       AST node type name(s) to match, e.g. "Call" or ["For", "While"]
+    "call":       qualified callee name(s) for Call nodes, import aliases resolved;
+                  a trailing ".*" matches any attribute of a module ("subprocess.*")
+    "inside":     node type(s) that must enclose the node (the node itself
+                  does not count as enclosing)
+    "not_inside": node type(s) that must not enclose the node
+    "body_only":  the node's body is exactly one statement of this type ("Pass")
+    "depth":      {"of": [types], "gt": N}; the number of enclosing nodes of those
+                  types, counting the node itself, must exceed N (defaults to the
+                  policy's "max_depth")
+    "message":    violation message
+
+All active queries are compiled into one QueryMatcher that dispatches on node
+type during a single walk of the tree, so adding rules does not add traversals.
+"""
+import ast
+from typing import Dict, List, Optional, Set, Tuple
+
+# Nodes walked between two deadline checks
+DEADLINE_CHECK_NODES = 4096
+
+class CompiledQuery:
+    def __init__(self, policy: Dict, query: Dict):
+        self.policy = policy
+        self.message = query.get('message') or policy['description'] + " detected"
+        self.node_types = _node_types(query['node'])
+
+        calls = query.get('call')
+        self.calls: Optional[Set[str]] = None
+        self.call_prefixes: Tuple[str, ...] = ()
+        if calls is not None:
+            calls = [calls] if isinstance(calls, str) else calls
+            self.calls = {c for c in calls if not c.endswith('.*')}
+            self.call_prefixes = tuple(c[:-1] for c in calls if c.endswith('.*'))
+
+        self.inside = _node_types(query['inside']) if 'inside' in query else ()
+        self.not_inside = _node_types(query['not_inside']) if 'not_inside' in query else ()
+        self.body_only = _node_types(query['body_only']) if 'body_only' in query else ()
+
+        self.depth_of: Tuple[type, ...] = ()
+        self.depth_gt = 0
+        if 'depth' in query:
+            depth = query['depth']
+            self.depth_of = _node_types(depth['of'])
+            self.depth_gt = depth.get('gt', policy.get('max_depth', 3))
+
+    def tracked_types(self) -> Set[type]:
+        return set(self.inside) | set(self.not_inside) | set(self.depth_of)
+
+    def enclosed(self, counts: Dict[type, int]) -> bool:
+        """Check "inside"/"not_inside" against the node's ancestors only"""
+        if self.inside and not any(counts.get(t, 0) for t in self.inside):
+            return False
+        if self.not_inside and any(counts.get(t, 0) for t in self.not_inside):
+            return False
+        return True
+
+    def matches(self, node: ast.AST, counts: Dict[type, int], qualname) -> bool:
+        if self.body_only:
+            body = getattr(node, 'body', None)
+            if not isinstance(body, list) or len(body) != 1 or not isinstance(body[0], self.body_only):
+                return False
+        if self.depth_of:
+            if sum(counts.get(t, 0) for t in self.depth_of) <= self.depth_gt:
+                return False
+        if self.calls is not None:
+            name = qualname(node)
+            if name is None:
+                return False
+            if name not in self.calls and not name.startswith(self.call_prefixes):
+                return False
+        return True
+
+class QueryMatcher:
+    """All active AST queries, evaluated together in one traversal"""
+    def __init__(self, queries: List[CompiledQuery]):
+        self.queries = queries
+        self.dispatch: Dict[type, List[CompiledQuery]] = {}
+        self.tracked: Set[type] = set()
+        self.resolves_calls = any(q.calls is not None for q in queries)
+
+        for q in queries:
+            for t in q.node_types:
+                self.dispatch.setdefault(t, []).append(q)
+            self.tracked |= q.tracked_types()
+
+    def run(self, tree: ast.AST, aliases: Optional[Dict[str, str]] = None,
+            deadline=None) -> List[Tuple[CompiledQuery, ast.AST]]:
+        """
+        Return (query, node) pairs in traversal order. `aliases` seeds the import
+        aliases seen so far (e.g. from earlier statements of the same module) and
+        is updated in place with the imports found in `tree`. With a deadline,
+        the walk stops once it has passed and returns the matches so far.
+        """
+        matches = []
+        if not self.queries:
+            return matches
+
+        dispatch = self.dispatch
+        tracked = self.tracked
+        counts: Dict[type, int] = {}
+        if aliases is None:
+            aliases = {}
+        qualname = lambda node: _qualified_call_name(node, aliases)
+
+        # Iterative walk: (node, entering) pairs; exits restore ancestor counts
+        stack = [(tree, True)]
+        visited = 0
+        while stack:
+            if deadline is not None:
+                visited += 1
+                if not visited % DEADLINE_CHECK_NODES and deadline.expired:
+                    break
+            node, entering = stack.pop()
+            node_type = type(node)
+
+            if not entering:
+                counts[node_type] -= 1
+                continue
+
+            if self.resolves_calls and node_type in (ast.Import, ast.ImportFrom):
+                _record_aliases(node, aliases)
+
+            # Enclosure is decided before the node counts itself; depth counts it
+            queries = dispatch.get(node_type)
+            if queries:
+                queries = [q for q in queries if q.enclosed(counts)]
+
+            if node_type in tracked:
+                counts[node_type] = counts.get(node_type, 0) + 1
+                stack.append((node, False))
+
+            if queries:
+                for q in queries:
+                    if q.matches(node, counts, qualname):
+                        matches.append((q, node))
+
+            children = list(ast.iter_child_nodes(node))
+            for child in reversed(children):
+                stack.append((child, True))
+
+        return matches
+
+_query_cache: Dict[int, Tuple[Dict, Optional[CompiledQuery]]] = {}
+_matcher_cache: Dict[Tuple[int, ...], Tuple[List[Dict], QueryMatcher]] = {}
+
+def compile_query(policy: Dict) -> Optional[CompiledQuery]:
+    """Compile one policy's query (memoized per policy object); None if it is invalid"""
+    cached = _query_cache.get(id(policy))
+    if cached is not None and cached[0] is policy:
+        return cached[1]
+
+    try:
+        query = CompiledQuery(policy, policy['query'])
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Skipping invalid AST query in policy {policy.get('id')}: {e}")
+        query = None
+
+    if len(_query_cache) > 1024:
+        _query_cache.clear()
+    _query_cache[id(policy)] = (policy, query)
+    return query
+
+def compile_queries(policies: List[Dict]) -> QueryMatcher:
+    """Combine the queries of all active AST policies into one matcher (memoized per policy set)"""
+    ast_policies = [p for p in policies if p.get('type') == 'ast' and p.get('query')]
+    key = tuple(id(p) for p in ast_policies)
+    cached = _matcher_cache.get(key)
+    if cached is not None and all(a is b for a, b in zip(cached[0], ast_policies)):
+        return cached[1]
+
+    queries = [q for q in (compile_query(p) for p in ast_policies) if q is not None]
+    matcher = QueryMatcher(queries)
+    if len(_matcher_cache) > 64:
+        _matcher_cache.clear()
+    _matcher_cache[key] = (ast_policies, matcher)
+    return matcher
+
+def _node_types(names) -> Tuple[type, ...]:
+    names = [names] if isinstance(names, str) else names
+    types = []
+    for name in names:
+        node_type = getattr(ast, name, None)
+        if not isinstance(node_type, type) or not issubclass(node_type, ast.AST):
+            raise ValueError(f"unknown AST node type '{name}'")
+        types.append(node_type)
+    return tuple(types)
+
+def _record_aliases(node: ast.AST, aliases: Dict[str, str]):
+    if isinstance(node, ast.Import):
+        for alias in node.names:
+            if alias.asname:
+                aliases[alias.asname] = alias.name
+            else:
+                root = alias.name.split('.')[0]
+                aliases[root] = root
+    elif node.module and not node.level:
+        for alias in node.names:
+            aliases[alias.asname or alias.name] = f"{node.module}.{alias.name}"
+
+def _qualified_call_name(node: ast.AST, aliases: Dict[str, str]) -> Optional[str]:
+    """Dotted name of a Call's callee with import aliases expanded, e.g. rq.get -> requests.get"""
+    func = getattr(node, 'func', None)
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if not isinstance(func, ast.Name):
+        return None
+    parts.append(aliases.get(func.id, func.id))
+    return '.'.join(reversed(parts))
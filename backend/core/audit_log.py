@@ -0,0 +1,149 @@
+"""
+Write-behind audit log of reviews.
+
+Review endpoints append one compact row per completed review (who, which file,
+policy version, score, violation counts, timings) to an in-memory buffer and
+return immediately; a writer thread inserts the buffered rows into the
+review_audit table in batched transactions, every AUDIT_FLUSH_INTERVAL seconds
+or as soon as a batch is full. The buffer is bounded: when the database
+cannot keep up, new rows are dropped and counted rather than growing the
+worker's memory. A failed batch is put back for the next flush while there is
+room. stop() flushes what is left, so a clean shutdown loses nothing.
+
+Each worker process has its own buffer and writer, started from the app's
+lifespan (after backend.server forks).
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+
+# Column order of a buffered row
+AUDIT_COLUMNS = ("id", "timestamp", "user_id", "endpoint", "file", "policy_version", "policies",
+                 "risk_score", "risk_level", "violations", "severity_counts", "partial",
+                 "analysis_ms", "total_ms")
+
+class AuditLog:
+    def __init__(self, capacity: int = AUDIT_BUFFER_SIZE, batch_size: int = AUDIT_BATCH_SIZE,
+                 interval: float = AUDIT_FLUSH_INTERVAL, engine=None):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.interval = interval
+        self.engine = engine
+        self.buffer: deque = deque()
+        self.lock = threading.Lock()
+        # Serializes flushes between the writer thread and stop()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+
+    def record_review(self, user_id: int, endpoint: str, file: str, policy_version: str, policies: List[Dict],
+                      score: int, level: str, violations, partial: bool,
+                      analysis_seconds: float, total_seconds: float) -> Tuple[str, datetime]:
+        """Queue one review's row; returns its audit id and timestamp for the response"""
+        audit_id = uuid.uuid4().hex
+        timestamp = datetime.now()
+        counts = Counter(v.severity for v in violations)
+        self.append((
+            audit_id, timestamp, user_id, endpoint, file, policy_version, ",".join(p['id'] for p in policies),
+            score, level, len(violations), json.dumps(dict(counts), separators=(',', ':')), partial,
+            round(analysis_seconds * 1000, 3), round(total_seconds * 1000, 3),
+        ))
+        return audit_id, timestamp
+
+    def append(self, row: Tuple):
+        with self.lock:
+            if len(self.buffer) >= self.capacity:
+                self.dropped += 1
+                if self.dropped == 1 or not self.dropped % 1000:
+                    print(f"Audit log buffer full, {self.dropped} record(s) dropped")
+                return
+            self.buffer.append(row)
+            full = len(self.buffer) >= self.batch_size
+        if full:
+            self.wakeup.set()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the writer and flush everything still buffered"""
+        self.stopping = True
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+        self.flush()
+
+    def _run(self):
+        while not self.stopping:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if not self.flush():
+                # The database refused a batch; wait a full interval before retrying
+                time.sleep(self.interval)
+
+    def flush(self) -> bool:
+        """Write all buffered rows in batches of batch_size; False if a batch failed (it stays buffered)"""
+        with self.flush_lock:
+            while True:
+                with self.lock:
+                    batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+                if not batch:
+                    return True
+                try:
+                    self._insert(batch)
+                except Exception as e:
+                    self.failed_flushes += 1
+                    print(f"Audit log flush of {len(batch)} record(s) failed: {e}")
+                    self._requeue(batch)
+                    return False
+                self.written += len(batch)
+
+    def _insert(self, batch: List[Tuple]):
+        from backend.models.audit import ReviewAudit
+        engine = self.engine
+        if engine is None:
+            from backend.database import engine
+        # One transaction (and one executemany) per batch
+        with engine.begin() as conn:
+            conn.execute(ReviewAudit.__table__.insert(), [dict(zip(AUDIT_COLUMNS, row)) for row in batch])
+
+    def _requeue(self, batch: List[Tuple]):
+        with self.lock:
+            room = self.capacity - len(self.buffer)
+            if room < len(batch):
+                self.dropped += len(batch) - room
+                batch = batch[:room]
+            self.buffer.extendleft(reversed(batch))
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            buffered = len(self.buffer)
+        return {"buffered": buffered, "written": self.written, "dropped": self.dropped,
+                "failed_flushes": self.failed_flushes}
+
+_audit_log: Optional[AuditLog] = None
+
+def get_audit_log() -> AuditLog:
+    """The worker's audit log (created on first use; the writer is started by the app's lifespan)"""
+    global _audit_log
+    if _audit_log is None:
+        _audit_log = AuditLog()
+    return _audit_log
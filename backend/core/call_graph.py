@@ -0,0 +1,405 @@
+"""
+Blocking calls reachable from coroutines, for policies of type "async_blocking".
+
+A call like time.sleep() is only a problem when it runs on the event loop, and
+it usually does so indirectly: an `async def` calls a plain helper that calls
+a client library that sleeps. Each module is indexed once into its functions
+(qualified names such as `Client.fetch` or `outer.inner`), whether they are
+coroutines, the dotted names they call and the import aliases in effect. The
+index does not depend on the policies and is cached per content hash, so a
+project-wide run only re-indexes files that changed.
+
+CallGraph resolves the calls of one or more module indexes (local and nested
+functions, `self.`/`cls.` methods, class constructors, absolute and relative
+imports between the modules it holds) and walks from every coroutine through
+the synchronous functions it calls, without entering other coroutines (calling
+one only creates it) or lambdas (usually handed to an executor). Unresolved
+names are matched against the policy's `blocking` list, where `requests.*`
+matches any name under `requests`. Each violation is reported on the call in
+the coroutine, with the chain that leads to the blocking primitive.
+"""
+import ast
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from backend.core.analysis_context import AnalysisContext
+from backend.core.result_cache import Record, get_result_cache
+
+# Bump when the index layout changes so cached indexes are not misread
+INDEX_FORMAT = 1
+
+# Module indexes kept in memory, by content hash
+CALL_GRAPH_CACHE_SIZE = int(os.getenv("CALL_GRAPH_CACHE_SIZE", "512"))
+
+DEFAULT_BLOCKING = [
+    "time.sleep",
+    "requests.*",
+    "urllib.request.urlopen",
+    "socket.create_connection",
+    "subprocess.run",
+    "subprocess.call",
+    "subprocess.check_call",
+    "subprocess.check_output",
+    "os.system",
+    "os.wait",
+    "os.waitpid",
+    "input",
+]
+
+class FunctionInfo:
+    """One function: whether it is a coroutine, its line, its calls (dotted name, line) and local imports"""
+    __slots__ = ("is_async", "line", "calls", "aliases")
+
+    def __init__(self, is_async: bool, line: int, calls=None, aliases=None):
+        self.is_async = is_async
+        self.line = line
+        self.calls: List[Tuple[str, int]] = calls if calls is not None else []
+        self.aliases: Dict[str, str] = aliases if aliases is not None else {}
+
+class ModuleIndex:
+    """Functions, classes and module-level import aliases of one module"""
+    def __init__(self):
+        self.functions: Dict[str, FunctionInfo] = {}
+        self.classes: Set[str] = set()
+        self.aliases: Dict[str, str] = {}
+
+    @classmethod
+    def from_tree(cls, tree: ast.AST) -> "ModuleIndex":
+        index = cls()
+        _Indexer(index).visit(tree)
+        return index
+
+    def merge(self, other: "ModuleIndex", line_offset: int = 0):
+        """Add another part of the same module (e.g. a live session block starting at line_offset + 1)"""
+        for name, f in other.functions.items():
+            calls = [(target, line + line_offset) for target, line in f.calls] if line_offset else f.calls
+            self.functions[name] = FunctionInfo(f.is_async, f.line + line_offset, calls, f.aliases)
+        self.classes.update(other.classes)
+        self.aliases.update(other.aliases)
+
+    def to_rows(self) -> List[Tuple]:
+        """Plain tuples, the result cache's record format"""
+        rows: List[Tuple] = [("A", tuple(self.aliases.items()))]
+        rows.extend(("C", name) for name in self.classes)
+        rows.extend(
+            ("F", name, f.is_async, f.line, tuple(f.calls), tuple(f.aliases.items()))
+            for name, f in self.functions.items()
+        )
+        return rows
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple]) -> "ModuleIndex":
+        index = cls()
+        for row in rows:
+            if row[0] == "A":
+                index.aliases = dict(row[1])
+            elif row[0] == "C":
+                index.classes.add(row[1])
+            else:
+                _, name, is_async, line, calls, aliases = row
+                index.functions[name] = FunctionInfo(is_async, line, [tuple(c) for c in calls], dict(aliases))
+        return index
+
+def dotted_name(node: ast.AST) -> Optional[str]:
+    """`a.b.c` for a Name/Attribute chain, None for anything else (calls, subscripts, ...)"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+class _Indexer(ast.NodeVisitor):
+    def __init__(self, index: ModuleIndex):
+        self.index = index
+        self.scope: List[str] = []
+        self.function: Optional[FunctionInfo] = None
+
+    def _visit_function(self, node, is_async: bool):
+        # Decorators and defaults run in the enclosing scope
+        for child in node.decorator_list + node.args.defaults + [d for d in node.args.kw_defaults if d]:
+            self.visit(child)
+        name = '.'.join(self.scope + [node.name])
+        info = self.index.functions[name] = FunctionInfo(is_async, node.lineno)
+        outer = self.function
+        self.scope.append(node.name)
+        self.function = info
+        for stmt in node.body:
+            self.visit(stmt)
+        self.scope.pop()
+        self.function = outer
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self._visit_function(node, False)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        self._visit_function(node, True)
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        for child in node.decorator_list + node.bases:
+            self.visit(child)
+        self.index.classes.add('.'.join(self.scope + [node.name]))
+        outer = self.function
+        self.scope.append(node.name)
+        self.function = None  # the class body is not part of the enclosing function
+        for stmt in node.body:
+            self.visit(stmt)
+        self.scope.pop()
+        self.function = outer
+
+    def visit_Lambda(self, node: ast.Lambda):
+        # A lambda body runs when the lambda is called, typically somewhere else
+        return
+
+    def visit_Call(self, node: ast.Call):
+        if self.function is not None:
+            name = dotted_name(node.func)
+            if name is not None:
+                self.function.calls.append((name, node.lineno))
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import):
+        aliases = self.function.aliases if self.function is not None else self.index.aliases
+        for alias in node.names:
+            if alias.asname:
+                aliases[alias.asname] = alias.name
+            else:
+                head = alias.name.split('.')[0]
+                aliases[head] = head
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        aliases = self.function.aliases if self.function is not None else self.index.aliases
+        base = '.' * node.level + (node.module or '')
+        for alias in node.names:
+            if alias.name != '*':
+                sep = '' if base.endswith('.') else '.'
+                aliases[alias.asname or alias.name] = f"{base}{sep}{alias.name}" if base else alias.name
+
+_indexes: "OrderedDict[str, ModuleIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def module_index(ctx: AnalysisContext) -> Optional[ModuleIndex]:
+    """Index of the context's module, cached per content hash; None if it does not parse"""
+    key = ctx.content_hash
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    cache = get_result_cache()
+    cache_key = cache.key(key, [], namespace=f"callgraph{INDEX_FORMAT}") if cache is not None else None
+    rows = cache.get(cache_key) if cache is not None else None
+    if rows is not None:
+        index = ModuleIndex.from_rows(rows)
+    else:
+        tree = ctx.tree
+        if tree is None:
+            return None
+        index = ModuleIndex.from_tree(tree)
+        if cache is not None:
+            cache.put(cache_key, index.to_rows())
+
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > CALL_GRAPH_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+def module_name(path: str) -> str:
+    """Dotted module name of a source path: pkg/util.py -> pkg.util, pkg/__init__.py -> pkg"""
+    name = path.replace('\\', '/').lstrip('./')
+    if name.endswith('.py'):
+        name = name[:-3]
+    name = name.strip('/').replace('/', '.')
+    if name == '__init__' or name.endswith('.__init__'):
+        name = name[:-len('__init__')].rstrip('.')
+    return name
+
+# (module, function qualname)
+FunctionKey = Tuple[str, str]
+
+class CallGraph:
+    """Resolved calls between the functions of a set of modules, by module name"""
+    def __init__(self, modules: Dict[str, ModuleIndex], packages: Sequence[str] = ()):
+        self.modules = modules
+        self.packages = set(packages)  # modules that are packages (__init__.py), for relative imports
+        # Imports may name a module by a longer dotted path than its file path
+        # gives (or the reverse, e.g. under src/); any unambiguous suffix resolves
+        suffixes: Dict[str, Optional[str]] = {}
+        for name in modules:
+            parts = name.split('.') if name else []
+            for i in range(len(parts)):
+                suffix = '.'.join(parts[i:])
+                suffixes[suffix] = name if suffixes.get(suffix, name) == name else None
+        self._suffixes = suffixes
+        self._paths: Dict[FunctionKey, Optional[Tuple[List[FunctionKey], str]]] = {}
+
+    def function(self, key: FunctionKey) -> FunctionInfo:
+        return self.modules[key[0]].functions[key[1]]
+
+    def resolve(self, module: str, qualname: str, name: str) -> Tuple[Optional[FunctionKey], str]:
+        """The function a call to `name` inside module.qualname reaches, if known, and its expanded name"""
+        index = self.modules[module]
+        head, _, rest = name.partition('.')
+
+        # 1. Methods through self/cls, from the innermost enclosing class
+        if head in ('self', 'cls') and rest:
+            scope = qualname.split('.')
+            for i in range(len(scope) - 1, 0, -1):
+                owner = '.'.join(scope[:i])
+                if owner in index.classes:
+                    found = self._local(index, f"{owner}.{rest}")
+                    if found is not None:
+                        return (module, found), name
+                    break
+
+        # 2. Functions and classes of this module, innermost scope first; class
+        # bodies are not enclosing scopes for the functions defined in them
+        scope = qualname.split('.')
+        for i in range(len(scope), -1, -1):
+            if i and '.'.join(scope[:i]) in index.classes:
+                continue
+            found = self._local(index, '.'.join(scope[:i] + [name]))
+            if found is not None:
+                return (module, found), name
+
+        # 3. Imported names, then other modules of the graph
+        function = index.functions.get(qualname)
+        target = (function.aliases.get(head) if function is not None else None) or index.aliases.get(head)
+        if target is None:
+            return None, name
+        expanded = f"{target}.{rest}" if rest else target
+        if expanded.startswith('.'):
+            expanded = self._absolute(module, expanded)
+            if expanded is None:
+                return None, name
+        return self._external(expanded), expanded
+
+    @staticmethod
+    def _local(index: ModuleIndex, name: str) -> Optional[str]:
+        if name in index.functions:
+            return name
+        if name in index.classes and f"{name}.__init__" in index.functions:
+            return f"{name}.__init__"
+        return None
+
+    def _absolute(self, module: str, relative: str) -> Optional[str]:
+        level = len(relative) - len(relative.lstrip('.'))
+        parts = module.split('.') if module else []
+        if module not in self.packages:
+            parts = parts[:-1]
+        if level - 1 > len(parts):
+            return None
+        base = parts[:len(parts) - (level - 1)]
+        return '.'.join(base + [relative[level:]]) if base else relative[level:]
+
+    def _external(self, expanded: str) -> Optional[FunctionKey]:
+        parts = expanded.split('.')
+        for i in range(len(parts) - 1, 0, -1):
+            module = self._suffixes.get('.'.join(parts[:i]))
+            if module is not None:
+                found = self._local(self.modules[module], '.'.join(parts[i:]))
+                return (module, found) if found is not None else None
+        return None
+
+    def _blocking_path(self, start: FunctionKey, blocking: "BlockingNames") -> Optional[Tuple[List[FunctionKey], str]]:
+        """Shortest chain of synchronous functions from `start` to a call of a blocking primitive"""
+        if start in self._paths:
+            return self._paths[start]
+        path = None
+        queue = deque([(start, [start])])
+        seen = {start}
+        while queue and path is None:
+            key, chain = queue.popleft()
+            for name, _ in self.function(key).calls:
+                target, expanded = self.resolve(key[0], key[1], name)
+                if target is None:
+                    if blocking.matches(expanded):
+                        path = (chain, expanded)
+                        break
+                elif target not in seen and not self.function(target).is_async:
+                    seen.add(target)
+                    queue.append((target, chain + [target]))
+        self._paths[start] = path
+        return path
+
+    @staticmethod
+    def display(key: FunctionKey, module: str) -> str:
+        """Function name as seen from `module`: qualified by its own module when that differs"""
+        return key[1] if key[0] == module or not key[0] else f"{key[0]}.{key[1]}"
+
+    def violations(self, policies: List[Dict]) -> Dict[str, List[Record]]:
+        """(rule_id, line, message) records per module for each async_blocking policy"""
+        results: Dict[str, List[Record]] = {module: [] for module in self.modules}
+        for policy in policies:
+            if policy.get('type') != 'async_blocking':
+                continue
+            blocking = BlockingNames(policy.get('blocking', DEFAULT_BLOCKING))
+            self._paths = {}
+            for module, index in self.modules.items():
+                found: Dict[int, str] = {}
+                for qualname, function in index.functions.items():
+                    if not function.is_async:
+                        continue
+                    for name, line in function.calls:
+                        if line in found:
+                            continue
+                        target, expanded = self.resolve(module, qualname, name)
+                        if target is None:
+                            if blocking.matches(expanded):
+                                found[line] = f"Blocking call {expanded}() in async def {qualname}"
+                        elif not self.function(target).is_async:
+                            path = self._blocking_path(target, blocking)
+                            if path is not None:
+                                chain, primitive = path
+                                steps = [self.display(key, module) for key in chain] + [primitive]
+                                via = " -> ".join(f"{step}()" for step in steps)
+                                found[line] = f"Blocking call {primitive}() reachable from async def {qualname} via {via}"
+                results[module].extend((policy['id'], line, message) for line, message in sorted(found.items()))
+        return results
+
+class BlockingNames:
+    """A policy's blocking primitives: exact dotted names and `prefix.*` patterns"""
+    def __init__(self, names: Sequence[str]):
+        self.exact = {n for n in names if not n.endswith('.*')}
+        self.prefixes = tuple(n[:-1] for n in names if n.endswith('.*'))
+
+    def matches(self, name: str) -> bool:
+        return name in self.exact or name.startswith(self.prefixes)
+
+def module_records(ctx: AnalysisContext, policies: List[Dict]) -> List[Record]:
+    """async_blocking violations of a single module, with calls into other modules unresolved"""
+    index = module_index(ctx)
+    if index is None:
+        return []
+    return CallGraph({"": index}).violations(policies)[""]
+
+def project_records(files: Sequence[Tuple[str, AnalysisContext]], policies: List[Dict]) -> List[List[Record]]:
+    """
+    async_blocking violations of each (path, context) file, resolving calls
+    between the files; files that do not parse report none.
+    """
+    modules: Dict[str, ModuleIndex] = {}
+    names: List[Optional[str]] = []
+    packages = []
+    for path, ctx in files:
+        index = module_index(ctx)
+        name = module_name(path)
+        if index is None or name in modules:
+            # Unparseable files, and duplicates of a module name, are analyzed on their own
+            names.append(None)
+            continue
+        modules[name] = index
+        names.append(name)
+        if path.replace('\\', '/').endswith('__init__.py'):
+            packages.append(name)
+
+    results = CallGraph(modules, packages).violations(policies)
+    return [
+        results[name] if name is not None else module_records(ctx, policies)
+        for name, (_, ctx) in zip(names, files)
+    ]
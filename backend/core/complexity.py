@@ -0,0 +1,257 @@
+"""
+Loop cost estimation for policies of type "complexity".
+
+Nesting depth alone misses most quadratic code seen in review: a membership
+test on a list inside a loop, `.index()`/`.remove()` in a loop, a
+comprehension inside a loop or re-sorting on every iteration. Each function
+(and each top-level statement outside functions) is given an estimated cost
+as a power of the input size n, with a log factor for sorting:
+
+    loops, while loops and comprehension generators    n per iteration level,
+                                                       unless they run over a
+                                                       literal or range(constant)
+    sum/min/max/any/all/list/set/tuple/dict/sorted of one iterable,
+    str.join, .index/.count/.insert                    n (sorted, .sort: n log n)
+    `x in name`, name.remove(), name.pop(i) where
+    name is a local list                               n
+
+Costs multiply through loops and take the maximum over sequential code.
+Types are not inferred beyond that: a name counts as a list when every
+assignment (or annotation) in the function gives it a list, so membership on
+parameters of unknown type is not reported. A scope whose degree is above the
+policy's `max_degree` (default 1, i.e. anything worse than linear) is reported
+on the line that dominates its cost, with the loops that lead to it.
+Results depend only on the scope's own code, so a live session can estimate
+each top-level block on its own.
+"""
+import ast
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from backend.core.result_cache import Record
+
+DEFAULT_MAX_DEGREE = 1
+
+# (degree of n, degree of log n)
+Cost = Tuple[int, int]
+# Cost and the (line, label) steps from the outermost loop to the dominating operation
+Estimate = Tuple[Cost, List[Tuple[int, str]]]
+
+CONSTANT: Estimate = ((0, 0), [])
+
+_LINEAR_BUILTINS = {"sum", "min", "max", "any", "all", "list", "set", "frozenset", "tuple", "dict"}
+_SORTING_BUILTINS = {"sorted"}
+_LINEAR_METHODS = {"index", "count", "insert"}
+_LIST_BUILTINS = {"list", "sorted"}
+_LIST_METHODS = {"split", "splitlines", "readlines"}
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+# Nodes that cost nothing and contain nothing that does
+_LEAVES = (ast.Name, ast.Constant, ast.expr_context, ast.operator, ast.cmpop, ast.boolop, ast.unaryop, ast.alias, ast.arg)
+
+def format_cost(cost: Cost) -> str:
+    degree, log = cost
+    if degree == 0 and log == 0:
+        return "O(1)"
+    parts = []
+    if degree:
+        parts.append("n" if degree == 1 else f"n^{degree}")
+    if log:
+        parts.append("log n")
+    return f"O({' '.join(parts)})"
+
+def _is_list_annotation(node: Optional[ast.AST]) -> bool:
+    if isinstance(node, ast.Subscript):
+        node = node.value
+    if isinstance(node, ast.Attribute):
+        return node.attr == "List"
+    return isinstance(node, ast.Name) and node.id in ("list", "List")
+
+def _is_list_value(node: ast.AST) -> bool:
+    if isinstance(node, (ast.List, ast.ListComp)):
+        return True
+    if isinstance(node, ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name):
+            return func.id in _LIST_BUILTINS
+        if isinstance(func, ast.Attribute):
+            return func.attr in _LIST_METHODS
+    return False
+
+def _is_constant_size(node: ast.AST) -> bool:
+    """Iterables whose length does not grow with the input: literals and range() of constants"""
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set, ast.Dict)):
+        return not any(isinstance(e, ast.Starred) for e in getattr(node, 'elts', ()))
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range":
+        return all(isinstance(a, ast.Constant) or (isinstance(a, ast.UnaryOp) and isinstance(a.operand, ast.Constant))
+                   for a in node.args)
+    return False
+
+def _nested_blocks(stmt: ast.AST) -> Iterator[List[ast.AST]]:
+    """Statement lists directly inside a compound statement"""
+    for field in ('body', 'orelse', 'finalbody'):
+        block = getattr(stmt, field, None)
+        if block:
+            yield block
+    for handler in getattr(stmt, 'handlers', ()):
+        yield handler.body
+    for case in getattr(stmt, 'cases', ()):
+        yield case.body
+
+def _statements(body: List[ast.AST]) -> Iterator[ast.AST]:
+    """Statements of a scope, without entering nested functions or classes"""
+    stack = list(reversed(body))
+    while stack:
+        stmt = stack.pop()
+        yield stmt
+        if not isinstance(stmt, _SCOPES):
+            for block in _nested_blocks(stmt):
+                stack.extend(reversed(block))
+
+def list_names(body: List[ast.AST], args: Optional[ast.arguments] = None) -> Set[str]:
+    """Names that only ever hold lists in this scope (assignments, annotations and loop/with targets)"""
+    lists: Set[str] = set()
+    others: Set[str] = set()
+    if args is not None:
+        for arg in args.posonlyargs + args.args + args.kwonlyargs:
+            (lists if _is_list_annotation(arg.annotation) else others).add(arg.arg)
+    for node in _statements(body):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    (lists if _is_list_value(node.value) else others).add(target.id)
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            (lists if _is_list_annotation(node.annotation) else others).add(node.target.id)
+        elif isinstance(node, (ast.For, ast.AsyncFor)) and isinstance(node.target, ast.Name):
+            others.add(node.target.id)
+        elif isinstance(node, (ast.With, ast.AsyncWith)):
+            others.update(item.optional_vars.id for item in node.items if isinstance(item.optional_vars, ast.Name))
+    return lists - others
+
+class _Estimator:
+    def __init__(self, lists: Set[str]):
+        self.lists = lists
+
+    def block(self, stmts: List[ast.AST]) -> Estimate:
+        best = CONSTANT
+        for stmt in stmts:
+            best = _max(best, self.node(stmt))
+        return best
+
+    def children(self, node: ast.AST) -> Estimate:
+        best = CONSTANT
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST) and not isinstance(item, _LEAVES):
+                        best = _max(best, self.node(item))
+            elif isinstance(value, ast.AST) and not isinstance(value, _LEAVES):
+                best = _max(best, self.node(value))
+        return best
+
+    def node(self, node: ast.AST) -> Estimate:
+        if isinstance(node, _SCOPES):
+            return CONSTANT  # estimated as scopes of their own
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            body = self.block(node.body)
+            looped = _times(node.iter, node.lineno, "loop", body)
+            return _max(_max(self.node(node.iter), looped), self.block(node.orelse))
+        if isinstance(node, ast.While):
+            body = _max(self.node(node.test), self.block(node.body))
+            return _max(_times(None, node.lineno, "while loop", body), self.block(node.orelse))
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+            return self.comprehension(node)
+        if isinstance(node, ast.Compare):
+            return _max(self.children(node), self.membership(node))
+        if isinstance(node, ast.Call):
+            return _max(self.children(node), self.call(node))
+        return self.children(node)
+
+    def comprehension(self, node) -> Estimate:
+        if isinstance(node, ast.DictComp):
+            inner = _max(self.node(node.key), self.node(node.value))
+        else:
+            inner = self.node(node.elt)
+        for gen in reversed(node.generators):
+            for cond in gen.ifs:
+                inner = _max(inner, self.node(cond))
+            inner = _max(_times(gen.iter, node.lineno, "comprehension", inner), self.node(gen.iter))
+        return inner
+
+    def membership(self, node: ast.Compare) -> Estimate:
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)) and isinstance(right, ast.Name) and right.id in self.lists:
+                return (1, 0), [(node.lineno, f"`in` on list {right.id}")]
+        return CONSTANT
+
+    def call(self, node: ast.Call) -> Estimate:
+        func = node.func
+        one_iterable = len(node.args) == 1 and not _is_constant_size(node.args[0])
+        if isinstance(func, ast.Name) and one_iterable:
+            if func.id in _SORTING_BUILTINS:
+                return (1, 1), [(node.lineno, f"{func.id}()")]
+            if func.id in _LINEAR_BUILTINS:
+                return (1, 0), [(node.lineno, f"{func.id}()")]
+        if isinstance(func, ast.Attribute):
+            if func.attr == "sort":
+                return (1, 1), [(node.lineno, ".sort()")]
+            if func.attr in _LINEAR_METHODS:
+                return (1, 0), [(node.lineno, f".{func.attr}()")]
+            # On sets and dicts these are constant time
+            on_list = isinstance(func.value, ast.Name) and func.value.id in self.lists
+            if on_list and (func.attr == "remove" or (func.attr == "pop" and node.args)):
+                return (1, 0), [(node.lineno, f"{func.value.id}.{func.attr}()")]
+            if func.attr == "join" and isinstance(func.value, ast.Constant) and one_iterable:
+                return (1, 0), [(node.lineno, "str.join()")]
+        return CONSTANT
+
+def _max(a: Estimate, b: Estimate) -> Estimate:
+    return b if b[0] > a[0] else a
+
+def _times(iterable: Optional[ast.AST], line: int, label: str, body: Estimate) -> Estimate:
+    """Cost of running `body` once per element of `iterable` (None: an unknown number of times)"""
+    if iterable is not None and _is_constant_size(iterable):
+        return body
+    (degree, log), steps = body
+    return (degree + 1, log), [(line, label)] + steps
+
+def scopes(tree: ast.AST) -> Iterator[Tuple[str, List[ast.AST], Optional[ast.arguments]]]:
+    """(name, body, arguments) of each top-level statement outside functions and classes, then of each function"""
+    for node in getattr(tree, 'body', []):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            yield "module level", [node], None
+    yield from _functions(getattr(tree, 'body', []), "")
+
+def _functions(body: List[ast.AST], prefix: str) -> Iterator[Tuple[str, List[ast.AST], Optional[ast.arguments]]]:
+    for stmt in _statements(body):
+        if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield f"{prefix}{stmt.name}()", stmt.body, stmt.args
+            yield from _functions(stmt.body, f"{prefix}{stmt.name}.")
+        elif isinstance(stmt, ast.ClassDef):
+            yield from _functions(stmt.body, f"{prefix}{stmt.name}.")
+
+def hotspots(tree: ast.AST, policies: List[Dict]) -> List[Record]:
+    """(rule_id, line, message) for each complexity policy and each scope above its max_degree, by line"""
+    complexity_policies = [p for p in policies if p.get('type') == 'complexity']
+    if not complexity_policies:
+        return []
+
+    # 1. One estimate per scope, shared by every policy
+    estimates = []
+    for name, body, args in scopes(tree):
+        cost, steps = _Estimator(list_names(body, args)).block(body)
+        if steps:
+            estimates.append((name, cost, steps))
+
+    # 2. Each policy's threshold
+    records = []
+    for policy in complexity_policies:
+        max_degree = policy.get('max_degree', DEFAULT_MAX_DEGREE)
+        found = []
+        for name, cost, steps in estimates:
+            if cost[0] > max_degree:
+                # Lines stay out of the message so it does not change when code moves
+                path = " -> ".join(label for _, label in steps)
+                found.append((steps[-1][0], f"Estimated {format_cost(cost)} in {name}: {path}"))
+        records.extend((policy['id'], line, message) for line, message in sorted(found))
+    return records
@@ -0,0 +1,211 @@
+import ast
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+# Rough chars-per-token ratio for code; good enough for budgeting
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", "1500"))
+# Functions longer than this are cut down to the flagged statement
+MAX_REGION_LINES = 80
+# Lines kept around a flagged line when the code does not parse
+FALLBACK_WINDOW = 3
+
+SEVERITY_PRIORITY = {"HIGH": 0, "MEDIUM": 1, "LOW": 2}
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+class ContextRegion:
+    """A contiguous, 1-based inclusive line range selected for the model"""
+    def __init__(self, start: int, end: int, flagged_lines: Optional[List[int]] = None, kind: str = "function"):
+        self.start = start
+        self.end = end
+        self.flagged_lines = flagged_lines or []
+        self.kind = kind  # "function" | "statement" | "window" | "support"
+
+    def __repr__(self):
+        return f"ContextRegion({self.start}-{self.end}, {self.kind}, flagged={self.flagged_lines})"
+
+class ExtractedContext:
+    def __init__(self, regions: List[ContextRegion], text: str, token_count: int, source_tokens: int, dropped_lines: List[int]):
+        self.regions = regions
+        self.text = text
+        self.token_count = token_count
+        self.source_tokens = source_tokens
+        self.dropped_lines = dropped_lines  # flagged lines that did not fit the budget
+
+class ContextExtractor:
+    """
+    Cuts minimal, syntactically coherent regions around flagged lines using the
+    AST from StaticAnalyzer: the enclosing function (or statement), the imports
+    that bind names it references and the signatures/definitions of referenced
+    module-level names. Overlapping regions are merged and the result is packed
+    under a token budget, highest-severity findings first.
+    """
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET, max_region_lines: int = MAX_REGION_LINES):
+        self.token_budget = token_budget
+        self.max_region_lines = max_region_lines
+
+    def extract(self, code: str, tree: Optional[ast.AST], violations: List) -> ExtractedContext:
+        lines = code.split('\n')
+        source_tokens = estimate_tokens(code)
+
+        # Group flagged lines by their primary region
+        flagged = sorted({(SEVERITY_PRIORITY.get(str(v.severity).upper(), 3), v.line) for v in violations})
+        index = _ModuleIndex(tree) if tree is not None else None
+
+        candidates: Dict[Tuple[int, int], Dict] = {}
+        for priority, line in flagged:
+            # Candidate cuts from widest to narrowest; the widest one groups the findings
+            ladder = index.ladder(line, self.max_region_lines) if index is not None else []
+            ladder.append((max(1, line - FALLBACK_WINDOW), min(len(lines), line + FALLBACK_WINDOW), "window", set()))
+            ladder.append((line, line, "window", set()))
+
+            start, end, kind, support = ladder[0]
+            entry = candidates.setdefault((start, end), {"priority": priority, "lines": [], "kind": kind, "support": support, "fallbacks": []})
+            entry["priority"] = min(entry["priority"], priority)
+            entry["lines"].append(line)
+            entry["fallbacks"].append((line, ladder[1:]))
+
+        # Pack regions under the budget; each region pays only for support lines not already included
+        selected: Set[int] = set()
+        regions: List[ContextRegion] = []
+        dropped: List[int] = []
+        used = 0
+
+        def try_add(start, end, support):
+            nonlocal used, selected
+            new_lines = (set(range(start, end + 1)) | support) - selected
+            cost = sum(estimate_tokens(lines[i - 1]) + 1 for i in new_lines if 0 < i <= len(lines))
+            if used + cost > self.token_budget:
+                return False
+            used += cost
+            selected |= new_lines
+            return True
+
+        ordered = sorted(candidates.items(), key=lambda kv: (kv[1]["priority"], -len(kv[1]["lines"]), kv[0]))
+        for (start, end), entry in ordered:
+            if try_add(start, end, entry["support"]):
+                regions.append(ContextRegion(start, end, sorted(entry["lines"]), entry["kind"]))
+                continue
+            # Too large as a whole: shrink each finding to the narrowest cut that fits
+            for line, fallbacks in entry["fallbacks"]:
+                for f_start, f_end, f_kind, f_support in fallbacks:
+                    if try_add(f_start, f_end, f_support):
+                        regions.append(ContextRegion(f_start, f_end, [line], f_kind))
+                        break
+                else:
+                    dropped.append(line)
+
+        merged = _merge_ranges(selected, regions)
+        text = _render(lines, merged)
+        return ExtractedContext(merged, text, estimate_tokens(text), source_tokens, sorted(dropped))
+
+class _ModuleIndex:
+    """Spans, imports and module-level definitions of a parsed module"""
+    def __init__(self, tree: ast.AST):
+        self.scopes: List[ast.AST] = []      # functions/classes, for enclosing lookups
+        self.statements: List[ast.stmt] = []
+        self.imports: Dict[str, ast.stmt] = {}
+        self.definitions: Dict[str, ast.stmt] = {}
+
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.scopes.append(node)
+            if isinstance(node, ast.stmt):
+                self.statements.append(node)
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                for alias in node.names:
+                    bound = alias.asname or alias.name.split('.')[0]
+                    self.imports.setdefault(bound, node)
+
+        for node in getattr(tree, 'body', []):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.definitions[node.name] = node
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                for t in targets:
+                    if isinstance(t, ast.Name):
+                        self.definitions[t.id] = node
+
+    def ladder(self, line: int, max_lines: int) -> List[Tuple[int, int, str, Set[int]]]:
+        """Enclosing function, then enclosing statements, innermost last, within max_lines"""
+        cuts = []
+        functions = [
+            n for n in self.scopes
+            if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef)) and _contains(n, line)
+        ]
+        if functions:
+            fn = min(functions, key=_span_length)
+            if _span_length(fn) < max_lines:
+                cuts.append((*_node_span(fn), "function", self.support_lines(fn)))
+
+        statements = sorted((n for n in self.statements if _contains(n, line)), key=_span_length, reverse=True)
+        for stmt in statements:
+            if _span_length(stmt) < max_lines and not isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                cuts.append((*_node_span(stmt), "statement", self.support_lines(stmt)))
+        return cuts
+
+    def support_lines(self, node: ast.AST) -> Set[int]:
+        """Lines of imports and module-level definitions referenced from the node"""
+        names = set()
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                names.add(child.id)
+
+        lines = set()
+        for name in names:
+            imp = self.imports.get(name)
+            if imp is not None:
+                start, end = _node_span(imp)
+                lines.update(range(start, end + 1))
+                continue
+            definition = self.definitions.get(name)
+            if definition is None or definition is node:
+                continue
+            start, end = _node_span(definition)
+            if isinstance(definition, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                # Signature only; the body is not needed to understand the call site
+                lines.add(definition.lineno)
+            elif end - start < 3:
+                lines.update(range(start, end + 1))
+        return lines
+
+def _node_span(node: ast.AST) -> Tuple[int, int]:
+    start = node.lineno
+    for dec in getattr(node, 'decorator_list', []):
+        start = min(start, dec.lineno)
+    return start, getattr(node, 'end_lineno', None) or node.lineno
+
+def _span_length(node: ast.AST) -> int:
+    start, end = _node_span(node)
+    return end - start
+
+def _contains(node: ast.AST, line: int) -> bool:
+    start, end = _node_span(node)
+    return start <= line <= end
+
+def _merge_ranges(selected: Set[int], regions: List[ContextRegion]) -> List[ContextRegion]:
+    """Collapse the selected lines into sorted, non-overlapping regions"""
+    flagged_by_line = {}
+    for r in regions:
+        for line in r.flagged_lines:
+            flagged_by_line[line] = r.kind
+
+    merged: List[ContextRegion] = []
+    for line in sorted(selected):
+        if merged and line <= merged[-1].end + 1:
+            merged[-1].end = line
+        else:
+            merged.append(ContextRegion(line, line, kind="support"))
+        if line in flagged_by_line:
+            merged[-1].flagged_lines.append(line)
+            merged[-1].kind = flagged_by_line[line]
+    return merged
+
+def _render(lines: List[str], regions: List[ContextRegion]) -> str:
+    parts = []
+    for r in regions:
+        parts.append(f"# lines {r.start}-{r.end}")
+        parts.extend(lines[r.start - 1:r.end])
+    return '\n'.join(parts)
@@ -0,0 +1,69 @@
+"""
+Cooperative deadlines for reviews.
+
+A Deadline is created per review request and handed to the analysis running
+in the thread pool. The analysis checks it between stages and policies (and
+periodically inside long walks) and stops once the time budget is spent or
+the request was cancelled because the client disconnected, returning what it
+found so far. Policies that did not run to completion are recorded on the
+deadline, so the caller can mark the result as partial; such results are
+never cached.
+"""
+import os
+import time
+from typing import Dict, List, Optional
+
+# Budget of a review when the client sends no X-Review-Timeout, and the largest it may ask for
+REVIEW_TIMEOUT_SECONDS = float(os.getenv("REVIEW_TIMEOUT_SECONDS", "30"))
+MAX_REVIEW_TIMEOUT_SECONDS = float(os.getenv("MAX_REVIEW_TIMEOUT_SECONDS", "120"))
+
+# Why a deadline stopped the work
+EXPIRED = "deadline"
+DISCONNECTED = "disconnected"
+
+def review_timeout(header: Optional[str]) -> float:
+    """Seconds a review may take: the client's X-Review-Timeout within the maximum, else the default"""
+    try:
+        seconds = float(header) if header else REVIEW_TIMEOUT_SECONDS
+    except ValueError:
+        seconds = REVIEW_TIMEOUT_SECONDS
+    if not seconds > 0:
+        seconds = REVIEW_TIMEOUT_SECONDS
+    return min(seconds, MAX_REVIEW_TIMEOUT_SECONDS)
+
+class Deadline:
+    def __init__(self, seconds: Optional[float] = None):
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds if seconds else None
+        self.reason: Optional[str] = None  # EXPIRED or DISCONNECTED once work should stop
+        self.incomplete: List[str] = []  # ids of policies that did not run to completion
+
+    def cancel(self, reason: str = DISCONNECTED):
+        if self.reason is None:
+            self.reason = reason
+
+    @property
+    def expired(self) -> bool:
+        if self.reason is None and self.expires_at is not None and time.monotonic() >= self.expires_at:
+            self.reason = EXPIRED
+        return self.reason is not None
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def skip(self, policies: List[Dict]) -> bool:
+        """True once work should stop; the policies are then recorded as incomplete"""
+        if not self.expired:
+            return False
+        self.mark_incomplete(policies)
+        return True
+
+    def mark_incomplete(self, policies: List[Dict]):
+        for p in policies:
+            if p['id'] not in self.incomplete:
+                self.incomplete.append(p['id'])
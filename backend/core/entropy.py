@@ -0,0 +1,211 @@
+"""
+High-entropy string literal detection for policies of type "entropy".
+
+Secrets are rarely recognizable by the name they are assigned to, but they
+are long, unbroken and random-looking. Every string literal in the token
+stream is scored at once: the literal bodies are concatenated into one code
+point array, per-literal Shannon entropy comes from counting (literal, char)
+pairs, and charset statistics from per-character class masks reduced over
+each literal. A literal is flagged when it is long enough, is written only in
+the alphabet keys and tokens use (letters, digits and `+/=_-.`, which leaves
+out prose, regexes, URLs and format strings), mixes enough character classes,
+switches class often enough (identifiers and paths come in runs of letters)
+and its entropy reaches the policy threshold (a lower one for hex strings,
+whose alphabet has only 16 symbols).
+
+Policy fields, all optional:
+    min_length      shortest literal body considered (default 20)
+    max_length      longest one; longer literals are data, not keys (default 200)
+    min_entropy     bits per character required (default 4.0)
+    min_entropy_hex the same for literals made only of hex digits (default 3.0)
+    min_charsets    lower/upper/digit/symbol classes required, hex excluded (default 3)
+    min_class_changes  fraction of adjacent characters of different classes
+                    required, hex excluded (default 0.38; about 0.6 for random text)
+    require_digit   non-hex literals without a digit are words (default true; a
+                    random 20-character key has one with 97% probability)
+
+NumPy is optional and imported on the first batch large enough to use it, so
+it stays off the startup path; without it (e.g. the pre-commit hook under -S),
+and for batches too small to be worth it, literals are scored one by one with
+the same formulas.
+"""
+import math
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_THRESHOLDS = {
+    "min_length": 20,
+    "max_length": 200,
+    "min_entropy": 4.0,
+    "min_entropy_hex": 3.0,
+    "min_charsets": 3,
+    "min_class_changes": 0.38,
+    "require_digit": True,
+}
+
+_STRING_PREFIX = set("rRbBuUfF")
+_QUOTES = ('"', "'", '"""', "'''")
+
+# Below this many literals the per-call NumPy overhead outweighs the batching
+VECTOR_MIN_LITERALS = int(os.getenv("ENTROPY_VECTOR_MIN_LITERALS", "32"))
+
+# Punctuation that occurs in base64, base64url and vendor token formats
+_TOKEN_SYMBOLS = set("+/=_-.")
+
+# Character class bits; the first four are counted as charsets and OTHER
+# (whitespace, other punctuation, non-ASCII) rules a literal out
+LOWER, UPPER, DIGIT, SYMBOL, OTHER = 1, 2, 4, 8, 16
+_CHARSET_COUNT = [bin(mask & 15).count("1") for mask in range(32)]
+
+# (entropy bits/char, length, charset mask, all hex digits, adjacent class changes)
+LiteralStats = Tuple[float, int, int, bool, int]
+
+# numpy module once imported, False when it is not installed
+_np = None
+# Per-ASCII-code class bits and hex flags, built with the first vectorized batch
+_ascii_tables = None
+
+def _numpy():
+    """numpy, imported on first use; None when it is not installed"""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - optional speedup
+            numpy = False
+        _np = numpy
+    return _np or None
+
+def literal_body(token: str) -> Optional[str]:
+    """Text between the quotes of a string token; None for f-strings"""
+    i = 0
+    while i < len(token) and token[i] in _STRING_PREFIX:
+        i += 1
+    prefix, rest = token[:i], token[i:]
+    if 'f' in prefix.lower():
+        return None
+    quote = rest[:3] if rest[:3] in ('"""', "'''") else rest[:1]
+    if quote not in _QUOTES or len(rest) < 2 * len(quote) or not rest.endswith(quote):
+        return None
+    return rest[len(quote):-len(quote)]
+
+def _char_class(ch: str) -> int:
+    if 'a' <= ch <= 'z':
+        return LOWER
+    if 'A' <= ch <= 'Z':
+        return UPPER
+    if '0' <= ch <= '9':
+        return DIGIT
+    if ch in _TOKEN_SYMBOLS:
+        return SYMBOL
+    return OTHER
+
+def _is_hex(body: str) -> bool:
+    return all(ch in "0123456789abcdefABCDEF" for ch in body)
+
+def literal_stats(bodies: Sequence[str]) -> List[LiteralStats]:
+    """Entropy and charset statistics of each (non-empty) literal body"""
+    if not bodies:
+        return []
+    if len(bodies) < VECTOR_MIN_LITERALS or _numpy() is None:
+        return [_scalar_stats(body) for body in bodies]
+    return _vector_stats(bodies)
+
+def _scalar_stats(body: str) -> LiteralStats:
+    n = len(body)
+    entropy = -sum(c / n * math.log2(c / n) for c in Counter(body).values())
+    classes = [_char_class(ch) for ch in body]
+    mask = 0
+    for c in set(classes):
+        mask |= c
+    changes = sum(a != b for a, b in zip(classes, classes[1:]))
+    return entropy, n, mask, _is_hex(body), changes
+
+def _ascii_class_tables(np):
+    """Class bits and hex flags of each ASCII code; everything above 127 is OTHER"""
+    global _ascii_tables
+    if _ascii_tables is None:
+        _ascii_tables = (np.array([_char_class(chr(c)) for c in range(128)], dtype=np.uint8),
+                         np.array([_is_hex(chr(c)) for c in range(128)], dtype=bool))
+    return _ascii_tables
+
+def _vector_stats(bodies: Sequence[str]) -> List[LiteralStats]:
+    np = _numpy()
+    ascii_class, ascii_hex = _ascii_class_tables(np)
+    lengths = np.fromiter((len(b) for b in bodies), dtype=np.int64, count=len(bodies))
+    offsets = np.zeros(len(bodies), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    # UTF-32 gives one array element per character
+    chars = np.frombuffer("".join(bodies).encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    owner = np.repeat(np.arange(len(bodies), dtype=np.int64), lengths)
+
+    # 1. Entropy from the count of each distinct (literal, char) pair
+    pairs, counts = np.unique(owner * 0x110000 + chars, return_counts=True)
+    p = counts / lengths[pairs // 0x110000]
+    entropy = -np.bincount(pairs // 0x110000, weights=p * np.log2(p), minlength=len(bodies))
+
+    # 2. Charset mask, hex-only flag and class changes, reduced over each literal's characters
+    ascii_chars = np.minimum(chars, 127)
+    is_ascii = chars < 128
+    classes = np.where(is_ascii, ascii_class[ascii_chars], OTHER).astype(np.uint8)
+    hexes = is_ascii & ascii_hex[ascii_chars]
+    masks = np.bitwise_or.reduceat(classes, offsets)
+    all_hex = np.logical_and.reduceat(hexes, offsets)
+    changed = np.zeros(len(chars), dtype=np.int64)
+    changed[1:] = classes[1:] != classes[:-1]
+    changed[offsets] = 0  # the first character of a literal follows the previous literal
+    changes = np.add.reduceat(changed, offsets)
+
+    return list(zip(entropy.tolist(), lengths.tolist(), masks.tolist(), all_hex.tolist(), changes.tolist()))
+
+def thresholds(policy: Dict) -> Dict:
+    return {name: policy.get(name, default) for name, default in DEFAULT_THRESHOLDS.items()}
+
+def is_flagged(stats: LiteralStats, limits: Dict) -> bool:
+    entropy, length, mask, all_hex, changes = stats
+    if not limits["min_length"] <= length <= limits["max_length"] or mask & OTHER:
+        return False
+    if all_hex:
+        # Hex needs digits and letters both, or it is a number or a word
+        return bool(mask & DIGIT and mask & (LOWER | UPPER)) and entropy >= limits["min_entropy_hex"]
+    if limits["require_digit"] and not mask & DIGIT:
+        return False
+    return (_CHARSET_COUNT[mask] >= limits["min_charsets"]
+            and changes >= limits["min_class_changes"] * (length - 1)
+            and entropy >= limits["min_entropy"])
+
+def entropy_message(policy: Dict, stats: LiteralStats) -> str:
+    return f"{policy['description']} detected ({stats[1]} chars, {stats[0]:.2f} bits/char)"
+
+def scan_literals(literals: Sequence[Tuple[int, str]], policies: List[Dict]) -> List[Tuple[str, int, str]]:
+    """
+    (rule_id, line, message) for each entropy policy and each line holding a
+    flagged literal; `literals` are (line, string token text) pairs. Literals
+    are scored once for all policies; the highest-entropy one on a line is reported.
+    """
+    entropy_policies = [p for p in policies if p.get('type') == 'entropy']
+    if not entropy_policies or not literals:
+        return []
+
+    # 1. Literal bodies long enough for at least one policy
+    limits = [thresholds(p) for p in entropy_policies]
+    shortest = max(1, min(l["min_length"] for l in limits))
+    longest = max(l["max_length"] for l in limits)
+    lines, bodies = [], []
+    for line, token in literals:
+        body = literal_body(token)
+        if body is not None and shortest <= len(body) <= longest:
+            lines.append(line)
+            bodies.append(body)
+
+    # 2. One scoring pass, then each policy's thresholds
+    stats = literal_stats(bodies)
+    records = []
+    for policy, limit in zip(entropy_policies, limits):
+        best: Dict[int, LiteralStats] = {}
+        for line, s in zip(lines, stats):
+            if is_flagged(s, limit) and (line not in best or s[0] > best[line][0]):
+                best[line] = s
+        records.extend((policy['id'], line, entropy_message(policy, s)) for line, s in sorted(best.items()))
+    return records
@@ -0,0 +1,90 @@
+import os
+import subprocess
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# All-zero object name git uses for the missing side of an added or deleted file
+NULL_SHA = "0" * 40
+# Tree object name of the empty tree, the base for a repository without commits
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+# Per-repository result cache kept in the git directory
+REPO_CACHE_FILE = "policy-review-cache.db"
+
+class GitError(Exception):
+    pass
+
+class GitRepo:
+    """Read-only access to a local repository through git plumbing commands"""
+    def __init__(self, path: str = "."):
+        self.path = path
+
+    def git(self, *args: str, input: Optional[bytes] = None) -> bytes:
+        proc = subprocess.run(["git", "-C", self.path, *args], input=input, capture_output=True)
+        if proc.returncode != 0:
+            raise GitError(proc.stderr.decode(errors='replace').strip() or f"git {args[0]} failed")
+        return proc.stdout
+
+    def resolve(self, ref: str) -> str:
+        try:
+            return self.git("rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}").decode().strip()
+        except GitError:
+            raise GitError(f"unknown revision: {ref}") from None
+
+    def common_dir(self) -> str:
+        """The .git directory shared by all worktrees, for local caches"""
+        path = self.git("rev-parse", "--git-common-dir").decode().strip()
+        return path if os.path.isabs(path) else os.path.join(self.path, path)
+
+    def local_cache_path(self) -> str:
+        """Result cache for this repository: ANALYSIS_CACHE_PATH, else a file in the git dir"""
+        return os.getenv("ANALYSIS_CACHE_PATH") or os.path.join(self.common_dir(), REPO_CACHE_FILE)
+
+    def changed_files(self, base: str, head: str) -> List[Tuple[str, str, str]]:
+        """(path, base blob, head blob) for each changed .py file; NULL_SHA for a missing side"""
+        out = self.git("diff-tree", "-r", "-z", "-M", "--no-commit-id", base, head)
+        return _parse_raw_diff(out)
+
+    def staged_files(self) -> List[Tuple[str, str, str]]:
+        """(path, HEAD blob, index blob) for each .py file added, modified or renamed in the index"""
+        try:
+            base = self.resolve("HEAD")
+        except GitError:
+            base = EMPTY_TREE
+        out = self.git("diff-index", "--cached", "-z", "-M", "--diff-filter=ACMR", base)
+        return _parse_raw_diff(out)
+
+    def read_blobs(self, shas: Iterable[str]) -> Dict[str, bytes]:
+        """Contents of several blobs through a single `git cat-file --batch`"""
+        shas = list(dict.fromkeys(shas))
+        if not shas:
+            return {}
+        out = self.git("cat-file", "--batch", input=("\n".join(shas) + "\n").encode())
+
+        blobs, pos = {}, 0
+        for sha in shas:
+            header_end = out.index(b"\n", pos)
+            header = out[pos:header_end].split()
+            if header[-1] == b"missing":
+                raise GitError(f"blob {sha} is missing")
+            size = int(header[2])
+            blobs[sha] = out[header_end + 1:header_end + 1 + size]
+            pos = header_end + 1 + size + 1  # content is followed by a newline
+        return blobs
+
+def _parse_raw_diff(out: bytes) -> List[Tuple[str, str, str]]:
+    fields = out.decode('utf-8', errors='surrogateescape').split('\0')
+    changes = []
+    i = 0
+    while i < len(fields) - 1:
+        # ":old_mode new_mode old_sha new_sha status" then one path, or two for renames/copies
+        _, _, old_sha, new_sha, status = fields[i][1:].split(' ')
+        if status[0] in 'RC':
+            old_path, path = fields[i + 1], fields[i + 2]
+            i += 3
+        else:
+            old_path = path = fields[i + 1]
+            i += 2
+        if status[0] == 'C':
+            old_sha = NULL_SHA  # a copy leaves its source in place
+        if path.endswith('.py') or old_path.endswith('.py'):
+            changes.append((path, old_sha, new_sha))
+    return changes
@@ -0,0 +1,129 @@
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+from backend.core.analysis_context import AnalysisContext
+from backend.core.analyzer import StaticAnalyzer, ViolationRecord
+from backend.core.git_plumbing import NULL_SHA, GitRepo
+from backend.core.result_cache import Record, ResultCache
+from backend.core.risk_engine import RiskEngine
+
+# Below this many uncached blobs, analysis runs in-process rather than in a pool
+PARALLEL_MIN_BLOBS = 4
+
+_worker_policies: List[Dict] = []
+
+def _init_worker(policies: List[Dict]):
+    global _worker_policies
+    _worker_policies = policies
+
+def analyze_blob(content: bytes, policies: Optional[List[Dict]] = None) -> List[Record]:
+    """Analyze one blob's bytes and return (rule_id, line, message) records"""
+    ctx = AnalysisContext(content.decode('utf-8', errors='replace'))
+    return StaticAnalyzer(cache=None)._analyze_records(ctx, policies if policies is not None else _worker_policies)
+
+class FileReview:
+    def __init__(self, path: str, base_sha: str, head_sha: str,
+                 base: List[ViolationRecord], head: List[ViolationRecord],
+                 base_score: Tuple[int, str], head_score: Tuple[int, str]):
+        self.path = path
+        self.base_sha = base_sha
+        self.head_sha = head_sha
+        self.base = base
+        self.head = head
+        self.base_score, self.base_level = base_score
+        self.head_score, self.head_level = head_score
+
+    @property
+    def delta(self) -> int:
+        return self.head_score - self.base_score
+
+class RangeReview:
+    """
+    Reviews the .py files changed between two commits. Blobs are analyzed
+    once per policy set: results are cached under their git object name, so
+    re-reviewing a rebased branch re-analyzes only blobs git has not seen.
+    """
+    def __init__(self, repo: GitRepo, policies: List[Dict], cache: Optional[ResultCache] = None,
+                 jobs: Optional[int] = None):
+        self.repo = repo
+        self.policies = policies
+        self.cache = cache
+        self.jobs = jobs or os.cpu_count() or 1
+        self.risk_engine = RiskEngine()
+        self.stats = {"blobs": 0, "cached": 0, "analyzed": 0}
+
+    def review(self, base: str, head: str) -> Dict:
+        base_commit, head_commit = self.repo.resolve(base), self.repo.resolve(head)
+        changes = self.repo.changed_files(base_commit, head_commit)
+
+        # 1. Records for every blob on either side, from the cache where possible
+        shas = {sha for _, old, new in changes for sha in (old, new) if sha != NULL_SHA}
+        records = self.blob_records(shas)
+
+        # 2. Per-file scores on both sides
+        by_id = {p['id']: p for p in self.policies}
+        files = []
+        for path, old, new in changes:
+            base_violations = self._violations(records.get(old, []), by_id)
+            head_violations = self._violations(records.get(new, []), by_id)
+            files.append(FileReview(
+                path, old, new, base_violations, head_violations,
+                self.risk_engine.calculate_score(base_violations, self.policies) if old != NULL_SHA else (100, "LOW RISK"),
+                self.risk_engine.calculate_score(head_violations, self.policies) if new != NULL_SHA else (100, "LOW RISK"),
+            ))
+
+        # 3. Aggregate over the changed files
+        base_score, base_level = self.risk_engine.calculate_score([v for f in files for v in f.base], self.policies)
+        head_score, head_level = self.risk_engine.calculate_score([v for f in files for v in f.head], self.policies)
+        return {
+            "base": base_commit,
+            "head": head_commit,
+            "files": files,
+            "base_score": base_score,
+            "base_level": base_level,
+            "head_score": head_score,
+            "head_level": head_level,
+            "delta": head_score - base_score,
+            "stats": dict(self.stats),
+        }
+
+    def blob_records(self, shas: Iterable[str]) -> Dict[str, List[Record]]:
+        """Records for each blob, analyzing (in parallel when worthwhile) only uncached ones"""
+        shas = set(shas)
+        records, missing = {}, []
+        for sha in shas:
+            cached = self.cache.get(self._key(sha)) if self.cache is not None else None
+            if cached is not None:
+                records[sha] = cached
+            else:
+                missing.append(sha)
+        self.stats["blobs"] += len(shas)
+        self.stats["cached"] += len(shas) - len(missing)
+        self.stats["analyzed"] += len(missing)
+        if not missing:
+            return records
+
+        blobs = self.repo.read_blobs(missing)
+        contents = [blobs[sha] for sha in missing]
+        if len(missing) < PARALLEL_MIN_BLOBS or self.jobs == 1:
+            results = [analyze_blob(content, self.policies) for content in contents]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(self.jobs, len(missing)),
+                                     initializer=_init_worker, initargs=(self.policies,)) as pool:
+                results = list(pool.map(analyze_blob, contents, chunksize=max(1, len(missing) // (4 * self.jobs))))
+
+        for sha, result in zip(missing, results):
+            records[sha] = result
+            if self.cache is not None:
+                self.cache.put(self._key(sha), result)
+        return records
+
+    def _key(self, sha: str) -> str:
+        # Blob names are content hashes already; git-blob keys never collide with sha256 ones
+        return self.cache.key(sha, self.policies, namespace="git-blob")
+
+    @staticmethod
+    def _violations(records: List[Record], by_id: Dict[str, Dict]) -> List[ViolationRecord]:
+        return [ViolationRecord(by_id[rule_id], line, message)
+                for rule_id, line, message in records if rule_id in by_id]
@@ -0,0 +1,344 @@
+"""
+Streaming ingestion of uploaded sources.
+
+Besides JSON, review endpoints accept sources as the raw request body
+(text/x-python) or as multipart/form-data parts, optionally compressed
+(Content-Encoding gzip, deflate or zstd for the whole body, or a part of type
+application/gzip or application/zstd). The body is decoded chunk by chunk as
+it arrives and each source is appended to one UTF-8 buffer, which is decoded
+to text once at the end: a request holds about one copy of each source rather
+than the escaped JSON body, the parsed dict and the string taken from it.
+
+The regex policies run on each completed line while the upload is still
+coming in. Whether a match lies in a comment or string literal depends on the
+token stream of the whole file, so matches are kept as (line, columns) and
+confirmed once the source is complete, giving the same records as the
+line-by-line scan in StaticAnalyzer.
+"""
+import hashlib
+import os
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from backend.core.admission import MAX_REVIEW_BODY_BYTES, MAX_REVIEW_BYTES, MAX_REVIEW_LINES
+from backend.core.analysis_context import AnalysisContext, get_context
+from backend.core.analyzer import compile_pattern, violation_message
+from backend.core.deadline import Deadline
+from backend.core.prefilter import compile_prefilter
+from backend.core.profiler import tag
+from backend.core.result_cache import Record
+
+try:
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # pragma: no cover - optional dependency
+    MultipartParser = parse_options_header = None
+    MultipartParseError = ValueError
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional encoding
+    zstandard = None
+
+# Largest piece inflated at once, and the zstd input fed per call (zstd cannot
+# bound its output per call; a 128-byte slice inflates to at most a few MB)
+DECODE_PIECE_BYTES = 64 * 1024
+ZSTD_INPUT_SLICE = 128
+# Multipart fields other than sources (e.g. policies) are small
+MAX_FIELD_BYTES = int(os.getenv("MAX_UPLOAD_FIELD_BYTES", str(64 * 1024)))
+
+# Content types taken as a raw source body
+SOURCE_CONTENT_TYPES = {"text/x-python", "text/x-script.python", "text/plain", "application/octet-stream"}
+_PART_ENCODINGS = {
+    "application/gzip": "gzip", "application/x-gzip": "gzip",
+    "application/zstd": "zstd", "application/x-zstd": "zstd",
+}
+
+class UploadError(Exception):
+    """An upload that cannot be reviewed; status_code is the HTTP status to answer with"""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class _Identity:
+    def pieces(self, data: bytes) -> Iterator[bytes]:
+        yield data
+
+    def finish(self):
+        pass
+
+class _Zlib:
+    def __init__(self, name: str, wbits: int):
+        self.name = name
+        self.obj = zlib.decompressobj(wbits)
+
+    def pieces(self, data: bytes) -> Iterator[bytes]:
+        try:
+            while data:
+                if self.obj.eof:
+                    raise UploadError(400, f"Unexpected data after the end of the {self.name} stream")
+                out = self.obj.decompress(data, DECODE_PIECE_BYTES)
+                data = self.obj.unconsumed_tail or self.obj.unused_data
+                if out:
+                    yield out
+        except zlib.error as e:
+            raise UploadError(400, f"Invalid {self.name} data: {e}")
+
+    def finish(self):
+        if not self.obj.eof:
+            raise UploadError(400, f"Truncated {self.name} stream")
+
+class _Zstd:
+    def __init__(self):
+        self.obj = zstandard.ZstdDecompressor().decompressobj()
+
+    def pieces(self, data: bytes) -> Iterator[bytes]:
+        try:
+            for start in range(0, len(data), ZSTD_INPUT_SLICE):
+                out = self.obj.decompress(data[start:start + ZSTD_INPUT_SLICE])
+                if out:
+                    yield out
+        except zstandard.ZstdError as e:
+            raise UploadError(400, f"Invalid zstd data: {e}")
+
+    def finish(self):
+        if not getattr(self.obj, 'eof', True):
+            raise UploadError(400, "Truncated zstd stream")
+
+def decoder(encoding: Optional[str]):
+    """Incremental decoder for a Content-Encoding; 415 for encodings this server cannot read"""
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return _Identity()
+    if encoding in ("gzip", "x-gzip"):
+        return _Zlib("gzip", 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _Zlib("deflate", zlib.MAX_WBITS)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise UploadError(415, "zstd uploads need the zstandard package on the server")
+        return _Zstd()
+    raise UploadError(415, f"Unsupported Content-Encoding '{encoding}'")
+
+class SourceStream:
+    """
+    One uploaded source: buffers its (decompressed) bytes within the review
+    limits and runs the regex policies on every line as soon as it is complete.
+    """
+    def __init__(self, policies: List[Dict], encoding: Optional[str] = None, filename: Optional[str] = None,
+                 max_bytes: int = MAX_REVIEW_BYTES, max_lines: int = MAX_REVIEW_LINES):
+        self.decoder = decoder(encoding)
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self.buf = bytearray()
+        self.newlines = 0
+        self.scanned = 0  # bytes of buf already split into lines and scanned
+        self.scanned_lines = 0
+
+        # Per regex policy: (line, start columns of its matches) awaiting confirmation
+        self.regex_policies = [p for p in policies if p.get('type') == 'regex']
+        self.matches: List[List[Tuple[int, List[int]]]] = [[] for _ in self.regex_policies]
+        self.prefilter = compile_prefilter([p['pattern'] for p in self.regex_policies]) if self.regex_policies else None
+
+    def write(self, data: bytes):
+        for piece in self.decoder.pieces(data):
+            if len(self.buf) + len(piece) > self.max_bytes:
+                raise UploadError(413, f"Source exceeds {self.max_bytes} bytes")
+            self.newlines += piece.count(b'\n')
+            if self.newlines + 1 > self.max_lines:
+                raise UploadError(413, f"Source exceeds {self.max_lines} lines")
+            self.buf += piece
+        if self.prefilter is not None:
+            self._scan(self.buf.rfind(b'\n', self.scanned) + 1)
+
+    def _scan(self, end: int, final: bool = False):
+        """Run the regex policies over the lines in buf[scanned:end]"""
+        if end <= self.scanned and not final:
+            return
+        text = self.buf[self.scanned:end].decode('utf-8', errors='replace')
+        if not self.scanned and text.startswith('\ufeff'):
+            text = text[1:]
+        lines = text.split('\n')
+        if not final:
+            lines.pop()  # the text ends with a newline; the line after it is not complete yet
+
+        candidates = self.prefilter.candidate_lines(text)
+        for policy, candidate_lines, found in zip(self.regex_policies, candidates, self.matches):
+            pattern = compile_pattern(policy['pattern'])
+            with tag("regex", policy['id']):
+                for i in (range(len(lines)) if candidate_lines is None else candidate_lines):
+                    if i < len(lines):
+                        cols = [m.start() for m in pattern.finditer(lines[i])]
+                        if cols:
+                            found.append((self.scanned_lines + i + 1, cols))
+        self.scanned = end
+        self.scanned_lines += len(lines)
+
+    def finish(self) -> AnalysisContext:
+        """Decode the complete source (once) into its shared analysis context"""
+        self.decoder.finish()
+        if self.prefilter is not None:
+            self._scan(len(self.buf), final=True)
+
+        if self.buf.startswith(b'\xef\xbb\xbf'):
+            del self.buf[:3]
+        try:
+            code = self.buf.decode('utf-8')
+            # Same digest AnalysisContext would compute, without encoding the text again
+            content_hash = hashlib.sha256(self.buf).hexdigest()
+        except UnicodeDecodeError:
+            code = self.buf.decode('utf-8', errors='replace')
+            content_hash = None
+        self.buf = None
+        return get_context(code, content_hash)
+
+    def records(self, ctx: AnalysisContext, policies: List[Dict],
+                deadline: Optional[Deadline] = None) -> Optional[List[Record]]:
+        """
+        The regex records of the finished source, in the order StaticAnalyzer
+        produces them; None if the stream scanned for other policies (e.g. a
+        policies field that came after the source part).
+        """
+        if [p['id'] for p in policies if p.get('type') == 'regex'] != [p['id'] for p in self.regex_policies]:
+            return None
+        records = []
+        for index, (policy, found) in enumerate(zip(self.regex_policies, self.matches)):
+            if deadline is not None and deadline.skip(self.regex_policies[index:]):
+                break
+            message = violation_message(policy)
+            for line, cols in found:
+                if any(ctx.in_code(line, col) for col in cols):
+                    records.append((policy['id'], line, message))
+        return records
+
+    def complete(self, policies: List[Dict],
+                 deadline: Optional[Deadline] = None) -> Tuple[AnalysisContext, Optional[List[Record]]]:
+        """finish() and records(): the context to analyze and its regex records, if already scanned"""
+        ctx = self.finish()
+        return ctx, self.records(ctx, policies, deadline)
+
+class UploadReader:
+    """
+    Incremental reader of one review upload. Feed it the request body with
+    write() as it arrives (off the event loop: scanning happens there), then
+    close() to get the finished sources by name and the requested policy ids.
+
+    A raw body is the source named source_names[0]; a multipart body carries
+    each source as a part of that name (a file or plain field) and the policy
+    ids as "policies" fields, one id or a comma-separated list per field.
+    `resolve` maps policy ids to the policies to scan with; policies given
+    before the upload (e.g. in the query) are scanned for while it streams.
+    """
+    def __init__(self, content_type: Optional[str], content_encoding: Optional[str],
+                 source_names: Tuple[str, ...], policy_ids: List[str],
+                 resolve: Callable[[List[str]], List[Dict]]):
+        self.source_names = source_names
+        self.policy_ids = list(policy_ids)
+        self.resolve = resolve
+        self.sources: Dict[str, SourceStream] = {}
+        self.body = decoder(content_encoding)
+        self.body_size = 0
+
+        mime, options = _parse_content_type(content_type)
+        if mime == "multipart/form-data":
+            if MultipartParser is None:
+                raise UploadError(415, "multipart uploads need the python-multipart package on the server")
+            boundary = options.get(b"boundary")
+            if not boundary:
+                raise UploadError(400, "Missing multipart boundary")
+            self.raw = None
+            self.part: Optional[Dict] = None
+            self.header_field = b""
+            self.header_value = b""
+            self.parser = MultipartParser(boundary, {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+            })
+        elif mime in SOURCE_CONTENT_TYPES or mime.startswith("text/"):
+            self.parser = None
+            self.raw = self.sources[source_names[0]] = SourceStream(self.resolve(self.policy_ids))
+        else:
+            raise UploadError(415, f"Unsupported Content-Type '{mime}'")
+
+    def write(self, chunk: bytes):
+        for piece in self.body.pieces(chunk):
+            # Bounds what a compressed body can expand to, whatever part it lands in
+            self.body_size += len(piece)
+            if self.body_size > MAX_REVIEW_BODY_BYTES:
+                raise UploadError(413, f"Request body exceeds {MAX_REVIEW_BODY_BYTES} bytes")
+            if self.raw is not None:
+                self.raw.write(piece)
+                continue
+            try:
+                self.parser.write(piece)
+            except MultipartParseError as e:
+                raise UploadError(400, f"Invalid multipart body: {e}")
+
+    def close(self) -> Tuple[Dict[str, SourceStream], List[str]]:
+        self.body.finish()
+        if self.parser is not None:
+            self.parser.finalize()
+            if self.part is not None:
+                raise UploadError(400, "Truncated multipart body")
+        missing = [name for name in self.source_names if name not in self.sources]
+        if missing:
+            raise UploadError(422, f"Missing upload part(s): {', '.join(missing)}")
+        return self.sources, list(dict.fromkeys(self.policy_ids))
+
+    # Multipart callbacks: (data, start, end) slices of the chunk being parsed
+    def _on_part_begin(self):
+        self.part = {"headers": {}, "data": bytearray(), "stream": None}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self.header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def _on_header_end(self):
+        self.part["headers"][self.header_field.lower()] = self.header_value
+        self.header_field = self.header_value = b""
+
+    def _on_headers_finished(self):
+        _, disposition = parse_options_header(self.part["headers"].get(b"content-disposition"))
+        name = disposition.get(b"name", b"").decode('utf-8', errors='replace')
+        self.part["name"] = name
+        if name in self.source_names:
+            if name in self.sources:
+                raise UploadError(400, f"Duplicate upload part '{name}'")
+            part_type, _ = _parse_content_type(self.part["headers"].get(b"content-type", b"").decode('latin-1'))
+            encoding = _PART_ENCODINGS.get(part_type) or self.part["headers"].get(b"content-encoding", b"").decode('latin-1')
+            filename = disposition.get(b"filename", b"").decode('utf-8', errors='replace') or None
+            self.part["stream"] = self.sources[name] = SourceStream(self.resolve(self.policy_ids), encoding, filename)
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        stream = self.part["stream"]
+        if stream is not None:
+            stream.write(data[start:end])
+            return
+        if len(self.part["data"]) + end - start > MAX_FIELD_BYTES:
+            raise UploadError(413, f"Form field '{self.part['name']}' exceeds {MAX_FIELD_BYTES} bytes")
+        self.part["data"] += data[start:end]
+
+    def _on_part_end(self):
+        if self.part["name"] == "policies":
+            value = self.part["data"].decode('utf-8', errors='replace')
+            self.policy_ids.extend(split_policy_ids([value]))
+        self.part = None
+
+def split_policy_ids(values: List[str]) -> List[str]:
+    """Policy ids from repeated and/or comma-separated values"""
+    return [p.strip() for value in values for p in value.split(',') if p.strip()]
+
+def _parse_content_type(value: Optional[str]) -> Tuple[str, Dict[bytes, bytes]]:
+    mime, _, params = (value or "").partition(';')
+    options: Dict[bytes, bytes] = {}
+    if params and parse_options_header is not None:
+        _, options = parse_options_header(value)
+    return mime.strip().lower(), options
@@ -0,0 +1,387 @@
+"""
+Durable queue of background review jobs for submissions too large to review
+within one request.
+
+Jobs live in a local SQLite file (WAL mode, no broker), so they survive
+restarts and every process on the host sees the same queue. Job worker
+processes claim the highest-priority queued job inside an IMMEDIATE
+transaction, which makes claims exclusive, and hold it under a lease that a
+heartbeat thread renews. A job whose lease runs out (its worker crashed or was
+killed) is queued again, up to JOB_MAX_ATTEMPTS claims, and then failed.
+Cancelling a queued job is immediate; a running one is flagged and its worker
+stops at the next heartbeat or file boundary.
+
+Workers are separate processes niced below the HTTP workers, so bulk jobs
+drain in the background without slowing interactive reviews. backend.server
+forks and supervises them; a single uvicorn process starts its own pool.
+"""
+import json
+import os
+import signal
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "review_jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(max(1, (os.cpu_count() or 1) // 4))))
+# Added to the job workers' niceness so HTTP workers win the CPU
+JOB_WORKER_NICE = int(os.getenv("JOB_WORKER_NICE", "10"))
+# A running job whose worker has not renewed its lease for this long is retried
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Idle workers look for new jobs this often
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+# Progress (and cancellation) is checked between files at most this often
+JOB_PROGRESS_INTERVAL = 0.25
+# Finished jobs and their results are deleted after this long
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Limits on one job submission
+MAX_JOB_BYTES = int(os.getenv("MAX_JOB_BYTES", str(64 * 1024 * 1024)))
+MAX_JOB_FILES = int(os.getenv("MAX_JOB_FILES", "10000"))
+MAX_JOB_BODY_BYTES = int(os.getenv("MAX_JOB_BODY_BYTES", str(MAX_JOB_BYTES + 4 * 1024 * 1024)))
+# Queued plus running jobs per user; further submissions are refused
+MAX_ACTIVE_JOBS_PER_USER = int(os.getenv("MAX_ACTIVE_JOBS_PER_USER", "16"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# (path, code)
+JobFile = Tuple[str, str]
+
+class Job:
+    """A claimed job as its worker sees it"""
+    def __init__(self, id: str, files: List[JobFile], policies: List[str], attempts: int):
+        self.id = id
+        self.files = files
+        self.policies = policies
+        self.attempts = attempts
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8', errors='surrogatepass'), 1)
+
+def _unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode('utf-8', errors='surrogatepass'))
+
+class JobQueue:
+    """
+    SQLite-backed job table. Each process and thread opens its own connection,
+    as in ResultCache; every state change is guarded by the expected current
+    status (and owner), so a worker that lost its lease cannot overwrite the
+    job's new state.
+    """
+    def __init__(self, path: str = JOB_QUEUE_PATH, lease_seconds: float = JOB_LEASE_SECONDS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._conn()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited across fork must not be reused
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " user_id INTEGER NOT NULL,"
+            " status TEXT NOT NULL,"
+            " priority INTEGER NOT NULL,"
+            " policies TEXT NOT NULL,"
+            " payload BLOB,"
+            " result BLOB,"
+            " error TEXT,"
+            " files_done INTEGER NOT NULL DEFAULT 0,"
+            " files_total INTEGER NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " owner TEXT,"
+            " lease_until REAL,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user_id, status)")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # --- submitters -----------------------------------------------------------
+
+    def submit(self, user_id: int, files: List[JobFile], policies: List[str], priority: int = 0) -> str:
+        job_id = uuid.uuid4().hex
+        self._conn().execute(
+            "INSERT INTO jobs (id, user_id, status, priority, policies, payload, files_total, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, user_id, QUEUED, priority, json.dumps(policies), _pack(files), len(files), time.time()),
+        )
+        return job_id
+
+    def active_count(self, user_id: int) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN (?, ?)", (user_id, QUEUED, RUNNING)
+        ).fetchone()[0]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """The job's state (without its payload), with the result decoded once it is done"""
+        conn = self._conn()
+        cursor = conn.execute(
+            "SELECT id, user_id, status, priority, policies, result, error, files_done, files_total, attempts,"
+            " cancel_requested, created_at, started_at, finished_at FROM jobs WHERE id = ?", (job_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip([c[0] for c in cursor.description], row))
+        job['policies'] = json.loads(job['policies'])
+        job['result'] = _unpack(job['result']) if job['result'] is not None else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a job: queued ones at once, running ones at their next check. Returns the status"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "UPDATE jobs SET status = ?, payload = NULL, finished_at = ? WHERE id = ? AND status = ?",
+            (CANCELLED, now, job_id, QUEUED),
+        )
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+        row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    # --- workers ---------------------------------------------------------------
+
+    def claim(self, owner: str) -> Optional[Job]:
+        """Lease the highest-priority queued job to `owner`, first re-queueing abandoned ones"""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._recover_expired(conn, now)
+            row = conn.execute(
+                "SELECT id, policies, payload, attempts FROM jobs WHERE status = ?"
+                " ORDER BY priority DESC, created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1,"
+                    " files_done = 0, started_at = COALESCE(started_at, ?) WHERE id = ?",
+                    (RUNNING, owner, now + self.lease_seconds, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job_id, policies, payload, attempts = row
+        return Job(job_id, [tuple(f) for f in _unpack(payload)], json.loads(policies), attempts + 1)
+
+    def _recover_expired(self, conn: sqlite3.Connection, now: float):
+        expired = conn.execute(
+            "SELECT id, attempts, cancel_requested FROM jobs WHERE status = ? AND lease_until < ?", (RUNNING, now)
+        ).fetchall()
+        for job_id, attempts, cancel_requested in expired:
+            if cancel_requested:
+                self._finish(conn, job_id, None, CANCELLED)
+            elif attempts >= self.max_attempts:
+                self._finish(conn, job_id, None, FAILED,
+                             error=f"Job abandoned by its worker {attempts} times; giving up")
+            else:
+                print(f"Review job {job_id} lost its worker; re-queueing (attempt {attempts} of {self.max_attempts})")
+                conn.execute("UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL WHERE id = ?",
+                             (QUEUED, job_id))
+
+    def heartbeat(self, job_id: str, owner: str, files_done: Optional[int] = None) -> bool:
+        """Renew the lease (and record progress); False if the job was cancelled or the lease lost"""
+        conn = self._conn()
+        updated = conn.execute(
+            "UPDATE jobs SET lease_until = ?, files_done = COALESCE(?, files_done)"
+            " WHERE id = ? AND owner = ? AND status = ?",
+            (time.time() + self.lease_seconds, files_done, job_id, owner, RUNNING),
+        ).rowcount
+        if not updated:
+            return False
+        return not conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+    def complete(self, job_id: str, owner: str, result) -> bool:
+        return self._finish(self._conn(), job_id, owner, DONE, result=_pack(result))
+
+    def fail(self, job_id: str, owner: str, error: str) -> bool:
+        return self._finish(self._conn(), job_id, owner, FAILED, error=error)
+
+    def cancelled(self, job_id: str, owner: str) -> bool:
+        return self._finish(self._conn(), job_id, owner, CANCELLED)
+
+    def release(self, job_id: str, owner: str) -> bool:
+        """Hand a job back to the queue on shutdown; the claim does not count as an attempt"""
+        return bool(self._conn().execute(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, attempts = attempts - 1"
+            " WHERE id = ? AND owner = ? AND status = ?", (QUEUED, job_id, owner, RUNNING)
+        ).rowcount)
+
+    def _finish(self, conn: sqlite3.Connection, job_id: str, owner: Optional[str], status: str,
+                result: Optional[bytes] = None, error: Optional[str] = None) -> bool:
+        # The payload is only needed to run the job; drop it once the job is over
+        query = ("UPDATE jobs SET status = ?, result = ?, error = ?, payload = NULL, owner = NULL,"
+                 " lease_until = NULL, finished_at = ?, files_done = CASE WHEN ? THEN files_total ELSE files_done END"
+                 " WHERE id = ? AND status = ?")
+        params = [status, result, error, time.time(), status == DONE, job_id, RUNNING]
+        if owner is not None:
+            query += " AND owner = ?"
+            params.append(owner)
+        return bool(conn.execute(query, params).rowcount)
+
+    def purge(self, older_than: float = JOB_RETENTION_SECONDS) -> int:
+        """Delete finished jobs older than `older_than` seconds"""
+        return self._conn().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?", (*FINISHED, time.time() - older_than)
+        ).rowcount
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Process-wide queue at JOB_QUEUE_PATH, opened on first use"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(JOB_QUEUE_PATH)
+    return _job_queue
+
+class JobWorker:
+    """
+    Claims jobs and reviews their files one by one, renewing the lease from a
+    heartbeat thread so a single long file cannot let it expire. Results are
+    stored as (rule_id, line, message) records per file; scores and feedback
+    statuses are applied when the job is read.
+    """
+    def __init__(self, queue: JobQueue, owner: Optional[str] = None):
+        from backend.core.analyzer import StaticAnalyzer
+        from backend.core.policy_engine import PolicyEngine
+
+        self.queue = queue
+        self.owner = owner or f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.policy_engine = PolicyEngine()
+        self.analyzer = StaticAnalyzer()
+        self.stop = threading.Event()
+
+    def run(self):
+        next_purge = 0.0
+        while not self.stop.is_set():
+            if time.monotonic() >= next_purge:
+                next_purge = time.monotonic() + 3600
+                self.queue.purge()
+            job = self.queue.claim(self.owner)
+            if job is None:
+                self.stop.wait(JOB_POLL_INTERVAL)
+                continue
+            self.process(job)
+
+    def process(self, job: Job):
+        from backend.core.analysis_context import AnalysisContext
+        from backend.core.call_graph import project_records
+
+        halted = threading.Event()  # cancelled, or the lease was lost
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.queue.lease_seconds / 3):
+                if not self.queue.heartbeat(job.id, self.owner):
+                    halted.set()
+                    return
+
+        beat = threading.Thread(target=heartbeat, name=f"job-heartbeat-{job.id[:8]}", daemon=True)
+        beat.start()
+        try:
+            policies = self.policy_engine.get_policies(job.policies)
+            # Call-graph policies run once over all files, so calls between them resolve
+            graph_policies = [p for p in policies if p.get('type') == 'async_blocking']
+            file_policies = [p for p in policies if p.get('type') != 'async_blocking']
+            files = []
+            next_progress = 0.0
+            for i, (path, code) in enumerate(job.files):
+                if self.stop.is_set():
+                    self.queue.release(job.id, self.owner)
+                    return
+                if time.monotonic() >= next_progress:
+                    next_progress = time.monotonic() + JOB_PROGRESS_INTERVAL
+                    if not self.queue.heartbeat(job.id, self.owner, files_done=i):
+                        halted.set()
+                if halted.is_set():
+                    self.queue.cancelled(job.id, self.owner)
+                    return
+                files.append([path, [list(r) for r in self.analyzer.analyze_records(code, file_policies)]])
+            if graph_policies:
+                contexts = [(path, AnalysisContext(code)) for path, code in job.files]
+                for entry, records in zip(files, project_records(contexts, graph_policies)):
+                    entry[1].extend(list(r) for r in records)
+            self.queue.complete(job.id, self.owner, {"files": files})
+        except Exception as e:
+            print(f"Review job {job.id} failed: {e}")
+            self.queue.fail(job.id, self.owner, str(e))
+        finally:
+            done.set()
+            beat.join()
+
+def run_worker(queue_path: str = JOB_QUEUE_PATH):
+    """Entry point of a job worker process; SIGTERM stops it after the current file"""
+    from backend.core.policy_engine import PolicyEngine
+
+    try:
+        os.nice(JOB_WORKER_NICE)
+    except OSError:
+        pass
+    worker = JobWorker(JobQueue(queue_path))
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, lambda *_: PolicyEngine.request_reload())
+    worker.run()
+
+class JobWorkerPool:
+    """
+    Job worker processes for a single-process server (backend.server forks
+    its own). Spawned rather than forked, since the server process has threads
+    running; supervise() restarts workers that died.
+    """
+    def __init__(self, workers: int = JOB_WORKERS, queue_path: str = JOB_QUEUE_PATH):
+        import multiprocessing
+
+        self.workers = workers
+        self.queue_path = queue_path
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = []
+
+    def start(self):
+        self._processes = [self._spawn() for _ in range(self.workers)]
+
+    def _spawn(self):
+        process = self._context.Process(target=run_worker, args=(self.queue_path,), name="review-job-worker")
+        process.start()
+        return process
+
+    def supervise(self):
+        for i, process in enumerate(self._processes):
+            if not process.is_alive():
+                print(f"Review job worker {process.pid} exited with {process.exitcode}; restarting")
+                self._processes[i] = self._spawn()
+
+    def stop(self, timeout: float = 10):
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+        self._processes = []
@@ -0,0 +1,69 @@
+import re
+from bisect import bisect_right
+from typing import List, Tuple, Union
+
+# NumPy is optional: without it (e.g. the pre-commit hook under -S) the offsets
+# are a list built with the regex engine and looked up with bisect
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional speedup
+    np = None
+
+class LineIndex:
+    """
+    Start offset of every line in a buffer, built with one vectorized pass
+    over the newline bytes (without NumPy, a list from one regex pass).
+    Offsets map back to 1-based line numbers by binary search, so no
+    per-line string objects are ever created.
+    """
+    def __init__(self, starts: Union["np.ndarray", List[int]], length: int):
+        self.starts = starts  # offset of the first character of each line
+        self.length = length
+
+    @classmethod
+    def from_buffer(cls, buf: Union[bytes, bytearray, memoryview, "mmap.mmap"]) -> "LineIndex":
+        if np is None:
+            return cls([0] + [m.end() for m in re.finditer(b'\n', buf)], len(buf))
+        view = np.frombuffer(buf, dtype=np.uint8) if len(buf) else np.empty(0, dtype=np.uint8)
+        starts = np.concatenate(([0], np.flatnonzero(view == 0x0A) + 1))
+        # Drop the view before returning so an mmap can be closed afterwards
+        del view
+        return cls(starts, len(buf))
+
+    @classmethod
+    def from_text(cls, text: str) -> "LineIndex":
+        if np is None:
+            return cls([0] + [m.end() for m in re.finditer('\n', text)], len(text))
+        if text.isascii():
+            return cls.from_buffer(text.encode('ascii'))
+        # Offsets must be in characters for str patterns, so index the code points
+        view = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        starts = np.concatenate(([0], np.flatnonzero(view == 0x0A) + 1))
+        return cls(starts, len(text))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the offsets"""
+        if isinstance(self.starts, list):
+            return 8 * len(self.starts)
+        return self.starts.nbytes
+
+    def line_of(self, offset: int) -> int:
+        """1-based line number containing the offset"""
+        if isinstance(self.starts, list):
+            return bisect_right(self.starts, offset)
+        return int(np.searchsorted(self.starts, offset, side='right'))
+
+    def lines_of(self, offsets):
+        if isinstance(self.starts, list):
+            return [bisect_right(self.starts, offset) for offset in offsets]
+        return np.searchsorted(self.starts, offsets, side='right')
+
+    def bounds(self, line: int) -> Tuple[int, int]:
+        """Start and end offsets of a 1-based line, excluding its newline"""
+        start = int(self.starts[line - 1])
+        end = int(self.starts[line]) - 1 if line < len(self.starts) else self.length
+        return start, end
@@ -0,0 +1,502 @@
+"""
+Incremental analysis of a document that is edited in place (live review sessions).
+
+The document is kept as a list of lines with, per line, the lexical state at
+its start (open string, bracket depth, backslash continuation), the spans
+covered by comments and strings, and the regex and entropy policies that fire
+on it. The module is kept as a list of blocks split at lines that can only
+start a new top-level statement; each block is parsed on its own and keeps its
+AST query matches, complexity hotspots and call-graph index, and the
+async_blocking policies run over the merged indexes of all blocks.
+
+An edit re-lexes the edited lines and only as many following lines as needed
+for the lexical state to converge, re-runs the regex and entropy policies on
+exactly those lines, and re-splits the blocks over the re-lexed lines; only
+blocks whose text changed are re-parsed. While the document ends inside an
+open string or bracket nothing can parse, so re-splitting waits until it is
+closed.
+
+Results match StaticAnalyzer on the same text, except that comment/string
+detection uses a line lexer rather than tokenize (f-string replacement fields
+count as string text, and text that tokenize cannot tokenize at all is still
+lexed line by line), a regex violation reported several times on one line
+is kept once, and string literals spanning lines are not entropy-checked.
+"""
+import ast
+import bisect
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from backend.models.schemas import Violation
+from backend.core.analyzer import compile_pattern, generate_violation_id, policy_violation
+from backend.core.ast_query import compile_queries
+from backend.core.call_graph import CallGraph, ModuleIndex
+from backend.core.complexity import hotspots
+from backend.core.entropy import scan_literals
+from backend.core.risk_engine import RiskEngine
+
+# (open string delimiter or None, bracket depth, backslash continuation)
+LexState = Tuple[Optional[str], int, bool]
+CLEAN_STATE: LexState = (None, 0, False)
+
+# (rule_id, line, message)
+ViolationKey = Tuple[str, int, str]
+
+_SPECIAL = re.compile(r"[#'\"\\()\[\]{}]")
+_STRING_PREFIX = set("rRbBuUfF")
+_CONTINUATION = re.compile(r"(else|elif|except|finally)\b")
+
+def _string_end(line: str, pos: int, quote: str) -> int:
+    """Offset just past the closing quote, or -1 if the string does not close on this line"""
+    while True:
+        end = line.find(quote, pos)
+        if end < 0:
+            return -1
+        escape = line.find('\\', pos, end)
+        if escape < 0:
+            return end + len(quote)
+        pos = escape + 2
+
+def lex_line(line: str, state: LexState) -> Tuple[List[Tuple[int, int]], LexState]:
+    """Comment and string spans of one line (same layout as AnalysisContext.non_code_spans) and the state after it"""
+    quote, depth, _ = state
+    n = len(line)
+    spans = []
+    pos = 0
+
+    if quote:
+        end = _string_end(line, 0, quote)
+        if end < 0:
+            if len(quote) == 3 or line.endswith('\\'):
+                return [(0, n + 1)], (quote, depth, False)
+            # Unterminated single-quoted string: it ends with the line
+            return [(0, n + 1)], (None, depth, False)
+        spans.append((0, end))
+        pos = end
+
+    while True:
+        m = _SPECIAL.search(line, pos)
+        if m is None:
+            break
+        ch = m.group()
+        at = m.start()
+
+        if ch == '#':
+            spans.append((at, n))
+            break
+        if ch == '"' or ch == "'":
+            start = at
+            while start > 0 and at - start < 2 and line[start - 1] in _STRING_PREFIX:
+                start -= 1
+            if start > 0 and (line[start - 1].isalnum() or line[start - 1] == '_'):
+                start = at
+            q = line[at:at + 3] if line[at:at + 3] in ('"""', "'''") else ch
+            end = _string_end(line, at + len(q), q)
+            if end < 0:
+                if len(q) == 3 or line.endswith('\\'):
+                    spans.append((start, n + 1))
+                    return spans, (q, depth, False)
+                # Unterminated single-quoted string: like tokenize, only the quote is an error token
+                pos = at + 1
+                continue
+            spans.append((start, end))
+            pos = end
+        elif ch == '\\':
+            if at == n - 1:
+                return spans, (None, depth, True)
+            pos = at + 1
+        elif ch in '([{':
+            depth += 1
+            pos = at + 1
+        else:
+            depth = max(0, depth - 1)
+            pos = at + 1
+
+    return spans, (None, depth, False)
+
+def _is_code_line(line: str) -> bool:
+    stripped = line.strip()
+    return bool(stripped) and not stripped.startswith('#')
+
+def _call_root(node: ast.Call) -> Optional[str]:
+    func = node.func
+    while isinstance(func, ast.Attribute):
+        func = func.value
+    return func.id if isinstance(func, ast.Name) else None
+
+def _valid_edit(edit) -> bool:
+    if not isinstance(edit, dict) or not isinstance(edit.get('text', ''), str):
+        return False
+    rng = edit.get('range')
+    if rng is None:
+        return True
+    try:
+        return all(isinstance(rng[end][key], int) for end in ('start', 'end') for key in ('line', 'character'))
+    except (KeyError, TypeError):
+        return False
+
+class _Block:
+    """Top-level statements (with the blank/comment lines after them), parsed on their own"""
+    __slots__ = ("start", "text", "tree", "matches", "aliases", "alias_deps", "index", "hotspots")
+
+    def __init__(self, start: int, text: Optional[str]):
+        self.start = start  # 0-based first line
+        self.text = text
+        self.tree: Optional[ast.Module] = None  # None when the block does not parse
+        self.matches: List[Tuple[str, int, str]] = []  # (rule_id, offset from start, message)
+        self.aliases: Dict[str, str] = {}  # import aliases this block adds
+        # Alias in effect before the block for each name its callees start with, e.g. "rq" for rq.get()
+        self.alias_deps: Dict[str, Optional[str]] = {}
+        self.index: Optional[ModuleIndex] = None  # call-graph index, lines relative to start
+        self.hotspots: List[Tuple[str, int, str]] = []  # complexity records, lines relative to start
+
+class LiveDocument:
+    def __init__(self, code: str, policies: List[Dict], false_positive_ids=()):
+        self.policies = policies
+        self.by_id = {p['id']: p for p in policies}
+        self.regex_policies = [p for p in policies if p.get('type') == 'regex']
+        self.patterns = [compile_pattern(p['pattern']) for p in self.regex_policies]
+        self.matcher = compile_queries(policies)
+        self.entropy_policies = [p for p in policies if p.get('type') == 'entropy']
+        self.graph_policies = [p for p in policies if p.get('type') == 'async_blocking']
+        self.complexity_policies = [p for p in policies if p.get('type') == 'complexity']
+        # Blocks are kept (and parsed) when AST queries, the call graph or the complexity estimate need them
+        self.has_ast = (any(p.get('type') == 'ast' for p in policies)
+                        or bool(self.graph_policies) or bool(self.complexity_policies))
+        self.false_positive_ids = set(false_positive_ids)
+        self.risk_engine = RiskEngine()
+
+        self.lines = code.split('\n')
+        self.states: List[LexState] = [CLEAN_STATE] * (len(self.lines) + 1)
+        self.spans: List[List[Tuple[int, int]]] = [[]] * len(self.lines)
+        self.hits: List[Tuple[int, ...]] = [()] * len(self.lines)
+        self.entropy_hits: List[Tuple[Tuple[str, str], ...]] = [()] * len(self.lines)  # (rule_id, message)
+        self.blocks: List[_Block] = [_Block(0, None)]
+        # Lines whose blocks still need re-chunking, held while the document ends inside
+        # an open string, bracket or continuation (nothing can parse until it is closed)
+        self._dirty: Optional[Tuple[int, int]] = None
+
+        self.stats = {"relexed_lines": 0, "reparsed_lines": 0}
+        self._relex(0, len(self.lines))
+        if self.has_ast:
+            self._update_blocks(0, len(self.lines))
+        self.counts = self._collect()
+        self._violations: Dict[ViolationKey, Violation] = {}
+
+    @property
+    def code(self) -> str:
+        return '\n'.join(self.lines)
+
+    # --- public API ---------------------------------------------------------
+
+    def snapshot(self) -> Dict:
+        """All current violations (in StaticAnalyzer order) with the risk score"""
+        # Regex policies in order, then AST matches, then entropy, call-graph and complexity policies in order
+        rank = {p['id']: i for i, p in enumerate(self.regex_policies)}
+        ast_rank = len(rank)
+        later = self.entropy_policies + self.graph_policies + self.complexity_policies
+        rank.update((p['id'], ast_rank + 1 + i) for i, p in enumerate(later))
+        keys = sorted(self.counts, key=lambda k: (rank.get(k[0], ast_rank), k[1]))
+        violations = [self._violation(k) for k in keys]
+        score, level = self._score()
+        return {"violations": violations, "risk_score": score, "risk_level": level}
+
+    def apply_edits(self, edits: List[Dict]) -> Dict:
+        """
+        Apply edits in order and return the violation delta against the state
+        before them: added violations, removed ids and moved ids (line shifts).
+        Each edit is {"range": {"start": {"line", "character"}, "end": {...}}, "text"}
+        with 0-based positions; an edit without "range" replaces the whole document.
+        """
+        started = time.perf_counter()
+        # Validate the whole batch first so a bad edit cannot leave it half applied
+        for edit in edits:
+            if not _valid_edit(edit):
+                raise ValueError(f"Malformed edit: {edit!r}")
+        old_counts = self.counts
+        applied = []
+        for edit in edits:
+            applied.append(self._apply(edit))
+
+        self.counts = self._collect()
+        delta = self._delta(old_counts, applied)
+        score, level = self._score()
+        delta.update(risk_score=score, risk_level=level,
+                     elapsed_ms=round((time.perf_counter() - started) * 1000, 3))
+        return delta
+
+    # --- edits --------------------------------------------------------------
+
+    def _apply(self, edit: Dict) -> Tuple[int, int, int]:
+        """Apply one edit; return (first line, old line count, new line count), 0-based"""
+        text = edit.get('text', '')
+        rng = edit.get('range')
+        if rng is None:
+            l1, c1 = 0, 0
+            l2 = len(self.lines) - 1
+            c2 = len(self.lines[l2])
+        else:
+            l1, c1 = self._position(rng['start'])
+            l2, c2 = self._position(rng['end'])
+            if (l2, c2) < (l1, c1):
+                l1, c1, l2, c2 = l2, c2, l1, c1
+
+        new_lines = (self.lines[l1][:c1] + text + self.lines[l2][c2:]).split('\n')
+        old_count = l2 - l1 + 1
+        new_count = len(new_lines)
+        shift = new_count - old_count
+
+        self.lines[l1:l2 + 1] = new_lines
+        self.spans[l1:l2 + 1] = [[]] * new_count
+        self.hits[l1:l2 + 1] = [()] * new_count
+        self.entropy_hits[l1:l2 + 1] = [()] * new_count
+        # Old states after the edit are kept (shifted) so re-lexing can stop once they agree again
+        self.states[l1 + 1:l2 + 2] = [None] * new_count
+
+        relexed_end = self._relex(l1, l1 + new_count)
+        if self.has_ast:
+            self._shift_blocks(l1, l2, shift)
+            lo, hi = l1, relexed_end
+            if self._dirty is not None:
+                # Carry the pending range through this edit
+                moved = lambda i: i + shift if i > l2 else min(i, l1 + new_count)
+                lo, hi = min(lo, moved(self._dirty[0])), max(hi, moved(self._dirty[1]))
+            self._update_blocks(lo, hi)
+        return l1, old_count, new_count
+
+    def _update_blocks(self, lo: int, hi: int):
+        if self.states[-1] != CLEAN_STATE:
+            self._dirty = (lo, hi)
+            return
+        self._dirty = None
+        # A changed decorator line decides whether the next code line starts a block
+        while hi < len(self.lines) and not _is_code_line(self.lines[hi]):
+            hi += 1
+        self._rechunk(lo, min(hi + 1, len(self.lines)))
+
+    def _position(self, pos: Dict) -> Tuple[int, int]:
+        line = min(max(int(pos.get('line', 0)), 0), len(self.lines) - 1)
+        col = min(max(int(pos.get('character', 0)), 0), len(self.lines[line]))
+        return line, col
+
+    # --- lexing and regex policies --------------------------------------------
+
+    def _relex(self, start: int, edited_end: int) -> int:
+        """
+        Re-lex from `start`; past `edited_end`, stop as soon as a line's start
+        state is unchanged. Returns the end of the re-lexed lines.
+        """
+        lines, states = self.lines, self.states
+        i = start
+        while i < len(lines):
+            spans, end_state = lex_line(lines[i], states[i])
+            self.spans[i] = spans
+            self.hits[i] = self._line_hits(lines[i], spans)
+            if self.entropy_policies:
+                self.entropy_hits[i] = self._entropy_hits(lines[i], spans)
+            i += 1
+            if i >= edited_end and states[i] == end_state:
+                break
+            states[i] = end_state
+        self.stats["relexed_lines"] += i - start
+        return i
+
+    def _line_hits(self, line: str, spans: List[Tuple[int, int]]) -> Tuple[int, ...]:
+        hits = []
+        for idx, pattern in enumerate(self.patterns):
+            for m in pattern.finditer(line):
+                col = m.start()
+                if not any(s <= col < e for s, e in spans):
+                    hits.append(idx)
+                    break
+        return tuple(hits)
+
+    def _entropy_hits(self, line: str, spans: List[Tuple[int, int]]) -> Tuple[Tuple[str, str], ...]:
+        # String literals opened and closed on this line; comments and continued strings are skipped
+        literals = [(0, line[s:e]) for s, e in spans if e <= len(line) and line[s] != '#']
+        if not literals:
+            return ()
+        return tuple((rule_id, message) for rule_id, _, message in scan_literals(literals, self.entropy_policies))
+
+    # --- AST blocks ---------------------------------------------------------
+
+    def _block_end(self, index: int) -> int:
+        return self.blocks[index + 1].start if index + 1 < len(self.blocks) else len(self.lines)
+
+    def _is_boundary(self, i: int) -> bool:
+        """
+        Line i starts a new top-level statement: clean lexical state, code at
+        column 0 (not a lone backslash continuation), not else/elif/except/finally
+        and not after a decorator. In
+        valid code every top-level statement starts on such a line.
+        """
+        if i == 0:
+            return True
+        line = self.lines[i]
+        if self.states[i] != CLEAN_STATE or not line or line[0] in ' \t#\\' or _CONTINUATION.match(line):
+            return False
+        for k in range(i - 1, -1, -1):
+            if _is_code_line(self.lines[k]):
+                return not self.lines[k].startswith('@')
+        return True
+
+    def _shift_blocks(self, l1: int, l2: int, shift: int):
+        """Keep block starts in step with an edit of old lines l1..l2"""
+        kept = []
+        for block in self.blocks:
+            if block.start > l2:
+                block.start += shift
+            elif block.start > l1:
+                continue  # its first line was edited away; it is re-chunked with the block before
+            kept.append(block)
+        self.blocks = kept
+
+    def _rechunk(self, lo: int, hi: int):
+        """Re-split the blocks covering lines lo..hi-1; only blocks whose text changed are re-parsed"""
+        blocks = self.blocks
+        starts = [b.start for b in blocks]
+        first = max(bisect.bisect_right(starts, lo) - 1, 0)
+        last = max(bisect.bisect_right(starts, max(hi - 1, lo)) - 1, first)
+        while first > 0 and not self._is_boundary(blocks[first].start):
+            first -= 1
+        while last + 1 < len(blocks) and not self._is_boundary(blocks[last + 1].start):
+            last += 1
+
+        region_start = blocks[first].start
+        region_end = self._block_end(last)
+        old: Dict[str, List[_Block]] = {}
+        for block in blocks[first:last + 1]:
+            old.setdefault(block.text, []).append(block)
+
+        cuts = [i for i in range(region_start + 1, region_end) if self._is_boundary(i)]
+        new_blocks, fresh = [], set()
+        for start, end in zip([region_start] + cuts, cuts + [region_end]):
+            text = '\n'.join(self.lines[start:end])
+            reused = old.get(text)
+            if reused:
+                block = reused.pop()
+                block.start = start
+            else:
+                block = _Block(start, text)
+                self.stats["reparsed_lines"] += end - start
+                try:
+                    block.tree = ast.parse(text)
+                except (SyntaxError, ValueError):
+                    pass
+                if block.tree is not None and self.graph_policies:
+                    block.index = ModuleIndex.from_tree(block.tree)
+                if block.tree is not None and self.complexity_policies:
+                    block.hotspots = hotspots(block.tree, self.complexity_policies)
+                fresh.add(id(block))
+            new_blocks.append(block)
+        blocks[first:last + 1] = new_blocks
+        self._rematch(first, fresh)
+
+    def _rematch(self, first: int, fresh: Set[int]):
+        """Match new blocks, and later blocks whose calls go through an import alias that changed"""
+        if not self.matcher.resolves_calls:
+            for block in self.blocks[first:]:
+                if id(block) in fresh:
+                    self._match(block, {})
+            return
+
+        aliases: Dict[str, str] = {}
+        for block in self.blocks[:first]:
+            aliases.update(block.aliases)
+        for block in self.blocks[first:]:
+            if id(block) in fresh or any(aliases.get(k) != v for k, v in block.alias_deps.items()):
+                self._match(block, dict(aliases))
+            # What a block imports does not depend on the aliases before it
+            aliases.update(block.aliases)
+
+    def _match(self, block: _Block, aliases: Dict[str, str]):
+        """Run the AST queries on one block, given the import aliases in effect before it"""
+        block.matches = []
+        block.aliases = {}
+        block.alias_deps = {}
+        if block.tree is None:
+            return
+        before = dict(aliases)
+        calls = self.matcher.run(block.tree, aliases)
+        block.matches = [(query.policy['id'], node.lineno - 1, query.message) for query, node in calls]
+        if self.matcher.resolves_calls:
+            block.aliases = {k: v for k, v in aliases.items() if before.get(k) != v}
+            roots = {_call_root(node) for node in ast.walk(block.tree) if isinstance(node, ast.Call)}
+            block.alias_deps = {root: before.get(root) for root in roots if root}
+
+    # --- results ------------------------------------------------------------
+
+    def _collect(self) -> Dict[ViolationKey, int]:
+        counts: Dict[ViolationKey, int] = {}
+        for i, hits in enumerate(self.hits):
+            for idx in hits:
+                p = self.regex_policies[idx]
+                key = (p['id'], i + 1, p['description'] + " detected")
+                counts[key] = 1
+        for i, hits in enumerate(self.entropy_hits):
+            for rule_id, message in hits:
+                counts[(rule_id, i + 1, message)] = 1
+
+        # A document that does not parse reports no AST violations, like StaticAnalyzer
+        if self.has_ast and self._dirty is None and all(b.tree is not None for b in self.blocks):
+            for block in self.blocks:
+                for rule_id, line, message in block.matches:
+                    key = (rule_id, block.start + line + 1, message)
+                    counts[key] = counts.get(key, 0) + 1
+            if self.graph_policies:
+                merged = ModuleIndex()
+                for block in self.blocks:
+                    merged.merge(block.index, block.start)
+                for key in CallGraph({"": merged}).violations(self.graph_policies)[""]:
+                    counts[key] = 1
+            for block in self.blocks:
+                for rule_id, line, message in block.hotspots:
+                    key = (rule_id, block.start + line, message)
+                    counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def _violation(self, key: ViolationKey) -> Violation:
+        v = self._violations.get(key)
+        if v is None:
+            rule_id, line, message = key
+            v = policy_violation(self.by_id[rule_id], line, message)
+            if v.id in self.false_positive_ids:
+                v.status = "FALSE_POSITIVE"
+            self._violations[key] = v
+        return v
+
+    def _score(self) -> Tuple[int, str]:
+        violations = []
+        for key, count in self.counts.items():
+            violations.extend([self._violation(key)] * count)
+        return self.risk_engine.calculate_score(violations, self.policies)
+
+    def _delta(self, old_counts: Dict[ViolationKey, int], applied: List[Tuple[int, int, int]]) -> Dict:
+        added, moved = [], []
+        unmatched = set(old_counts)
+
+        for key in self.counts:
+            rule_id, line, message = key
+            old_line = line
+            # Map the line back through the edits, newest first; edited lines map
+            # to the old line at the same position while there is one
+            for first, old_count, new_count in reversed(applied):
+                if old_line > first + new_count:
+                    old_line -= new_count - old_count
+                elif old_line > first + old_count:
+                    old_line = None
+                    break
+
+            old_key = (rule_id, old_line, message)
+            if old_line is not None and old_key in unmatched:
+                unmatched.discard(old_key)
+                if old_line != line:
+                    moved.append({"id": generate_violation_id(*old_key), "new_id": self._violation(key).id, "line": line})
+            else:
+                added.append(self._violation(key))
+
+        removed = [generate_violation_id(*key) for key in unmatched]
+        # Drop cached models of violations that no longer exist
+        if len(self._violations) > 2 * len(self.counts):
+            self._violations = {k: v for k, v in self._violations.items() if k in self.counts}
+        return {"added": added, "removed": removed, "moved": moved}
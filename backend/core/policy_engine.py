@@ -1,12 +1,35 @@
 import json
 import os
-from typing import List, Dict
+import hashlib
+import weakref
+from typing import List, Dict, Tuple
+
+# Workers started by backend.server turn this off and reload only when signalled
+POLICY_AUTO_RELOAD = os.getenv("POLICY_AUTO_RELOAD", "1") == "1"
 
 class PolicyEngine:
-    def __init__(self, rules_path: str = "backend/policies/rules.json"):
+    # Bumped by request_reload(); every live engine reloads before its next lookup
+    reload_generation = 0
+    _instances = weakref.WeakSet()
+
+    def __init__(self, rules_path: str = "backend/policies/rules.json", auto_reload: bool = POLICY_AUTO_RELOAD):
         self.rules_path = rules_path
+        self.auto_reload = auto_reload
         self._last_mtime = 0
+        self._generation = PolicyEngine.reload_generation
+        self.version = ""
         self.policies = self._load_policies()
+        PolicyEngine._instances.add(self)
+
+    def _read_rules(self) -> Tuple[str, List[Dict]]:
+        with open(self.rules_path, 'rb') as f:
+            print(f"Loading policies from {self.rules_path}...")
+            raw = f.read()
+        policies = json.loads(raw)
+        if not isinstance(policies, list):
+            raise ValueError("rules file must contain a list of policies")
+        # Content hash of the rules file identifies the policy snapshot
+        return hashlib.sha256(raw).hexdigest()[:16], policies
 
     def _load_policies(self) -> List[Dict]:
         try:
@@ -17,26 +40,58 @@ class PolicyEngine:
                     self.rules_path = "policies/rules.json"
                 else:
                     return []
-            
+
             # Check modification time
             mtime = os.path.getmtime(self.rules_path)
             self._last_mtime = mtime
-            
-            with open(self.rules_path, 'r') as f:
-                print(f"Loading policies from {self.rules_path}...")
-                return json.load(f)
+
+            self.version, policies = self._read_rules()
+            return policies
         except Exception as e:
             print(f"Error loading policies: {e}")
             return []
 
+    def reload(self) -> bool:
+        """Swap in the current rules file; on error keep serving the previous snapshot"""
+        try:
+            self._last_mtime = os.path.getmtime(self.rules_path)
+            version, policies = self._read_rules()
+        except Exception as e:
+            print(f"Error reloading policies, keeping version {self.version}: {e}")
+            return False
+
+        # In-flight reviews keep the list they already hold; new lookups see the new one
+        self.version, self.policies = version, policies
+        return True
+
+    @classmethod
+    def request_reload(cls):
+        """Ask every engine in this process to reload (safe to call from a signal handler)"""
+        cls.reload_generation += 1
+
+    @classmethod
+    def instances(cls) -> List["PolicyEngine"]:
+        return list(cls._instances)
+
     def _check_reload(self):
-        if os.path.exists(self.rules_path):
+        if self._generation != PolicyEngine.reload_generation:
+            self._generation = PolicyEngine.reload_generation
+            print("Policy reload requested. Reloading...")
+            self.reload()
+            return
+
+        if self.auto_reload and os.path.exists(self.rules_path):
             current_mtime = os.path.getmtime(self.rules_path)
             if current_mtime > self._last_mtime:
                 print("Policy file changed. Reloading...")
-                self.policies = self._load_policies()
+                self.reload()
 
     def get_policies(self, policy_ids: List[str]) -> List[Dict]:
         """Filter policies by ID"""
         self._check_reload()
         return [p for p in self.policies if p['id'] in policy_ids]
+
+    def snapshot(self) -> Tuple[str, List[Dict]]:
+        """Return the current policy version together with all loaded policies"""
+        self._check_reload()
+        return self.version, self.policies
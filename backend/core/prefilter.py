@@ -0,0 +1,219 @@
+"""
+Literal prefilter for regex policies.
+
+Most policy patterns cannot match without one of a few literal substrings
+(`time.sleep`, `requests.get`, `api_key`, ...). required_literals() derives
+such a set from the parsed pattern, and LiteralPrefilter finds every
+occurrence of every policy's literals in one pass over the source, so each
+regex only runs on the lines that contain one of its literals. Patterns
+without a usable literal run on every line, as before.
+
+The pass uses pyahocorasick when it is installed and otherwise a single
+trie-shaped regex alternation, which the re engine scans in C.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import re._parser as sre_parse
+    from re._constants import (
+        AT, ATOMIC_GROUP, BRANCH, LITERAL, MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT, SUBPATTERN
+    )
+except ImportError:  # pragma: no cover - Python < 3.11
+    import sre_parse
+    from sre_constants import AT, BRANCH, LITERAL, MAX_REPEAT, MIN_REPEAT, SUBPATTERN
+    ATOMIC_GROUP = POSSESSIVE_REPEAT = None
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional speedup
+    ahocorasick = None
+
+# Shorter literals occur on too many lines to be worth gating on
+MIN_LITERAL_LENGTH = 3
+
+def required_literals(pattern: str) -> Optional[Tuple[Set[str], bool]]:
+    """
+    A set of literals at least one of which occurs in every match of the
+    pattern, and whether it matches case-insensitively (the literals are then
+    lowercased); None if no literal of MIN_LITERAL_LENGTH is required.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+
+    ignore_case = bool(parsed.state.flags & re.IGNORECASE) or _has_inline_ignore_case(parsed)
+    literals = _required(parsed)
+    if not literals or min(map(len, literals)) < MIN_LITERAL_LENGTH:
+        return None
+    if ignore_case:
+        literals = {lit.lower() for lit in literals}
+    return literals, ignore_case
+
+def _has_inline_ignore_case(items) -> bool:
+    for op, av in items:
+        if op is SUBPATTERN:
+            if av[1] & re.IGNORECASE or _has_inline_ignore_case(av[3]):
+                return True
+        elif op is BRANCH:
+            if any(_has_inline_ignore_case(branch) for branch in av[1]):
+                return True
+        elif op in (MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT):
+            if _has_inline_ignore_case(av[2]):
+                return True
+        elif op is ATOMIC_GROUP:
+            if _has_inline_ignore_case(av):
+                return True
+    return False
+
+def _required(items) -> Optional[Set[str]]:
+    """Best required literal set of a sequence: the one whose shortest literal is longest"""
+    best: Optional[Set[str]] = None
+    run: List[str] = []
+
+    def consider(candidates: Optional[Set[str]]):
+        nonlocal best
+        if not candidates:
+            return
+        key = (min(map(len, candidates)), -len(candidates))
+        if best is None or key > (min(map(len, best)), -len(best)):
+            best = candidates
+
+    for op, av in items:
+        if op is LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            consider({''.join(run)})
+            run = []
+        if op is SUBPATTERN:
+            consider(_required(av[3]))
+        elif op is BRANCH:
+            branches = [_required(branch) for branch in av[1]]
+            if all(branches):
+                consider(set().union(*branches))
+        elif op in (MAX_REPEAT, MIN_REPEAT, POSSESSIVE_REPEAT) and av[0] >= 1:
+            consider(_required(av[2]))
+        elif op is ATOMIC_GROUP:
+            consider(_required(av))
+        # Anything else (classes, anchors, lookarounds, backreferences) requires no literal
+    if run:
+        consider({''.join(run)})
+    return best
+
+class _LiteralScanner:
+    """Finds every occurrence (overlapping ones included) of a set of literals"""
+    def __init__(self, literals: Dict[str, Set[int]]):
+        self.literals = literals
+        self._automaton = None
+        self._regex = None
+        if not literals:
+            return
+
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for literal, policies in literals.items():
+                automaton.add_word(literal, (len(literal), frozenset(policies)))
+            automaton.make_automaton()
+            self._automaton = automaton
+        else:
+            # At one position the regex reports only the longest literal; the
+            # literals that are its prefixes match there too
+            self._prefix_policies = {
+                literal: frozenset().union(*(p for other, p in literals.items() if literal.startswith(other)))
+                for literal in literals
+            }
+            self._regex = re.compile(_trie_regex(literals))
+
+    def occurrences(self, text: str) -> Iterable[Tuple[int, frozenset]]:
+        """(start offset, policy indices) for each literal occurrence"""
+        if self._automaton is not None:
+            for end, (length, policies) in self._automaton.iter(text):
+                yield end - length + 1, policies
+        elif self._regex is not None:
+            search = self._regex.search
+            m = search(text)
+            while m is not None:
+                yield m.start(), self._prefix_policies[m.group()]
+                m = search(text, m.start() + 1)
+
+def _trie_regex(literals: Iterable[str]) -> str:
+    trie: Dict = {}
+    for literal in literals:
+        node = trie
+        for ch in literal:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node) -> str:
+        # Longer continuations are tried before ending here, so the longest literal wins
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if '' in node:
+            branches.append('')
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+class LiteralPrefilter:
+    """Candidate lines per regex policy, from one literal pass over the source"""
+    def __init__(self, patterns: List[str]):
+        self.unfiltered: Set[int] = set()  # policy indices that run on every line
+        exact: Dict[str, Set[int]] = {}
+        folded: Dict[str, Set[int]] = {}
+        for index, pattern in enumerate(patterns):
+            required = required_literals(pattern)
+            if required is None:
+                self.unfiltered.add(index)
+                continue
+            literals, ignore_case = required
+            target = folded if ignore_case else exact
+            for literal in literals:
+                target.setdefault(literal, set()).add(index)
+
+        self.n_policies = len(patterns)
+        self._exact = _LiteralScanner(exact)
+        self._folded = _LiteralScanner(folded)
+        self._folded_policies = set().union(*folded.values()) if folded else set()
+
+    def candidate_lines(self, code: str) -> List[Optional[List[int]]]:
+        """
+        Per policy index, the sorted 0-based lines that contain one of its
+        literals, or None when the policy has to run on every line.
+        """
+        lines: List[Optional[Set[int]]] = [None if i in self.unfiltered else set() for i in range(self.n_policies)]
+        self._collect(self._exact, code, lines)
+        if self._folded_policies:
+            if code.isascii():
+                self._collect(self._folded, code.lower(), lines)
+            else:
+                # Case-insensitive regexes also equate some non-ASCII letters
+                # with ASCII ones, which lowercasing does not reproduce
+                for index in self._folded_policies:
+                    lines[index] = None
+        return [sorted(found) if found is not None else None for found in lines]
+
+    @staticmethod
+    def _collect(scanner: _LiteralScanner, text: str, lines: List[Optional[Set[int]]]):
+        line, counted = 0, 0
+        for start, policies in scanner.occurrences(text):
+            line += text.count('\n', counted, start)
+            counted = start
+            for index in policies:
+                found = lines[index]
+                if found is not None:
+                    found.add(line)
+
+_prefilters: Dict[Tuple[str, ...], LiteralPrefilter] = {}
+
+def compile_prefilter(patterns: List[str]) -> LiteralPrefilter:
+    """Build the prefilter for a list of regex patterns once"""
+    key = tuple(patterns)
+    prefilter = _prefilters.get(key)
+    if prefilter is None:
+        if len(_prefilters) > 64:
+            _prefilters.clear()
+        prefilter = _prefilters[key] = LiteralPrefilter(patterns)
+    return prefilter
@@ -0,0 +1,203 @@
+"""
+In-process sampling stack profiler for live workers.
+
+A background thread wakes every `interval` seconds and records the Python
+stack of every other thread from sys._current_frames(); nothing is traced, so
+the overhead is bounded by the sampling rate. Code on the review pipeline marks
+what it is doing with `tag(stage, rule_id)`; each sample is prefixed with the
+tags of its thread, so profiles can be split by pipeline stage and policy.
+Tagging is a flag check while no profile is running.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+# Frames deeper than this are cut off at the root end
+MAX_STACK_DEPTH = 128
+
+# Leaf frames of threads that are parked, not working
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+# thread ident -> (stage, rule_id) while a profile is running
+_tags: Dict[int, Tuple[str, Optional[str]]] = {}
+_active: Optional["SamplingProfiler"] = None
+_lock = threading.Lock()
+
+class tag:
+    """Context manager marking the current thread's pipeline stage (and rule) for the profiler"""
+    __slots__ = ("stage", "rule_id", "ident", "previous")
+
+    def __init__(self, stage: str, rule_id: Optional[str] = None):
+        self.stage = stage
+        self.rule_id = rule_id
+        self.ident = None
+
+    def __enter__(self):
+        if _active is not None:
+            self.ident = threading.get_ident()
+            self.previous = _tags.get(self.ident)
+            _tags[self.ident] = (self.stage, self.rule_id)
+        return self
+
+    def __exit__(self, *exc):
+        # Tags left over from a profile that has since finished are not restored
+        if self.ident is not None and _active is not None:
+            if self.previous is None:
+                _tags.pop(self.ident, None)
+            else:
+                _tags[self.ident] = self.previous
+        return False
+
+def active_profiler() -> Optional["SamplingProfiler"]:
+    return _active
+
+def note_request():
+    """Called when a review request finishes, for profiles limited to the next K requests"""
+    profiler = _active
+    if profiler is not None:
+        profiler.note_request()
+
+class ProfilerBusy(Exception):
+    pass
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack until stop(), `seconds` elapse or `requests`
+    review requests finish. With `requests`, only samples taken inside tagged
+    pipeline code are kept, so idle time between requests does not dilute them.
+    """
+    def __init__(self, seconds: float = 10, requests: Optional[int] = None,
+                 interval: float = PROFILER_INTERVAL_MS / 1000):
+        self.seconds = min(max(seconds, 0.01), PROFILER_MAX_SECONDS)
+        self.requests = requests
+        self.interval = max(interval, 0.001)
+        self.samples: Counter = Counter()  # stack tuple (root first) -> sample count
+        self.sample_count = 0
+        self.requests_done = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self.done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._frame_names: Dict[object, str] = {}
+
+    def start(self):
+        global _active
+        with _lock:
+            if _active is not None:
+                raise ProfilerBusy("A profile is already running in this worker")
+            _active = self
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.done.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def note_request(self):
+        self.requests_done += 1
+        if self.requests is not None and self.requests_done >= self.requests:
+            self.done.set()
+
+    def _run(self):
+        global _active
+        own = threading.get_ident()
+        deadline = self.started + self.seconds
+        try:
+            while not self.done.wait(self.interval):
+                if time.perf_counter() >= deadline:
+                    break
+                self._sample(own)
+        finally:
+            self.elapsed = time.perf_counter() - self.started
+            with _lock:
+                _active = None
+                _tags.clear()
+            self.done.set()
+
+    def _sample(self, own: int):
+        tagged_only = self.requests is not None
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            tags = _tags.get(ident)
+            if tags is None and tagged_only:
+                continue
+            code = frame.f_code
+            if tags is None and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                continue
+
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(self._frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            if tags is not None:
+                stage, rule_id = tags
+                prefix = [f"[stage:{stage}]"] + ([f"[rule:{rule_id}]"] if rule_id else [])
+                stack = prefix + stack
+            self.samples[tuple(stack)] += 1
+            self.sample_count += 1
+
+    def _frame_name(self, code) -> str:
+        name = self._frame_names.get(code)
+        if name is None:
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            name = self._frame_names[code] = f"{module}.{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+        return name
+
+    # --- output ---------------------------------------------------------------
+
+    def collapsed(self) -> str:
+        """Folded stacks ("frame;frame;frame count" per line) for flamegraph.pl, speedscope and others"""
+        lines = [";".join(stack) + f" {count}" for stack, count in self.samples.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "worker") -> Dict:
+        """The samples in speedscope's file format (one sampled profile, weights in seconds)"""
+        frames: List[Dict] = []
+        index: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.most_common():
+            ids = []
+            for frame in stack:
+                i = index.get(frame)
+                if i is None:
+                    i = index[frame] = len(frames)
+                    label, _, location = frame.partition(" (")
+                    entry = {"name": label}
+                    if location:
+                        path, _, line = location.rstrip(")").rpartition(":")
+                        entry.update(file=path, line=int(line))
+                    frames.append(entry)
+                ids.append(i)
+            samples.append(ids)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "policy-reviewer-profiler",
+            "name": name,
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import marshal
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# Unset disables the on-disk cache
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH")
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Bump when the record layout changes so old entries are never decoded
+CACHE_FORMAT = 1
+# Values larger than this are zlib-compressed
+COMPRESS_THRESHOLD = 512
+# Recency is tracked at minute granularity to keep reads mostly read-only
+TOUCH_INTERVAL = 60
+# The total size is re-checked every this many writes
+EVICTION_CHECK_INTERVAL = 64
+
+# (rule_id, line, message)
+Record = Tuple[str, int, str]
+
+_fingerprints: Dict[Tuple[int, ...], Tuple[List[Dict], str]] = {}
+
+def policy_fingerprint(policies: List[Dict]) -> str:
+    """Stable hash of the active policy definitions (memoized per policy set)"""
+    key = tuple(id(p) for p in policies)
+    cached = _fingerprints.get(key)
+    if cached is not None and all(a is b for a, b in zip(cached[0], policies)):
+        return cached[1]
+
+    digest = hashlib.sha256(
+        json.dumps(sorted(policies, key=lambda p: p.get('id', '')), sort_keys=True).encode()
+    ).hexdigest()
+    if len(_fingerprints) > 64:
+        _fingerprints.clear()
+    _fingerprints[key] = (list(policies), digest)
+    return digest
+
+class ResultCache:
+    """
+    SQLite-backed cache of analysis results shared by every worker process on
+    the host and surviving restarts. WAL mode lets readers proceed while one
+    writer commits; each process and thread opens its own connection. Values
+    are marshal-encoded record tuples, compressed when large, and the total
+    size is checked every EVICTION_CHECK_INTERVAL writes and brought back
+    under max_bytes by evicting least-recently-used entries.
+    """
+    def __init__(self, path: str, max_bytes: int = ANALYSIS_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._conn()  # create the schema eagerly so configuration errors surface at startup
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited across fork must not be reused
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def key(self, content_hash: str, policies: List[Dict], namespace: str = "sha256") -> str:
+        return f"{CACHE_FORMAT}:{namespace}:{content_hash}:{policy_fingerprint(policies)}"
+
+    def get(self, key: str) -> Optional[List[Record]]:
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, last_used FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, last_used = row
+            now = int(time.time())
+            if now - last_used > TOUCH_INTERVAL:
+                conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            return _decode(value)
+        except (sqlite3.Error, ValueError, EOFError, TypeError, zlib.error) as e:
+            # A busy or damaged cache must never fail the review itself
+            print(f"Analysis cache read failed: {e}")
+            return None
+
+    def put(self, key: str, records: List[Record]):
+        value = _encode(records)
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, len(value) + len(key), int(time.time())),
+            )
+            self._writes += 1
+            if self._writes % EVICTION_CHECK_INTERVAL == 0:
+                self.evict()
+        except sqlite3.Error as e:
+            print(f"Analysis cache write failed: {e}")
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache is under 90% of max_bytes"""
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * 0.9)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT key, size FROM results ORDER BY last_used").fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                stale.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM results WHERE key = ?", stale)
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+
+def _encode(records: List[Record]) -> bytes:
+    raw = marshal.dumps([tuple(r) for r in records])
+    if len(raw) > COMPRESS_THRESHOLD:
+        return b"z" + zlib.compress(raw)
+    return b"m" + raw
+
+def _decode(value: bytes) -> List[Record]:
+    raw = zlib.decompress(value[1:]) if value[:1] == b"z" else value[1:]
+    return marshal.loads(raw)
+
+_result_cache: Optional[ResultCache] = None
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide cache configured by ANALYSIS_CACHE_PATH, or None when disabled"""
+    global _result_cache
+    if _result_cache is None and ANALYSIS_CACHE_PATH:
+        _result_cache = ResultCache(ANALYSIS_CACHE_PATH)
+    return _result_cache
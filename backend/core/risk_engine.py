@@ -1,25 +1,58 @@
-from typing import List, Tuple
-from backend.models.schemas import Violation
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+# NumPy is only needed by the batch paths and is imported there, keeping it off the startup path;
+# scoring only reads violation attributes, so the pydantic models are not imported either
+if TYPE_CHECKING:
+    import numpy as np
+    from backend.models.schemas import Violation
+
+DEFAULT_WEIGHTS = {
+    "HIGH": 20,
+    "MEDIUM": 10,
+    "LOW": 5
+}
+UNKNOWN_SEVERITY_WEIGHT = 5
+
+# Column encodings for batch scoring
+SEVERITY_CODES = {"HIGH": 0, "MEDIUM": 1, "LOW": 2}
+UNKNOWN_SEVERITY_CODE = 3
+STATUS_CODES = {"OPEN": 0, "FALSE_POSITIVE": 1}
+
+RISK_LEVELS = ("HIGH RISK", "MEDIUM RISK", "LOW RISK")
+
+def rule_weights_from_policies(policies: Optional[List[Dict]]) -> Dict[str, int]:
+    """Per-rule deductions configured with "risk_weight" in rules.json"""
+    return {p['id']: int(p['risk_weight']) for p in policies or [] if 'risk_weight' in p}
+
+class BatchRiskScores:
+    def __init__(self, file_scores: "np.ndarray", file_levels: "np.ndarray",
+                 dir_scores: Optional["np.ndarray"] = None, dir_levels: Optional["np.ndarray"] = None):
+        self.file_scores = file_scores
+        self.file_levels = file_levels
+        self.dir_scores = dir_scores
+        self.dir_levels = dir_levels
 
 class RiskEngine:
-    def calculate_score(self, violations: List[Violation]) -> Tuple[int, str]:
+    def __init__(self, weights: Optional[Dict[str, int]] = None):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            self.weights.update({k.upper(): v for k, v in weights.items()})
+
+    def calculate_score(self, violations: List["Violation"], policies: Optional[List[Dict]] = None) -> Tuple[int, str]:
         score = 100
-        
-        weights = {
-            "HIGH": 20,
-            "MEDIUM": 10,
-            "LOW": 5
-        }
-        
+        rule_weights = rule_weights_from_policies(policies)
+
         for v in violations:
             if v.status == "FALSE_POSITIVE":
                 continue
 
-            deduction = weights.get(v.severity.upper(), 5)
+            deduction = rule_weights.get(v.rule_id)
+            if deduction is None:
+                deduction = self.weights.get(v.severity.upper(), UNKNOWN_SEVERITY_WEIGHT)
             score -= deduction
-            
+
         score = max(0, score)
-        
+
         # Determine level
         if score >= 80:
             level = "LOW RISK"
@@ -27,5 +60,95 @@ class RiskEngine:
             level = "MEDIUM RISK"
         else:
             level = "HIGH RISK"
-            
+
         return score, level
+
+    def score_batch(
+        self,
+        file_ids: "np.ndarray",
+        severity_codes: "np.ndarray",
+        statuses: "np.ndarray",
+        n_files: Optional[int] = None,
+        rule_codes: Optional["np.ndarray"] = None,
+        rule_weights: Optional["np.ndarray"] = None,
+        file_dirs: Optional["np.ndarray"] = None,
+    ) -> BatchRiskScores:
+        """
+        Score many files at once from columnar violation data.
+
+        file_ids, severity_codes (SEVERITY_CODES) and statuses (STATUS_CODES)
+        are parallel arrays with one entry per violation. rule_codes/rule_weights
+        optionally override the severity weight per rule (-1 means no override).
+        file_dirs maps each file id to a directory id; directory scores are the
+        mean of their files' scores.
+        """
+        import numpy as np
+
+        file_ids = np.asarray(file_ids, dtype=np.int64)
+        severity_codes = np.asarray(severity_codes, dtype=np.int64)
+        if n_files is None:
+            n_files = int(file_ids.max()) + 1 if file_ids.size else 0
+
+        severity_weights = np.array([
+            self.weights.get("HIGH", UNKNOWN_SEVERITY_WEIGHT),
+            self.weights.get("MEDIUM", UNKNOWN_SEVERITY_WEIGHT),
+            self.weights.get("LOW", UNKNOWN_SEVERITY_WEIGHT),
+            UNKNOWN_SEVERITY_WEIGHT,
+        ], dtype=np.int64)
+        deductions = severity_weights[np.clip(severity_codes, 0, UNKNOWN_SEVERITY_CODE)]
+
+        if rule_codes is not None and rule_weights is not None:
+            overrides = np.asarray(rule_weights, dtype=np.int64)[np.asarray(rule_codes, dtype=np.int64)]
+            deductions = np.where(overrides >= 0, overrides, deductions)
+
+        # False positives do not count against the score
+        deductions = deductions * (np.asarray(statuses) != STATUS_CODES["FALSE_POSITIVE"])
+
+        per_file = np.bincount(file_ids, weights=deductions, minlength=n_files)[:n_files]
+        file_scores = np.maximum(0, 100 - per_file).astype(np.int64)
+        result = BatchRiskScores(file_scores, self.levels(file_scores))
+
+        if file_dirs is not None:
+            file_dirs = np.asarray(file_dirs, dtype=np.int64)
+            totals = np.bincount(file_dirs, weights=file_scores)
+            counts = np.bincount(file_dirs)
+            dir_scores = np.rint(totals / np.maximum(counts, 1)).astype(np.int64)
+            result.dir_scores = dir_scores
+            result.dir_levels = self.levels(dir_scores)
+
+        return result
+
+    def levels(self, scores: "np.ndarray") -> "np.ndarray":
+        """Vectorized form of the thresholds used by calculate_score"""
+        import numpy as np
+
+        idx = (scores >= 50).astype(np.int64) + (scores >= 80)
+        return np.array(RISK_LEVELS)[idx]
+
+    def score_groups(self, groups: Sequence[List["Violation"]], policies: Optional[List[Dict]] = None) -> List[Tuple[int, str]]:
+        """Score several violation lists (e.g. old/new/scoped) in one batch pass"""
+        import numpy as np
+
+        rule_index: Dict[str, int] = {}
+        file_ids, severity_codes, statuses, rule_codes = [], [], [], []
+        for group_id, violations in enumerate(groups):
+            for v in violations:
+                file_ids.append(group_id)
+                severity_codes.append(SEVERITY_CODES.get(v.severity.upper(), UNKNOWN_SEVERITY_CODE))
+                statuses.append(STATUS_CODES.get(v.status, 0))
+                rule_codes.append(rule_index.setdefault(v.rule_id, len(rule_index)))
+
+        configured = rule_weights_from_policies(policies)
+        rule_weights = np.array(
+            [configured.get(rule_id, -1) for rule_id in rule_index] or [-1], dtype=np.int64
+        )
+
+        scores = self.score_batch(
+            np.array(file_ids, dtype=np.int64),
+            np.array(severity_codes, dtype=np.int64),
+            np.array(statuses, dtype=np.int64),
+            n_files=len(groups),
+            rule_codes=np.array(rule_codes, dtype=np.int64),
+            rule_weights=rule_weights,
+        )
+        return [(int(s), str(l)) for s, l in zip(scores.file_scores, scores.file_levels)]
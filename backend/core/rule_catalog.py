@@ -0,0 +1,77 @@
+import json
+import hashlib
+from typing import Dict, List, Optional, Tuple
+from backend.core.policy_engine import PolicyEngine
+
+# Bound on the number of distinct remediation bodies kept per policy version
+MAX_CACHED_REMEDIATIONS = 256
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against an ETag (weak comparison, RFC 9110)"""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(',')]
+    if "*" in candidates:
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    return any((c[2:] if c.startswith('W/') else c) == bare for c in candidates)
+
+class RuleCatalog:
+    """
+    Serialized views of the loaded policy snapshot, rebuilt only when the
+    policy version changes. Bodies are stored as bytes so handlers can serve
+    them (or a 304) without touching Pydantic or the JSON encoder.
+    """
+    def __init__(self, policy_engine: PolicyEngine):
+        self.policy_engine = policy_engine
+        self.version = None
+        self.catalog_body = b""
+        self.catalog_etag = ""
+        self.remediations: Dict[str, Dict] = {}
+        self._remediation_bodies: Dict[Tuple[str, ...], Tuple[bytes, str]] = {}
+
+    def _refresh(self):
+        version, policies = self.policy_engine.snapshot()
+        if version == self.version:
+            return
+
+        self.catalog_body = json.dumps({"version": version, "rules": policies}).encode()
+        self.catalog_etag = f'"{version}"'
+
+        # Remediation guidance is derived from the policy fields, not a separate KB
+        self.remediations = {
+            p['id']: {
+                "violation_rule_id": p['id'],
+                "suggestion": p.get('fix_recommendation') or "",
+                "example_fix": p.get('secure_code_example') or "",
+                "reason": p.get('risk_explanation') or ""
+            }
+            for p in policies
+            if p.get('fix_recommendation')
+        }
+        self._remediation_bodies = {}
+        self.version = version
+
+    def catalog(self) -> Tuple[bytes, str]:
+        """Return the serialized rule catalog and its strong ETag"""
+        self._refresh()
+        return self.catalog_body, self.catalog_etag
+
+    def remediation(self, rule_ids: List[str]) -> Tuple[bytes, str]:
+        """Return the serialized suggestions for the given rule ids and their strong ETag"""
+        self._refresh()
+
+        # De-duplicate violations by rule_id to avoid repetitive advice
+        key = tuple(dict.fromkeys(r for r in rule_ids if r in self.remediations))
+        cached = self._remediation_bodies.get(key)
+        if cached is not None:
+            return cached
+
+        body = json.dumps([self.remediations[r] for r in key]).encode()
+        digest = hashlib.sha256(",".join(key).encode()).hexdigest()[:12]
+        entry = (body, f'"{self.version}-{digest}"')
+
+        if len(self._remediation_bodies) >= MAX_CACHED_REMEDIATIONS:
+            self._remediation_bodies.clear()
+        self._remediation_bodies[key] = entry
+        return entry
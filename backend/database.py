@@ -17,3 +17,18 @@ def get_db():
         yield db
     finally:
         db.close()
+
+_initialized = False
+
+def init_db():
+    """Create any missing tables for the registered models (once per process and its forks)"""
+    global _initialized
+    if _initialized:
+        return
+    # Import models so they are registered on Base.metadata
+    from backend.models import user, feedback, audit  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+    _initialized = True
+
+if __name__ == "__main__":
+    init_db()
@@ -0,0 +1,94 @@
+"""
+Review the Python files changed between two commits of a local repository.
+
+    python -m backend.git_review main..feature
+    python -m backend.git_review v1.2 HEAD --repo ../service --json
+
+Only local git plumbing is used. Results are cached per blob and policy set
+in <git dir>/policy-review-cache.db (or ANALYSIS_CACHE_PATH), so unchanged
+blobs, e.g. after a rebase, are never analyzed twice.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policies", "rules.json")
+
+def parse_range(refs):
+    """`A..B`, `A B` or `A` (against HEAD) -> (base, head)"""
+    if len(refs) == 1 and '..' in refs[0]:
+        base, _, head = refs[0].partition('..')
+        return base or "HEAD", head or "HEAD"
+    if len(refs) == 1:
+        return refs[0], "HEAD"
+    return refs[0], refs[1]
+
+def format_report(result) -> str:
+    lines = [f"Reviewing {result['base'][:12]}..{result['head'][:12]}"]
+    for f in result["files"]:
+        lines.append(f"{f.path}: {f.base_score} -> {f.head_score} ({f.delta:+d}) {f.head_level}")
+        for v in sorted(f.head, key=lambda v: v.line):
+            lines.append(f"    {f.path}:{v.line}: [{v.severity}] {v.rule_id}: {v.message}")
+    stats = result["stats"]
+    lines.append(
+        f"Total: {result['base_score']} -> {result['head_score']} ({result['delta']:+d}) {result['head_level']}"
+        f" | {len(result['files'])} files, {stats['blobs']} blobs, {stats['cached']} cached, {stats['analyzed']} analyzed"
+    )
+    return "\n".join(lines)
+
+def to_json(result) -> dict:
+    return {
+        **{k: v for k, v in result.items() if k != "files"},
+        "files": [{
+            "path": f.path,
+            "base_blob": f.base_sha,
+            "head_blob": f.head_sha,
+            "base_score": f.base_score,
+            "head_score": f.head_score,
+            "head_level": f.head_level,
+            "delta": f.delta,
+            "violations": [v.to_model().model_dump() for v in f.head],
+        } for f in result["files"]],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("refs", nargs="+", help="BASE..HEAD, BASE HEAD, or BASE (against HEAD)")
+    parser.add_argument("--repo", default=".", help="repository to review")
+    parser.add_argument("--policies", help="comma-separated policy ids (default: all)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="parallel analysis processes")
+    parser.add_argument("--no-cache", action="store_true", help="analyze every blob")
+    parser.add_argument("--fail-under", type=int, help="exit 1 if the head score is below this")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    from backend.core.git_plumbing import GitError, GitRepo
+    from backend.core.git_review import RangeReview
+    from backend.core.policy_engine import PolicyEngine
+    from backend.core.result_cache import ResultCache
+
+    # Keep stdout clean for --json
+    with contextlib.redirect_stdout(sys.stderr):
+        engine = PolicyEngine(rules_path=RULES_PATH, auto_reload=False)
+    policies = engine.get_policies(args.policies.split(',')) if args.policies else engine.policies
+
+    repo = GitRepo(args.repo)
+    try:
+        cache = None
+        if not args.no_cache:
+            cache = ResultCache(repo.local_cache_path())
+        base, head = parse_range(args.refs)
+        result = RangeReview(repo, policies, cache=cache, jobs=args.jobs).review(base, head)
+    except GitError as e:
+        print(f"git: {e}", file=sys.stderr)
+        return 2
+
+    print(json.dumps(to_json(result)) if args.json else format_report(result))
+    if args.fail_under is not None and result["head_score"] < args.fail_under:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
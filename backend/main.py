@@ -1,26 +1,88 @@
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from datetime import datetime
-import uvicorn
+from contextlib import asynccontextmanager
+import asyncio
 import os
+import time
+from typing import Dict, List, Optional, Union
 
-from backend.models.schemas import ReviewRequest, ReviewResponse, AuditSummary
+from backend.models.schemas import AIInsight, ReviewRequest, ReviewResponse, AuditSummary
 from backend.core.policy_engine import PolicyEngine
-from backend.core.analyzer import StaticAnalyzer
+from backend.core.analysis_context import AnalysisContext, get_context
+from backend.core.analyzer import StaticAnalyzer, compile_pattern, to_models
+from backend.core.ast_query import compile_queries
+from backend.core.audit_log import get_audit_log
+from backend.core.deadline import Deadline
+from backend.core.ingest import split_policy_ids
+from backend.core.prefilter import compile_prefilter
+from backend.core.job_queue import JOB_WORKERS, MAX_JOB_BODY_BYTES, JobWorkerPool
+from backend.core.result_cache import Record
 from backend.core.risk_engine import RiskEngine
-from backend.routers import auth, remediation, feedback, review, export
-from backend.database import engine, Base, get_db
-from backend.routers.auth import get_current_user
+from backend.routers import auth, remediation, feedback, review, export, rules, health, live, admin, jobs
+from backend.database import init_db, get_db
+from backend.routers.admission import (
+    admit_review, check_deadline, check_source_limits, partial_headers, review_deadline, upload_deadline,
+    ReviewBodyLimitMiddleware
+)
+from backend.routers.responses import fast_json_response
+from backend.routers.uploads import read_upload
 from backend.models.feedback import Feedback
 from sqlalchemy.orm import Session
 from fastapi import Depends
+from starlette.concurrency import run_in_threadpool
+
+def warm_up():
+    """
+    Compile every loaded policy and build the rule catalog. backend.server runs
+    this in the parent before forking so workers share the result copy-on-write.
+    """
+    for policy_source in PolicyEngine.instances():
+        _, policies = policy_source.snapshot()
+        for p in policies:
+            if p.get('type') == 'regex':
+                compile_pattern(p['pattern'])
+                compile_pattern(p['pattern'], as_bytes=True)
+        compile_prefilter([p['pattern'] for p in policies if p.get('type') == 'regex'])
+        compile_queries(policies)
+    rules.rule_catalog.catalog()
+
+def start_job_workers():
+    """
+    Review job workers for a server running as a single process; under
+    backend.server the master runs them (JOB_WORKERS_MANAGED is set).
+    """
+    if JOB_WORKERS <= 0 or os.getenv("JOB_WORKERS_MANAGED"):
+        return None, None
+    pool = JobWorkerPool(JOB_WORKERS)
+    pool.start()
+
+    async def supervise():
+        while True:
+            await asyncio.sleep(1)
+            pool.supervise()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+    return pool, asyncio.create_task(supervise())
 
-app = FastAPI(title="Policy-Aware AI Code Reviewer")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema creation is an explicit startup step rather than an import side effect
+    init_db()
+    warm_up()
+    job_pool, supervisor = start_job_workers()
+    audit_log.start()
+    health.state["ready"] = True
+    yield
+    # Fail readiness first so load balancers stop routing while in-flight requests finish
+    health.state["draining"] = True
+    if job_pool is not None:
+        supervisor.cancel()
+        await run_in_threadpool(job_pool.stop)
+    # Reviews finished by now are all buffered; write them before the worker exits
+    await run_in_threadpool(audit_log.stop)
+
+app = FastAPI(title="Policy-Aware AI Code Reviewer", lifespan=lifespan)
 
 # Include Routers
 app.include_router(auth.router)
@@ -28,6 +90,11 @@ app.include_router(remediation.router)
 app.include_router(feedback.router)
 app.include_router(review.router)
 app.include_router(export.router)
+app.include_router(rules.router)
+app.include_router(health.router)
+app.include_router(live.router)
+app.include_router(admin.router)
+app.include_router(jobs.router)
 
 # CORS
 app.add_middleware(
@@ -37,50 +104,134 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ReviewBodyLimitMiddleware, path_limits={"/review/jobs": MAX_JOB_BODY_BYTES})
 
 # Initialize engines
 policy_engine = PolicyEngine()
 static_analyzer = StaticAnalyzer()
 risk_engine = RiskEngine()
+audit_log = get_audit_log()
 
 @app.post("/review", response_model=ReviewResponse)
 async def review_code(
     request: ReviewRequest, 
+    http_request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(admit_review),
+    deadline = Depends(review_deadline)
+):
+    check_source_limits(request.code)
+    # 1. Get active policies
+    active_policies = policy_engine.get_policies(request.policies)
+    return await review_source(http_request, request.code, active_policies, db, current_user, deadline,
+                               filename=request.filename or "untitled.py", ai_review=request.ai_review)
+
+@app.post("/review/upload", response_model=ReviewResponse)
+async def review_upload(
+    http_request: Request,
+    policies: List[str] = Query([]),
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(admit_review),
+    deadline = Depends(upload_deadline)
 ):
+    """
+    Review a source sent as the raw body (text/x-python) or as the "code" part
+    of a multipart form, optionally gzip/deflate/zstd compressed. Policy ids
+    come from `policies` query parameters and "policies" form fields; regex
+    scanning runs while the upload streams in.
+    """
+    # 1. Read, decode and scan the upload as it arrives
+    sources, active_policies = await read_upload(
+        http_request, ("code",), split_policy_ids(policies), policy_engine, deadline
+    )
+    ctx, scanned, filename = sources["code"]
+    return await review_source(http_request, ctx, active_policies, db, current_user, deadline,
+                               scanned=scanned, filename=filename or "untitled.py")
+
+async def review_source(http_request: Request, code: Union[str, AnalysisContext], active_policies: List[Dict],
+                        db: Session, current_user, deadline: Deadline,
+                        scanned: Optional[List[Record]] = None, filename: str = "untitled.py", ai_review: bool = False):
+    """
+    Analyze one source and build its ReviewResponse; `scanned` are regex records
+    found during upload. With `ai_review`, the regions around the open findings
+    are also sent to the AI model.
+    """
     try:
-        # 1. Get active policies
-        active_policies = policy_engine.get_policies(request.policies)
+        # 2. Run Analysis (off the event loop so probes and shed responses stay fast);
+        # it stops early at the deadline or when the client disconnects
+        analysis_started = time.perf_counter()
+        violations = await run_in_threadpool(static_analyzer.analyze_compact, code, active_policies, deadline, scanned)
+        analysis_seconds = time.perf_counter() - analysis_started
+        check_deadline(deadline, active_policies)
         
-        # 2. Run Analysis
-        violations = static_analyzer.analyze(request.code, active_policies)
-        
-        # 3. Apply Feedback
+        # 3. Apply Feedback (ids are only hashed when the user has feedback)
         feedbacks = db.query(Feedback).filter(Feedback.user_id == current_user.id).all()
         fp_map = {f.violation_id: f.feedback_type for f in feedbacks}
         
-        for v in violations:
-            if fp_map.get(v.id) == "FALSE_POSITIVE":
-                v.status = "FALSE_POSITIVE"
+        if fp_map:
+            for v in violations:
+                if fp_map.get(v.id) == "FALSE_POSITIVE":
+                    v.status = "FALSE_POSITIVE"
         
         # 4. Calculate Risk
-        score, level = risk_engine.calculate_score(violations)
+        score, level = risk_engine.calculate_score(violations, active_policies)
+
+        # 5. Ask the AI model about the flagged regions, if requested
+        ai_insights = await review_with_ai(code, violations, deadline) if ai_review else []
+
+        # 6. Queue the audit record (written behind by the audit log's thread)
+        audit_id, timestamp = audit_log.record_review(
+            current_user.id, http_request.url.path, filename, policy_engine.version, active_policies,
+            score, level, violations, bool(deadline.incomplete), analysis_seconds, deadline.elapsed()
+        )
         
-        # 5. Construct Response
-        return ReviewResponse(
+        # 7. Construct Response (validated once here, encoded without re-validation)
+        return fast_json_response(http_request, ReviewResponse(
             risk_score=score,
             risk_level=level,
-            violations=violations,
+            violations=to_models(violations),
             audit=AuditSummary(
-                timestamp=datetime.now().strftime("%b %d, %Y, %I:%M:%S %p"),
-                file="untitled.py" # In real app, this would come from request
-            )
-        )
+                timestamp=timestamp.strftime("%b %d, %Y, %I:%M:%S %p"),
+                file=filename,
+                audit_id=audit_id
+            ),
+            partial=bool(deadline.incomplete),
+            incomplete_policies=deadline.incomplete,
+            ai_insights=ai_insights
+        ), headers=partial_headers(deadline))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def review_with_ai(code: Union[str, AnalysisContext], violations: List, deadline: Deadline) -> List[AIInsight]:
+    """
+    Send the regions around the open findings to the AI client (cut to its
+    token budget by the context extractor). Whatever the model has not
+    answered when the review deadline passes is left out.
+    """
+    from backend.core.ai_client import get_ai_client
+
+    open_violations = [v for v in violations if v.status != "FALSE_POSITIVE"]
+    if not open_violations or deadline.expired:
+        return []
+    ctx = code if isinstance(code, AnalysisContext) else get_context(code)
+    # Parsing is skipped when the analysis already built the tree, but may not be on a cache hit
+    tree = await run_in_threadpool(lambda: ctx.tree)
+    try:
+        extracted, findings = await asyncio.wait_for(
+            get_ai_client().review(ctx.code, tree, open_violations), timeout=deadline.remaining()
+        )
+    except asyncio.TimeoutError:
+        return []
+
+    flagged = [r for r in extracted.regions if r.flagged_lines]
+    return [
+        AIInsight(start_line=r.start, end_line=r.end, flagged_lines=r.flagged_lines, finding=finding)
+        for r, finding in zip(flagged, findings)
+    ]
+
 @app.get("/@vite/client")
 async def vite_client_placeholder():
     """
@@ -101,4 +252,5 @@ else:
     print(f"Warning: Frontend directory not found at {frontend_path}")
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,21 @@
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
+from backend.database import Base
+
+class ReviewAudit(Base):
+    """One completed review; append-only, written in batches by the AuditLog writer"""
+    __tablename__ = "review_audit"
+
+    id = Column(String, primary_key=True)  # audit_id returned in the review's AuditSummary
+    timestamp = Column(DateTime, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    endpoint = Column(String)
+    file = Column(String)
+    policy_version = Column(String)
+    policies = Column(String)  # comma-separated policy ids
+    risk_score = Column(Integer)
+    risk_level = Column(String)
+    violations = Column(Integer)
+    severity_counts = Column(String)  # JSON object, e.g. {"HIGH": 2, "LOW": 1}
+    partial = Column(Boolean, default=False)
+    analysis_ms = Column(Float)
+    total_ms = Column(Float)
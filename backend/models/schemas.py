@@ -1,10 +1,12 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
 class ReviewRequest(BaseModel):
     code: str
     policies: Optional[List[str]] = []
+    filename: Optional[str] = None
+    ai_review: bool = False  # also send the regions around the findings to the AI model
 
 class DiffReviewRequest(BaseModel):
     original_code: str
@@ -38,12 +40,22 @@ class AuditSummary(BaseModel):
     timestamp: str
     file: str
     diff_metadata: Optional[dict] = None # For Diff Review
+    audit_id: Optional[str] = None  # id of the review's audit log entry
+
+class AIInsight(BaseModel):
+    start_line: int  # region sent to the model, 1-based and inclusive
+    end_line: int
+    flagged_lines: List[int]
+    finding: Optional[str] = None
 
 class ReviewResponse(BaseModel):
     risk_score: int
     risk_level: str
     violations: List[Violation]
     audit: AuditSummary
+    partial: bool = False  # the deadline passed before every policy ran
+    incomplete_policies: List[str] = []
+    ai_insights: List[AIInsight] = []  # only with ai_review
 
 class DiffMetadata(BaseModel):
     lines_added: int
@@ -55,3 +67,41 @@ class DiffReviewResponse(ReviewResponse):
     risk_delta: int = 0
     original_risk_score: int = 0
     new_risk_score: int = 0
+
+class ReviewJobFile(BaseModel):
+    path: str
+    code: str
+
+class ReviewJobRequest(BaseModel):
+    code: Optional[str] = None  # a single source, or
+    files: Optional[List[ReviewJobFile]] = None  # many
+    policies: Optional[List[str]] = []
+    priority: int = Field(0, ge=-100, le=100)  # higher runs first
+
+class JobProgress(BaseModel):
+    files_done: int
+    files_total: int
+
+class JobFileResult(BaseModel):
+    path: str
+    risk_score: int
+    risk_level: str
+    violations: List[Violation]
+
+class ReviewJobResult(BaseModel):
+    risk_score: int
+    risk_level: str
+    files: List[JobFileResult]
+
+class ReviewJobStatus(BaseModel):
+    id: str
+    status: str  # "queued", "running", "done", "failed", "cancelled"
+    priority: int
+    attempts: int
+    progress: JobProgress
+    cancel_requested: bool = False
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[ReviewJobResult] = None
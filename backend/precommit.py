@@ -0,0 +1,82 @@
+"""
+Pre-commit hook: review the staged Python files before each commit.
+
+    python -S -m backend.precommit --fail-on MEDIUM
+
+Reads staged contents straight from the git index (not the working tree), so
+partially staged files are reviewed as they will be committed. Only the
+policy loader, the analyzer and git plumbing are imported up front, and the
+check engines only for blobs that miss the cache; the web stack and its models
+never load, and -S skips site-packages since nothing outside the standard
+library is needed. Results are shared with `backend.git_review`
+through the per-repository blob cache, so unchanged blobs cost one lookup.
+
+Exits 1 when a violation at or above the --fail-on severity is staged.
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "policies", "rules.json")
+SEVERITY_RANKS = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repo", default=".", help="repository whose index is reviewed")
+    parser.add_argument("--policies", help="comma-separated policy ids (default: all)")
+    parser.add_argument("--fail-on", default=os.getenv("PRECOMMIT_FAIL_ON", "HIGH"),
+                        choices=sorted(SEVERITY_RANKS, key=SEVERITY_RANKS.get),
+                        help="lowest severity that blocks the commit")
+    parser.add_argument("--no-cache", action="store_true", help="analyze every staged blob")
+    args = parser.parse_args(argv)
+
+    from backend.core.git_plumbing import GitError, GitRepo
+
+    repo = GitRepo(args.repo)
+    try:
+        # 1. Staged .py files and their index blobs; commits without any stop here
+        staged = [(path, sha) for path, _, sha in repo.staged_files()]
+        if not staged:
+            return 0
+
+        from backend.core.git_review import RangeReview
+        from backend.core.policy_engine import PolicyEngine
+        from backend.core.result_cache import ResultCache
+
+        # 2. Policies, keeping the loader's progress output out of the hook's
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            engine = PolicyEngine(rules_path=RULES_PATH, auto_reload=False)
+        if not engine.policies:
+            print(log.getvalue() + "No policies loaded; not reviewing", file=sys.stderr)
+            return 2
+        policies = engine.get_policies(args.policies.split(',')) if args.policies else engine.policies
+
+        # 3. Records per blob, analyzed only on a cache miss
+        cache = None if args.no_cache else ResultCache(repo.local_cache_path())
+        records = RangeReview(repo, policies, cache=cache, jobs=1).blob_records(sha for _, sha in staged)
+    except GitError as e:
+        print(f"git: {e}", file=sys.stderr)
+        return 2
+
+    # 4. Report, blocking on anything at or above the threshold
+    by_id = {p['id']: p for p in policies}
+    threshold = SEVERITY_RANKS[args.fail_on]
+    blocking = 0
+    for path, sha in staged:
+        for rule_id, line, message in sorted(records[sha], key=lambda r: r[1]):
+            severity = str(by_id[rule_id].get('severity', '')).upper()
+            blocks = SEVERITY_RANKS.get(severity, 0) >= threshold
+            blocking += blocks
+            print(f"{path}:{line}: [{severity}] {rule_id}: {message}" + ("" if blocks else " (warning)"))
+
+    if blocking:
+        print(f"{blocking} violation(s) at or above {args.fail_on}; commit blocked "
+              f"(git commit --no-verify to bypass)", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from backend.core.audit_log import AUDIT_COLUMNS, get_audit_log
+from backend.core.profiler import PROFILER_INTERVAL_MS, PROFILER_MAX_SECONDS, ProfilerBusy, SamplingProfiler
+from backend.database import get_db
+from backend.models.audit import ReviewAudit
+from backend.routers.auth import require_admin
+from backend.routers.responses import fast_json_response
+import asyncio
+import json
+import os
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"]
+)
+
+@router.post("/profile")
+async def profile_worker(
+    request: Request,
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS),
+    requests: int = Query(None, ge=1, description="Stop after this many review requests (seconds is then the timeout)"),
+    format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+    interval_ms: float = Query(PROFILER_INTERVAL_MS, ge=1, le=1000),
+    current_user = Depends(require_admin)
+):
+    """
+    Sample the stacks of the worker that serves this request for `seconds`, or
+    until it has finished the next `requests` reviews. Returns folded stacks
+    (text) or a speedscope JSON profile; samples inside the review pipeline are
+    rooted at [stage:...] and [rule:...] frames. Each worker profiles itself,
+    so the X-Worker-Pid header tells which process was measured.
+    """
+    profiler = SamplingProfiler(seconds=seconds, requests=requests, interval=interval_ms / 1000)
+    try:
+        profiler.start()
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    # The event loop keeps serving while the sampler thread runs
+    while not profiler.done.is_set():
+        await asyncio.sleep(0.05)
+    profiler.stop()
+
+    headers = {
+        "X-Worker-Pid": str(os.getpid()),
+        "X-Profile-Samples": str(profiler.sample_count),
+        "X-Profile-Seconds": f"{profiler.elapsed:.3f}",
+        "X-Profile-Requests": str(profiler.requests_done),
+    }
+    if format == "speedscope":
+        return fast_json_response(request, profiler.speedscope(name=f"worker {os.getpid()}"), headers=headers)
+    return PlainTextResponse(profiler.collapsed(), headers=headers)
+
+@router.get("/audit")
+async def review_audit(
+    request: Request,
+    user_id: int = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    """
+    Most recent entries of the review audit log, newest first. Entries are
+    written behind in batches, so the last second or so of reviews may not be
+    listed yet; `writer` holds the counters of the worker serving this request.
+    """
+    query = db.query(ReviewAudit)
+    if user_id is not None:
+        query = query.filter(ReviewAudit.user_id == user_id)
+    entries = []
+    for row in query.order_by(ReviewAudit.timestamp.desc()).limit(limit):
+        entry = {column: getattr(row, column) for column in AUDIT_COLUMNS}
+        entry["timestamp"] = row.timestamp.isoformat()
+        entry["severity_counts"] = json.loads(row.severity_counts or "{}")
+        entries.append(entry)
+    return fast_json_response(request, {"writer": get_audit_log().stats(), "entries": entries})
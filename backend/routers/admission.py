@@ -0,0 +1,156 @@
+from fastapi import Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
+from backend.core.admission import (
+    InFlightLimiter, RateLimiter, MAX_REVIEW_BODY_BYTES, SHED_RETRY_AFTER_SECONDS, source_limit_error
+)
+from backend.core.deadline import DISCONNECTED, EXPIRED, Deadline, review_timeout
+from backend.routers.auth import get_current_user
+from backend.core.profiler import note_request
+import asyncio
+import math
+import os
+from typing import Dict, List, Optional
+
+# How often a running review checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.1"))
+
+# Per-worker admission state shared by every review endpoint
+rate_limiter = RateLimiter()
+in_flight = InFlightLimiter()
+
+def check_source_limits(*sources):
+    """Reject oversized source texts with 413 before any analysis runs"""
+    for code in sources:
+        if isinstance(code, str):
+            error = source_limit_error(code)
+            if error:
+                raise HTTPException(status_code=413, detail=error)
+
+async def admit_review(current_user = Depends(get_current_user)):
+    """
+    Admission control for review endpoints: a per-user token bucket (429) and a
+    bounded number of reviews in flight (503). Use in place of get_current_user.
+    """
+    wait = rate_limiter.check(current_user.id)
+    if wait:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+    if not in_flight.try_acquire():
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity, retry shortly",
+            headers={"Retry-After": str(SHED_RETRY_AFTER_SECONDS)},
+        )
+    try:
+        yield current_user
+    finally:
+        in_flight.release()
+        note_request()
+
+async def review_deadline(request: Request):
+    """
+    Deadline of one review: X-Review-Timeout seconds (up to MAX_REVIEW_TIMEOUT_SECONDS)
+    or REVIEW_TIMEOUT_SECONDS. It is cancelled as soon as the client disconnects,
+    which the analysis in the thread pool notices at its next check.
+    """
+    deadline = Deadline(review_timeout(request.headers.get("x-review-timeout")))
+    watch_disconnect(request, deadline)
+    try:
+        yield deadline
+    finally:
+        request.state.disconnect_watcher.cancel()
+
+async def upload_deadline(request: Request):
+    """
+    review_deadline for endpoints that stream their body: polling for a
+    disconnect consumes body messages, so the client is only watched once the
+    upload has been read (see read_upload).
+    """
+    deadline = Deadline(review_timeout(request.headers.get("x-review-timeout")))
+    request.state.disconnect_watcher = None
+    try:
+        yield deadline
+    finally:
+        if request.state.disconnect_watcher is not None:
+            request.state.disconnect_watcher.cancel()
+
+def watch_disconnect(request: Request, deadline: Deadline):
+    """Cancel the deadline once the client disconnects; the task is cancelled with the request's deadline dependency"""
+    async def watch():
+        while not deadline.expired:
+            if await request.is_disconnected():
+                deadline.cancel(DISCONNECTED)
+                return
+            await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+
+    request.state.disconnect_watcher = asyncio.create_task(watch())
+
+def check_deadline(deadline: Deadline, policies: List[Dict]):
+    """
+    Stop a review whose result nobody can use: 499 once the client has gone, 504
+    when the deadline passed before any of `policies` finished (pass none to
+    check only for a disconnect). Otherwise the review goes on, partial if some
+    policies are in deadline.incomplete.
+    """
+    if deadline.reason == DISCONNECTED:
+        raise HTTPException(status_code=499, detail="Client closed request")
+    if deadline.reason == EXPIRED and policies and all(p['id'] in deadline.incomplete for p in policies):
+        raise HTTPException(status_code=504, detail="Review deadline exceeded")
+
+def partial_headers(deadline: Deadline) -> Dict[str, str]:
+    """Marks a response whose analysis stopped at the deadline"""
+    if not deadline.incomplete:
+        return {}
+    return {"X-Review-Partial": ",".join(deadline.incomplete)}
+
+class ReviewBodyLimitMiddleware:
+    """
+    Rejects review request bodies over max_bytes with 413: up front from
+    Content-Length, or as soon as a chunked body crosses the limit, so an
+    oversized upload is never buffered or parsed. `path_limits` sets other
+    limits for sub-prefixes (e.g. bulk job submissions).
+    """
+    def __init__(self, app, max_bytes: int = MAX_REVIEW_BODY_BYTES, path_prefix: str = "/review",
+                 path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefix = path_prefix
+        # Longest prefix first
+        self.path_limits = sorted((path_limits or {}).items(), key=lambda item: -len(item[0]))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = next((limit for prefix, limit in self.path_limits if scope["path"].startswith(prefix)),
+                         self.max_bytes)
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            await self._too_large(scope, receive, send, max_bytes)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Raised while the body is being read, before the handler runs
+                    raise HTTPException(status_code=413, detail=self._detail(max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _detail(self, max_bytes: int) -> str:
+        return f"Request body exceeds {max_bytes} bytes"
+
+    async def _too_large(self, scope, receive, send, max_bytes: int):
+        response = JSONResponse({"detail": self._detail(max_bytes)}, status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
@@ -2,13 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordBearer
 import os
-from jose import JWTError, jwt
-import os
 
 from backend.database import get_db
 from backend.models.user import User
 from backend.models.auth_schemas import UserCreate, UserLogin, UserResponse, Token
-from backend.core.security import verify_password, get_password_hash, create_access_token, SECRET_KEY, ALGORITHM
+from backend.core.security import verify_password, get_password_hash, create_access_token, decode_access_token
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -41,12 +39,9 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         db.commit()
         db.refresh(new_user)
         return new_user
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
+    payload = decode_access_token(token) if token else None
+    email: str = payload.get("sub") if payload else None
+    if email is None:
         raise credentials_exception
     
     user = db.query(User).filter(User.email == email).first()
@@ -54,6 +49,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise credentials_exception
     return user
 
+def require_admin(current_user: User = Depends(get_current_user)):
+    if current_user.role != "ADMIN":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin role required")
+    return current_user
+
 @router.post("/register", response_model=UserResponse)
 def register(user: UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.email == user.email).first()
@@ -1,26 +1,36 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from backend.models.schemas import ReviewResponse
-from fpdf import FPDF
 import io
 
 router = APIRouter(prefix="/export", tags=["Export"])
 
-class PDFReport(FPDF):
-    def header(self):
-        self.set_font('Arial', 'B', 15)
-        self.cell(0, 10, 'Code Security Audit Report', 0, 1, 'C')
-        self.ln(10)
+_report_class = None
 
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+def get_report_class():
+    """PDF report layout; fpdf is imported on the first export, not at startup"""
+    global _report_class
+    if _report_class is None:
+        from fpdf import FPDF
+
+        class PDFReport(FPDF):
+            def header(self):
+                self.set_font('Arial', 'B', 15)
+                self.cell(0, 10, 'Code Security Audit Report', 0, 1, 'C')
+                self.ln(10)
+
+            def footer(self):
+                self.set_y(-15)
+                self.set_font('Arial', 'I', 8)
+                self.cell(0, 10, f'Page {self.page_no()}', 0, 0, 'C')
+
+        _report_class = PDFReport
+    return _report_class
 
 @router.post("/pdf")
 async def export_pdf(report_data: ReviewResponse):
     try:
-        pdf = PDFReport()
+        pdf = get_report_class()()
         pdf.add_page()
         pdf.set_font("Arial", size=12)
         
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Response
+from sqlalchemy import text
+from backend.database import engine
+import os
+
+router = APIRouter(tags=["Health"])
+
+# Flipped by the application lifespan: ready after warm-up, draining during shutdown
+state = {"ready": False, "draining": False}
+
+@router.get("/healthz")
+async def liveness():
+    """
+    Liveness probe: the worker process is up and its event loop is responsive.
+    """
+    return {"status": "ok", "pid": os.getpid()}
+
+@router.get("/readyz")
+def readiness(response: Response):
+    """
+    Readiness probe: policies are loaded, the database answers and the worker is not draining.
+    """
+    from backend.core.policy_engine import PolicyEngine
+
+    checks = {
+        "warmed_up": state["ready"],
+        "not_draining": not state["draining"],
+        "policies_loaded": any(e.policies for e in PolicyEngine.instances()),
+    }
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        checks["database"] = True
+    except Exception:
+        checks["database"] = False
+
+    ready = all(checks.values())
+    if not ready:
+        response.status_code = 503
+    return {"status": "ready" if ready else "not_ready", "checks": checks, "pid": os.getpid()}
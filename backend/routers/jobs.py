@@ -0,0 +1,146 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from backend.models.schemas import ReviewJobRequest, ReviewJobStatus
+from backend.core.analyzer import ViolationRecord
+from backend.core.job_queue import MAX_ACTIVE_JOBS_PER_USER, MAX_JOB_BYTES, MAX_JOB_FILES, get_job_queue
+from backend.core.policy_engine import PolicyEngine
+from backend.core.risk_engine import RiskEngine
+from backend.routers.admission import admit_review
+from backend.routers.auth import get_current_user
+from backend.routers.responses import fast_json_response
+from backend.database import get_db
+from backend.models.feedback import Feedback
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timezone
+
+router = APIRouter(
+    prefix="/review/jobs",
+    tags=["review"]
+)
+
+policy_engine = PolicyEngine()
+risk_engine = RiskEngine()
+
+@router.post("", response_model=ReviewJobStatus, status_code=202)
+async def submit_job(
+    request: Request,
+    job: ReviewJobRequest,
+    current_user = Depends(admit_review)
+):
+    """
+    Queue a review of one large source or many files. Returns 202 with the
+    job's id; poll GET /review/jobs/{id} for progress and the result.
+    """
+    # 1. One source or a file list, within the job limits
+    if (job.code is None) == (job.files is None):
+        raise HTTPException(status_code=422, detail="Provide either 'code' or 'files'")
+    files = [("untitled.py", job.code)] if job.code is not None else [(f.path, f.code) for f in job.files]
+    if len(files) > MAX_JOB_FILES:
+        raise HTTPException(status_code=413, detail=f"Job has {len(files)} files; the limit is {MAX_JOB_FILES}")
+    size = sum(len(code.encode('utf-8', errors='surrogatepass')) for _, code in files)
+    if size > MAX_JOB_BYTES:
+        raise HTTPException(status_code=413, detail=f"Job sources total {size} bytes; the limit is {MAX_JOB_BYTES}")
+
+    # 2. Bounded backlog per user
+    queue = get_job_queue()
+    if await run_in_threadpool(queue.active_count, current_user.id) >= MAX_ACTIVE_JOBS_PER_USER:
+        raise HTTPException(
+            status_code=429,
+            detail=f"At most {MAX_ACTIVE_JOBS_PER_USER} review jobs may be queued or running per user",
+            headers={"Retry-After": "30"},
+        )
+
+    job_id = await run_in_threadpool(queue.submit, current_user.id, files, job.policies or [], job.priority)
+    status = await run_in_threadpool(queue.get, job_id)
+    return fast_json_response(request, _status_model(status, []), status_code=202,
+                              headers={"Location": f"/review/jobs/{job_id}"})
+
+@router.get("/{job_id}", response_model=ReviewJobStatus)
+async def get_job(
+    job_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Status and progress of a job, with per-file and overall results once it is done"""
+    job = await run_in_threadpool(_own_job, job_id, current_user.id)
+    false_positive_ids = []
+    if job['result'] is not None:
+        false_positive_ids = [
+            f.violation_id for f in db.query(Feedback).filter(
+                Feedback.user_id == current_user.id, Feedback.feedback_type == "FALSE_POSITIVE"
+            ).all()
+        ]
+    return fast_json_response(request, await run_in_threadpool(_status_model, job, false_positive_ids))
+
+@router.delete("/{job_id}", response_model=ReviewJobStatus)
+async def cancel_job(
+    job_id: str,
+    request: Request,
+    current_user = Depends(get_current_user)
+):
+    """
+    Cancel a job. Queued jobs are cancelled at once; running ones stop at
+    their worker's next check (cancel_requested is set until then).
+    """
+    await run_in_threadpool(_own_job, job_id, current_user.id)
+    queue = get_job_queue()
+    await run_in_threadpool(queue.cancel, job_id)
+    job = await run_in_threadpool(queue.get, job_id)
+    if job['status'] in ("done", "failed"):
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return fast_json_response(request, _status_model(job, []))
+
+def _own_job(job_id: str, user_id: int):
+    job = get_job_queue().get(job_id)
+    # Other users' jobs are indistinguishable from missing ones
+    if job is None or job['user_id'] != user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+def _status_model(job, false_positive_ids) -> ReviewJobStatus:
+    result = None
+    if job['result'] is not None:
+        result = _result_model(job, set(false_positive_ids))
+    return ReviewJobStatus(
+        id=job['id'],
+        status=job['status'],
+        priority=job['priority'],
+        attempts=job['attempts'],
+        progress={"files_done": job['files_done'], "files_total": job['files_total']},
+        cancel_requested=job['cancel_requested'],
+        created_at=_timestamp(job['created_at']),
+        started_at=_timestamp(job['started_at']),
+        finished_at=_timestamp(job['finished_at']),
+        error=job['error'],
+        result=result,
+    )
+
+def _result_model(job, false_positive_ids):
+    # Scored against the current policies, so severity and weight edits apply to stored results
+    policies = policy_engine.get_policies(job['policies'])
+    by_id = {p['id']: p for p in policies}
+    per_file = []
+    for path, records in job['result']['files']:
+        violations = [ViolationRecord(by_id[rule_id], line, message)
+                      for rule_id, line, message in records if rule_id in by_id]
+        if false_positive_ids:
+            for v in violations:
+                if v.id in false_positive_ids:
+                    v.status = "FALSE_POSITIVE"
+        per_file.append((path, violations))
+
+    # Every file and the whole job in one batch pass
+    scores = risk_engine.score_groups([v for _, v in per_file] + [[v for _, vs in per_file for v in vs]], policies)
+    score, level = scores[-1]
+    return {
+        "risk_score": score,
+        "risk_level": level,
+        "files": [
+            {"path": path, "risk_score": s, "risk_level": l, "violations": [v.to_model() for v in violations]}
+            for (path, violations), (s, l) in zip(per_file, scores)
+        ],
+    }
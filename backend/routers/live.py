@@ -0,0 +1,122 @@
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+from backend.core.live_session import LiveDocument
+from backend.core.policy_engine import PolicyEngine
+from backend.core.admission import source_limit_error
+from backend.core import fast_json
+from backend.database import SessionLocal
+from backend.models.feedback import Feedback
+from backend.routers.auth import get_current_user
+import os
+
+router = APIRouter(
+    prefix="/review",
+    tags=["review"]
+)
+
+# Open live sessions per worker; more are refused with close code 1013 (try again later)
+MAX_LIVE_SESSIONS = int(os.getenv("MAX_LIVE_SESSIONS", "256"))
+
+policy_engine = PolicyEngine()
+active_sessions = 0
+
+def _authenticate(token):
+    """The session's user and their false-positive violation ids, or None if the token is invalid"""
+    db = SessionLocal()
+    try:
+        try:
+            user = get_current_user(token, db)
+        except HTTPException:
+            return None
+        feedbacks = db.query(Feedback).filter(
+            Feedback.user_id == user.id, Feedback.feedback_type == "FALSE_POSITIVE"
+        ).all()
+        return user, {f.violation_id for f in feedbacks}
+    finally:
+        db.close()
+
+def _dump_violations(result: dict, key: str) -> dict:
+    result[key] = [v.model_dump() for v in result[key]]
+    return result
+
+async def _send(websocket: WebSocket, message: dict):
+    await websocket.send_text(fast_json.dumps(message).decode())
+
+@router.websocket("/live")
+async def live_review(websocket: WebSocket):
+    """
+    Live review session. The token is passed as ?token= since browsers cannot
+    set headers on a WebSocket. Messages (JSON):
+      -> {"type": "open", "code": str, "policies": [names]}
+      <- {"type": "snapshot", "version": 0, "violations", "risk_score", "risk_level"}
+      -> {"type": "edit", "version": int, "edits": [{"range": {"start": {"line", "character"}, "end": {...}}, "text"}]}
+      <- {"type": "delta", "version": int, "added", "removed", "moved", "risk_score", "risk_level", "elapsed_ms"}
+    A delta is applied as a batch: drop every removed id and every moved id,
+    then insert the added violations and the moved ones under their new ids.
+    """
+    global active_sessions
+
+    # Accept first so refusals reach the client as close codes rather than a bare 403
+    await websocket.accept()
+    auth = await run_in_threadpool(_authenticate, websocket.query_params.get("token"))
+    if auth is None:
+        await websocket.close(code=1008, reason="Could not validate credentials")
+        return
+    if active_sessions >= MAX_LIVE_SESSIONS:
+        await websocket.close(code=1013, reason="Too many live sessions")
+        return
+
+    _, false_positive_ids = auth
+    active_sessions += 1
+    document = None
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+                kind = message.get("type")
+            except (ValueError, AttributeError):
+                await _send(websocket, {"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+
+            if kind == "open":
+                code = message.get("code")
+                if not isinstance(code, str):
+                    await _send(websocket, {"type": "error", "detail": "'code' is required"})
+                    continue
+                error = source_limit_error(code)
+                if error:
+                    await _send(websocket, {"type": "error", "detail": error})
+                    continue
+                policies = policy_engine.get_policies(message.get("policies") or [])
+                document = await run_in_threadpool(LiveDocument, code, policies, false_positive_ids)
+                snapshot = _dump_violations(document.snapshot(), "violations")
+                await _send(websocket, {"type": "snapshot", "version": 0, **snapshot})
+
+            elif kind == "edit":
+                if document is None:
+                    await _send(websocket, {"type": "error", "detail": "Send an 'open' message first"})
+                    continue
+                edits = message.get("edits")
+                if not isinstance(edits, list):
+                    await _send(websocket, {"type": "error", "detail": "'edits' must be a list"})
+                    continue
+                try:
+                    delta = await run_in_threadpool(document.apply_edits, edits)
+                except ValueError as e:
+                    await _send(websocket, {"type": "error", "detail": str(e)})
+                    continue
+                error = source_limit_error(document.code)
+                if error:
+                    # The document no longer fits the review limits; the client must reopen
+                    await _send(websocket, {"type": "error", "detail": error})
+                    await websocket.close(code=1009)
+                    return
+                delta = _dump_violations(delta, "added")
+                await _send(websocket, {"type": "delta", "version": message.get("version"), **delta})
+
+            else:
+                await _send(websocket, {"type": "error", "detail": f"Unknown message type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        active_sessions -= 1
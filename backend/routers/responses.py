@@ -0,0 +1,24 @@
+from fastapi import Request, Response
+from backend.core.fast_json import COMPRESS_MIN_BYTES, compress, dumps, negotiate_encoding
+from backend.core.profiler import tag
+
+def fast_json_response(request: Request, content, status_code: int = 200, headers: dict = None) -> Response:
+    """
+    Serialize validated content directly to the response body. Returning a
+    Response skips FastAPI's response_model re-validation and jsonable_encoder;
+    the route's response_model still documents the schema. Large bodies are
+    compressed with the best coding the client accepts.
+    """
+    with tag("encode"):
+        body = dumps(content)
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            with tag("compress"):
+                body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
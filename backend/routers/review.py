@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request
 from sqlalchemy.orm import Session
 from backend.models.schemas import DiffReviewRequest, DiffReviewResponse, ReviewResponse, AuditSummary, DiffMetadata
 from backend.core.policy_engine import PolicyEngine
-from backend.core.analyzer import StaticAnalyzer
+from backend.core.analysis_context import AnalysisContext
+from backend.core.audit_log import get_audit_log
+from backend.core.analyzer import StaticAnalyzer, to_models
 from backend.core.risk_engine import RiskEngine
-from backend.routers.auth import get_current_user
+from backend.core.deadline import Deadline
+from backend.core.ingest import split_policy_ids
+from backend.core.result_cache import Record
+from backend.routers.admission import (
+    admit_review, check_deadline, check_source_limits, partial_headers, review_deadline, upload_deadline
+)
+from backend.routers.responses import fast_json_response
+from backend.routers.uploads import read_upload
 from backend.database import get_db
 from backend.models.feedback import Feedback
-from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional, Tuple, Union
 import difflib
+import os
+import time
 
 router = APIRouter(
     prefix="/review",
@@ -18,60 +30,112 @@ router = APIRouter(
 policy_engine = PolicyEngine()
 static_analyzer = StaticAnalyzer()
 risk_engine = RiskEngine()
+audit_log = get_audit_log()
+
+# Replaced blocks with at most this many (old line, new line) pairs are matched
+# again without autojunk, so lines the first pass ignored as too common are not
+# reported as changed; each such match is quadratic in the worst case
+DIFF_REFINE_MAX_PAIRS = int(os.getenv("DIFF_REFINE_MAX_PAIRS", str(250_000)))
+
+def changed_lines(original_lines: List[str], modified_lines: List[str],
+                  deadline: Deadline) -> Optional[Tuple[List[int], int, int]]:
+    """
+    1-based lines of the modified source that were added or changed, with the
+    added and removed line counts; None if the deadline passed (or the client
+    left) first. The deadline is checked around each SequenceMatcher pass.
+    """
+    if deadline.expired:
+        return None
+    opcodes = difflib.SequenceMatcher(None, original_lines, modified_lines).get_opcodes()
+
+    changed, removed = [], 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        if deadline.expired:
+            return None
+        if tag == 'equal':
+            continue
+        if tag == 'replace' and (i2 - i1) * (j2 - j1) <= DIFF_REFINE_MAX_PAIRS:
+            inner = difflib.SequenceMatcher(None, original_lines[i1:i2], modified_lines[j1:j2], autojunk=False)
+            for inner_tag, a1, a2, b1, b2 in inner.get_opcodes():
+                if inner_tag != 'equal':
+                    removed += a2 - a1
+                    changed.extend(range(j1 + b1 + 1, j1 + b2 + 1))
+        else:
+            removed += i2 - i1
+            changed.extend(range(j1 + 1, j2 + 1))
+    return None if deadline.expired else (changed, len(changed), removed)
 
 @router.post("/diff", response_model=DiffReviewResponse)
 async def review_diff(
+    request: Request,
     request_body: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(admit_review),
+    deadline = Depends(review_deadline)
 ):
-    try:
-        # Accept flexible JSON body to avoid 422 on validation differences from clients
-        original = request_body.get('original_code')
-        modified = request_body.get('modified_code')
-        policies = request_body.get('policies', []) or []
+    check_source_limits(request_body.get('original_code'), request_body.get('modified_code'))
+    # Accept flexible JSON body to avoid 422 on validation differences from clients
+    original = request_body.get('original_code')
+    modified = request_body.get('modified_code')
+    policies = request_body.get('policies', []) or []
 
-        if original is None or modified is None:
-            raise HTTPException(status_code=422, detail="Both 'original_code' and 'modified_code' are required")
+    if original is None or modified is None:
+        raise HTTPException(status_code=422, detail="Both 'original_code' and 'modified_code' are required")
 
-        # 1. Compute Diff & Changed Lines
-        d = difflib.Differ()
-        original_lines = str(original).splitlines()
-        modified_lines = str(modified).splitlines()
-        
-        diff = list(d.compare(original_lines, modified_lines))
-        
-        changed_lines_indices = [] # 1-based indices in modified code
-        lines_added = 0
-        lines_removed = 0
-        
-        current_line_idx = 0 # in modified file
+    active_policies = policy_engine.get_policies(policies)
+    return await review_sources(request, str(original), str(modified), active_policies, db, current_user, deadline,
+                                filename=request_body.get('filename') or "diff_review.py")
+
+@router.post("/diff/upload", response_model=DiffReviewResponse)
+async def review_diff_upload(
+    request: Request,
+    policies: List[str] = Query([]),
+    db: Session = Depends(get_db),
+    current_user = Depends(admit_review),
+    deadline = Depends(upload_deadline)
+):
+    """
+    Diff review of a multipart upload with "original_code" and "modified_code"
+    parts (files or fields, optionally compressed, see /review/upload).
+    """
+    sources, active_policies = await read_upload(
+        request, ("original_code", "modified_code"), split_policy_ids(policies), policy_engine, deadline
+    )
+    original, original_scanned, _ = sources["original_code"]
+    modified, modified_scanned, filename = sources["modified_code"]
+    return await review_sources(request, original, modified, active_policies, db, current_user, deadline,
+                                original_scanned, modified_scanned, filename or "diff_review.py")
+
+async def review_sources(request: Request, original: Union[str, AnalysisContext], modified: Union[str, AnalysisContext],
+                         active_policies: List[Dict], db: Session, current_user, deadline: Deadline,
+                         original_scanned: Optional[List[Record]] = None, modified_scanned: Optional[List[Record]] = None,
+                         filename: str = "diff_review.py"):
+    """Diff two sources and review the changed lines; the *_scanned are regex records found during upload"""
+    try:
+        # 1. Compute Diff & Changed Lines (no changed lines, no review: a diff cut short is a 504)
+        original_lines = (original.code if isinstance(original, AnalysisContext) else original).splitlines()
+        modified_lines = (modified.code if isinstance(modified, AnalysisContext) else modified).splitlines()
         
-        for line in diff:
-            code = line[0]
-            if code == ' ':
-                # Unchanged
-                current_line_idx += 1
-            elif code == '-':
-                # Removed from original
-                lines_removed += 1
-            elif code == '+':
-                # Added/Modified in new
-                current_line_idx += 1
-                changed_lines_indices.append(current_line_idx)
-                lines_added += 1
+        changes = await run_in_threadpool(changed_lines, original_lines, modified_lines, deadline)
+        if changes is None:
+            check_deadline(deadline, [])
+            raise HTTPException(status_code=504, detail="Review deadline exceeded")
+        changed_lines_indices, lines_added, lines_removed = changes
         
         # 2. Analyze Modified Code
-        active_policies = policy_engine.get_policies(policies)
-        all_violations = static_analyzer.analyze(modified, active_policies)
+        analysis_started = time.perf_counter()
+        all_violations = await run_in_threadpool(static_analyzer.analyze_compact, modified, active_policies, deadline,
+                                                 modified_scanned)
+        check_deadline(deadline, active_policies)
         
-        # Apply Feedback
+        # Apply Feedback (ids are only hashed when the user has feedback)
         feedbacks = db.query(Feedback).filter(Feedback.user_id == current_user.id).all()
         fp_map = {f.violation_id: f.feedback_type for f in feedbacks}
         
-        for v in all_violations:
-            if fp_map.get(v.id) == "FALSE_POSITIVE":
-                v.status = "FALSE_POSITIVE"
+        if fp_map:
+            for v in all_violations:
+                if fp_map.get(v.id) == "FALSE_POSITIVE":
+                    v.status = "FALSE_POSITIVE"
 
         # 3. Filter Violations
         diff_violations = [
@@ -79,32 +143,42 @@ async def review_diff(
             if v.line in changed_lines_indices
         ]
         
-        # 4. Calculate Risk (Scoped)
-        score, level = risk_engine.calculate_score(diff_violations)
-        
-        # 5. Calculate Global Risk Delta
-        original_violations = static_analyzer.analyze(original, active_policies)
-        for v in original_violations:
-            if fp_map.get(v.id) == "FALSE_POSITIVE":
-                v.status = "FALSE_POSITIVE"
-        
-        score_old, _ = risk_engine.calculate_score(original_violations)
-        score_new, _ = risk_engine.calculate_score(all_violations)
+        # 4. Analyze Original Code for the Global Risk Delta
+        original_violations = await run_in_threadpool(static_analyzer.analyze_compact, original, active_policies, deadline,
+                                                      original_scanned)
+        analysis_seconds = time.perf_counter() - analysis_started
+        check_deadline(deadline, [])
+        if fp_map:
+            for v in original_violations:
+                if fp_map.get(v.id) == "FALSE_POSITIVE":
+                    v.status = "FALSE_POSITIVE"
+
+        # 5. Calculate Old, New and Scoped Risk in one batch pass
+        (score_old, _), (score_new, _), (score, level) = risk_engine.score_groups(
+            [original_violations, all_violations, diff_violations], active_policies
+        )
         risk_delta = score_new - score_old
+
+        # 6. Queue the audit record of the scoped review (written behind by the audit log's thread)
+        audit_id, timestamp = audit_log.record_review(
+            current_user.id, request.url.path, filename, policy_engine.version, active_policies,
+            score, level, diff_violations, bool(deadline.incomplete), analysis_seconds, deadline.elapsed()
+        )
         
-        # 6. Response
-        return DiffReviewResponse(
+        # 7. Response (validated once here, encoded without re-validation)
+        return fast_json_response(request, DiffReviewResponse(
             risk_score=score,
             risk_level=level,
-            violations=diff_violations,
+            violations=to_models(diff_violations),
             audit=AuditSummary(
-                timestamp=datetime.now().strftime("%b %d, %Y, %I:%M:%S %p"),
-                file="diff_review.py",
+                timestamp=timestamp.strftime("%b %d, %Y, %I:%M:%S %p"),
+                file=filename,
                 diff_metadata={
                     "lines_added": lines_added,
                     "lines_removed": lines_removed,
                     "lines_modified": lines_added 
-                }
+                },
+                audit_id=audit_id
             ),
             diff_metadata=DiffMetadata(
                 lines_added=lines_added,
@@ -113,8 +187,12 @@ async def review_diff(
             ),
             risk_delta=risk_delta,
             original_risk_score=score_old,
-            new_risk_score=score_new
-        )
+            new_risk_score=score_new,
+            partial=bool(deadline.incomplete),
+            incomplete_policies=deadline.incomplete
+        ), headers=partial_headers(deadline))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
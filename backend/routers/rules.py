@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Request, Response
+from backend.core.policy_engine import PolicyEngine
+from backend.core.rule_catalog import RuleCatalog, etag_matches
+import os
+
+router = APIRouter(tags=["Rules"])
+
+# Clients revalidate with If-None-Match once the max-age expires
+RULES_CACHE_CONTROL = f"public, max-age={os.getenv('RULES_CACHE_MAX_AGE', '60')}, must-revalidate"
+
+policy_engine = PolicyEngine()
+rule_catalog = RuleCatalog(policy_engine)
+
+@router.get("/rules")
+async def get_rules(request: Request):
+    """
+    Catalog of every loaded policy, generated from the current policy snapshot.
+    """
+    body, etag = rule_catalog.catalog()
+    headers = {"ETag": etag, "Cache-Control": RULES_CACHE_CONTROL}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,41 @@
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from backend.core.analysis_context import AnalysisContext
+from backend.core.deadline import Deadline
+from backend.core.ingest import UploadError, UploadReader
+from backend.core.policy_engine import PolicyEngine
+from backend.core.result_cache import Record
+from backend.routers.admission import watch_disconnect
+from typing import Dict, List, Optional, Tuple
+
+async def read_upload(request: Request, source_names: Tuple[str, ...], policy_ids: List[str],
+                      policy_engine: PolicyEngine, deadline: Deadline
+                      ) -> Tuple[Dict[str, Tuple[AnalysisContext, Optional[List[Record]], Optional[str]]], List[Dict]]:
+    """
+    Stream a raw or multipart (optionally compressed) review upload through an
+    UploadReader, decoding and scanning each chunk in the thread pool as it
+    arrives. Returns the (context, scanned regex records, part filename) of
+    each source and the active policies. Use with upload_deadline; the client
+    is watched for a disconnect once the body has been read.
+    """
+    try:
+        reader = UploadReader(request.headers.get("content-type"), request.headers.get("content-encoding"),
+                              source_names, policy_ids, policy_engine.get_policies)
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(reader.write, chunk)
+        watch_disconnect(request, deadline)
+
+        streams, policy_ids = await run_in_threadpool(reader.close)
+        active_policies = policy_engine.get_policies(policy_ids)
+        sources = {}
+        for name, stream in streams.items():
+            ctx, scanned = await run_in_threadpool(stream.complete, active_policies, deadline)
+            sources[name] = (ctx, scanned, stream.filename)
+        return sources, active_policies
+    except UploadError as e:
+        # The rest of the body may be unread
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Connection": "close"})
+    except ClientDisconnect:
+        raise HTTPException(status_code=499, detail="Client closed request")
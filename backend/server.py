@@ -0,0 +1,223 @@
+"""
+Production launcher.
+
+    python -m backend.server --workers 8 --port 8000
+
+The parent process imports the application, loads policies, compiles every
+rule and creates the schema once, then forks the workers. The warmed state is
+shared copy-on-write (the heap is frozen out of the cyclic GC so collections
+in the workers do not touch those pages). The parent supervises the workers,
+restarts any that die, and coordinates policy reloads: it validates a changed
+rules file itself and only then sends SIGHUP, on which every worker swaps in
+the new snapshot before its next request while in-flight requests finish on
+the old one. It also forks the review job workers (--job-workers), which drain
+the background job queue at a lower CPU priority than the HTTP workers.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+POLICY_POLL_INTERVAL = float(os.getenv("POLICY_POLL_INTERVAL", "2"))
+GRACEFUL_TIMEOUT = float(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_UPTIME = 1.0
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str, job_workers: int = 0):
+        self.app = app
+        self.sock = sock
+        self.num_workers = workers
+        self.num_job_workers = job_workers
+        self.log_level = log_level
+        self.workers = {}  # pid -> (slot, started_at)
+        self.job_workers = {}  # pid -> (slot, started_at)
+        self.stopping = False
+        self.reload_requested = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        for slot in range(self.num_workers):
+            self.spawn(slot)
+        for slot in range(self.num_job_workers):
+            self.spawn_job_worker(slot)
+        print(f"Master {os.getpid()} serving with {self.num_workers} workers and {self.num_job_workers} job workers")
+
+        rules_mtime = self._rules_mtime()
+        next_poll = time.monotonic() + POLICY_POLL_INTERVAL
+
+        while not self.stopping:
+            time.sleep(0.2)
+            self._reap()
+
+            if time.monotonic() >= next_poll:
+                next_poll = time.monotonic() + POLICY_POLL_INTERVAL
+                mtime = self._rules_mtime()
+                if mtime != rules_mtime:
+                    rules_mtime = mtime
+                    self.reload_requested = True
+
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload_policies()
+
+        self.shutdown()
+
+    def spawn(self, slot: int):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(slot)
+        self.workers[pid] = (slot, time.monotonic())
+
+    def spawn_job_worker(self, slot: int):
+        pid = os.fork()
+        if pid == 0:
+            self._run_job_worker()
+        self.job_workers[pid] = (slot, time.monotonic())
+
+    def _run_job_worker(self):
+        from backend.core.job_queue import run_worker
+        from backend.database import engine
+
+        try:
+            # Pooled DB connections opened by the parent must not be shared
+            engine.dispose(close=False)
+            run_worker()
+        finally:
+            os._exit(0)
+
+    def _run_worker(self, slot: int):
+        import uvicorn
+        from backend.core.policy_engine import PolicyEngine
+        from backend.database import engine
+
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, lambda *_: PolicyEngine.request_reload())
+            # Pooled DB connections opened by the parent must not be shared
+            engine.dispose(close=False)
+
+            config = uvicorn.Config(
+                self.app,
+                log_level=self.log_level,
+                lifespan="on",
+                timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+            )
+            uvicorn.Server(config).run(sockets=[self.sock])
+        finally:
+            os._exit(0)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            if pid in self.job_workers:
+                slot, started_at = self.job_workers.pop(pid)
+                respawn, kind = self.spawn_job_worker, "Job worker"
+            else:
+                slot, started_at = self.workers.pop(pid, (None, 0))
+                respawn, kind = self.spawn, "Worker"
+            if slot is None or self.stopping:
+                continue
+            # A job the worker was running is re-queued once its lease expires
+            print(f"{kind} {pid} exited with status {status}; restarting")
+            if time.monotonic() - started_at < MIN_WORKER_UPTIME:
+                time.sleep(MIN_WORKER_UPTIME)
+            respawn(slot)
+
+    def reload_policies(self):
+        """Validate the rules file in the parent, then tell the workers to swap it in"""
+        from backend.core.policy_engine import PolicyEngine
+        from backend.main import warm_up
+
+        if not all(engine.reload() for engine in PolicyEngine.instances()):
+            print("Policy reload rejected; workers keep the current version")
+            return
+
+        # Workers forked from now on inherit the new snapshot already compiled
+        warm_up()
+        for pid in list(self.workers) + list(self.job_workers):
+            os.kill(pid, signal.SIGHUP)
+        print(f"Policy reload signalled to {len(self.workers) + len(self.job_workers)} workers")
+
+    def shutdown(self):
+        # Job workers hand their current job back to the queue after the file in progress
+        for pid in list(self.workers) + list(self.job_workers):
+            os.kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while (self.workers or self.job_workers) and time.monotonic() < deadline:
+            time.sleep(0.1)
+            self._reap()
+
+        for pid in list(self.workers) + list(self.job_workers):
+            print(f"Worker {pid} did not stop in time; killing")
+            os.kill(pid, signal.SIGKILL)
+        self.sock.close()
+
+    def _rules_mtime(self) -> float:
+        from backend.core.policy_engine import PolicyEngine
+        engines = PolicyEngine.instances()
+        if not engines or not os.path.exists(engines[0].rules_path):
+            return 0
+        return os.path.getmtime(engines[0].rules_path)
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def _handle_reload(self, signum, frame):
+        self.reload_requested = True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the reviewer with preloaded, forked workers.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--job-workers", type=int, default=None,
+                        help="review job worker processes (default: JOB_WORKERS)")
+    args = parser.parse_args(argv)
+
+    # Workers reload policies only when the master signals them
+    os.environ.setdefault("POLICY_AUTO_RELOAD", "0")
+    # The HTTP workers must not start job workers of their own
+    os.environ["JOB_WORKERS_MANAGED"] = "1"
+
+    # Preload the app and warm state once, before forking
+    from backend.database import init_db
+    from backend.main import app, warm_up
+    init_db()
+    warm_up()
+
+    sock = bind_socket(args.host, args.port)
+    gc.collect()
+    gc.freeze()
+
+    from backend.core.job_queue import JOB_WORKERS
+    job_workers = JOB_WORKERS if args.job_workers is None else args.job_workers
+    Master(app, sock, args.workers, args.log_level, job_workers=job_workers).run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Startup benchmark: import-time breakdown of backend.main and cold start to the
+first served /review.
+
+    python bench_startup.py                      # report
+    python bench_startup.py --max-import-ms 800  # also fail when over budget
+
+Run from the repository root. The cold-start measurement launches uvicorn with
+DISABLE_AUTH=1, so it uses (and may create) the local sql_app.db.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_CODE = "import os\nAPI_KEY = 'sk-1234567890abcdef'\ndef f():\n    return os.getcwd()\n"
+
+def import_breakdown():
+    """Return (total_ms, {top-level package: self ms}) for one cold `import backend.main`"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr[-2000:])
+
+    total_us = 0
+    packages = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|", 2)]
+        if not self_us.isdigit():
+            continue  # header line
+        top = name.split('.')[0]
+        packages[top] = packages.get(top, 0) + int(self_us)
+        if name == "backend.main":
+            total_us = int(cumulative_us)
+
+    return total_us / 1000, {k: v / 1000 for k, v in packages.items()}
+
+def first_review_ms(timeout: float = 30) -> float:
+    """Milliseconds from launching uvicorn until the first POST /review succeeds"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    body = json.dumps({"code": SAMPLE_CODE, "policies": ["no_secrets"]}).encode()
+    env = dict(os.environ, DISABLE_AUTH="1")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            req = urllib.request.Request(
+                f"http://127.0.0.1:{port}/review", data=body,
+                headers={"Content-Type": "application/json"},
+            )
+            try:
+                with urllib.request.urlopen(req, timeout=5) as resp:
+                    if resp.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("server did not serve /review in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-review-ms", type=float)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    # 1. Import time (median of several cold interpreters)
+    samples = [import_breakdown() for _ in range(args.runs)]
+    import_ms = statistics.median(total for total, _ in samples)
+    packages = samples[-1][1]
+
+    # 2. Cold start to the first served review
+    review_ms = statistics.median(first_review_ms() for _ in range(args.runs))
+
+    top = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+    if args.json:
+        print(json.dumps({"import_ms": round(import_ms, 1), "first_review_ms": round(review_ms, 1),
+                          "packages_ms": {k: round(v, 1) for k, v in top}}))
+    else:
+        print(f"import backend.main: {import_ms:.1f} ms (median of {args.runs})")
+        print(f"cold start to first /review: {review_ms:.1f} ms")
+        print("Import time by top-level package (self time):")
+        for name, ms in top:
+            print(f"  {name:<24} {ms:8.1f} ms")
+
+    failed = False
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"FAIL: import time {import_ms:.1f} ms exceeds budget {args.max_import_ms} ms")
+        failed = True
+    if args.max_first_review_ms is not None and review_ms > args.max_first_review_ms:
+        print(f"FAIL: first review {review_ms:.1f} ms exceeds budget {args.max_first_review_ms} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def test_admission_control():
+    print("Testing admission control on review endpoints...")
+
+    email = "test_admission@example.com"
+    password = "password123"
+    try:
+        requests.post(f"{BASE_URL}/auth/register", json={"email": email, "password": password, "name": "Test"})
+    except:
+        pass
+    token = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # 1. Oversized bodies are refused before they are parsed
+    resp = requests.post(f"{BASE_URL}/review", json={"code": "x = 1\n" * 600000}, headers=headers)
+    if resp.status_code == 413:
+        print(f"PASS: Oversized body rejected ({resp.json()['detail']}).")
+    else:
+        print(f"FAIL: Expected 413 for oversized body, got {resp.status_code}")
+
+    # 2. Sources with too many lines are refused before analysis
+    resp = requests.post(f"{BASE_URL}/review/diff", json={
+        "original_code": "pass",
+        "modified_code": "\n" * 25000,
+    }, headers=headers)
+    if resp.status_code == 413:
+        print(f"PASS: Line limit enforced ({resp.json()['detail']}).")
+    else:
+        print(f"FAIL: Expected 413 for too many lines, got {resp.status_code}")
+
+    # 3. A burst beyond the user's token bucket is throttled with Retry-After
+    statuses = []
+    retry_after = None
+    for _ in range(40):
+        resp = requests.post(f"{BASE_URL}/review", json={"code": "x = 1", "policies": []}, headers=headers)
+        statuses.append(resp.status_code)
+        if resp.status_code == 429:
+            retry_after = resp.headers.get("Retry-After")
+    print(f"Burst: {statuses.count(200)} admitted, {statuses.count(429)} throttled")
+
+    if statuses[0] == 200 and 429 in statuses and retry_after:
+        print(f"PASS: Burst throttled with Retry-After: {retry_after}s.")
+    else:
+        print("FAIL: Expected the burst to be throttled with a Retry-After header.")
+
+if __name__ == "__main__":
+    try:
+        test_admission_control()
+    except requests.exceptions.ConnectionError:
+        print("Server is not running.")
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.core.ai_client import AIClient
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the model server: flags eval() and records each batch."""
+    batches = []
+    delay = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeModelHandler.batches.append(len(body["items"]))
+        time.sleep(FakeModelHandler.delay)
+
+        results = [
+            {"id": item["id"], "finding": "model: eval() is unsafe" if "eval(" in item["snippet"] else None}
+            for item in body["items"]
+        ]
+        data = json.dumps({"results": results}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class StuckTransportClient(AIClient):
+    """Client whose transport ignores its timeout, like a call stuck in a slow read; counts calls in flight."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.timeouts = []
+
+    def _post_batch(self, batch, timeout):
+        with self.lock:
+            self.timeouts.append(timeout)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.3)
+        with self.lock:
+            self.active -= 1
+        return [None] * len(batch)
+
+def start_fake_model_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModelHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/analyze"
+
+def test_ai_client():
+    print("Testing batched AI client against a fake model server...")
+    server, url = start_fake_model_server()
+    client = AIClient(model_url=url, max_batch_size=8, timeout=0.5)
+
+    snippets = [(f"x = eval(data_{i})" if i % 2 else f"y = {i}", "review") for i in range(20)]
+
+    # 1. One review with 20 snippets is coalesced into ceil(20 / 8) calls
+    results = asyncio.run(client.analyze_many(snippets))
+    print(f"Batches sent: {FakeModelHandler.batches}")
+    if len(FakeModelHandler.batches) == 3 and sum(r is not None for r in results) == 10:
+        print("PASS: Snippets were batched.")
+    else:
+        print("FAIL: Unexpected batching behaviour.")
+
+    # 2. Repeating the review is served from the cache
+    FakeModelHandler.batches.clear()
+    asyncio.run(client.analyze_many(snippets))
+    if not FakeModelHandler.batches:
+        print("PASS: Repeated snippets served from cache.")
+    else:
+        print(f"FAIL: Cache missed ({FakeModelHandler.batches})")
+
+    # 3. Concurrent reviews submitting the same snippet share one request
+    async def concurrent_reviews():
+        fresh = AIClient(model_url=url, max_batch_size=8)
+        return await asyncio.gather(*(fresh.analyze("z = eval(q)", "ctx") for _ in range(5)))
+
+    FakeModelHandler.batches.clear()
+    asyncio.run(concurrent_reviews())
+    if FakeModelHandler.batches == [1]:
+        print("PASS: Concurrent identical snippets coalesced.")
+    else:
+        print(f"FAIL: Expected one single-item batch, got {FakeModelHandler.batches}")
+
+    # 4. A slow backend degrades to the deterministic static result
+    FakeModelHandler.delay = 1.0
+    slow = AIClient(model_url=url, timeout=0.2)
+    result = asyncio.run(slow.analyze("value = eval(user_input)", "review"))
+    FakeModelHandler.delay = 0.0
+    if result == "Critical security risk: eval() detected." and slow.stats["fallbacks"] == 1:
+        print("PASS: Slow backend fell back to static analysis.")
+    else:
+        print(f"FAIL: Unexpected fallback result: {result}")
+
+    # 5. Time spent queued behind the concurrency limit counts against the timeout
+    FakeModelHandler.delay = 0.3
+    queued = AIClient(model_url=url, max_batch_size=1, max_concurrency=1, timeout=0.45)
+
+    async def timed_review():
+        started = time.monotonic()
+        results = await queued.analyze_many([(f"a{i} = eval(b)", "review") for i in range(3)])
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(timed_review())
+    FakeModelHandler.delay = 0.0
+    if results[0] == "model: eval() is unsafe" and queued.stats["fallbacks"] == 2 and elapsed < 0.6:
+        print(f"PASS: Queued batches timed out and degraded ({elapsed:.2f}s).")
+    else:
+        print(f"FAIL: Expected 2 queued fallbacks within the timeout, got {queued.stats} after {elapsed:.2f}s")
+
+    # 6. A timed-out call holds its slot until its thread returns, and each call gets the time left as its timeout
+    stuck = StuckTransportClient(model_url=url, max_batch_size=1, max_concurrency=1, timeout=0.1)
+
+    async def sequential_reviews():
+        await stuck.analyze("c = eval(d)", "review")
+        await stuck.analyze("e = eval(f)", "review")  # no slot until the first thread returns
+        await asyncio.sleep(0.3)
+        await stuck.analyze("g = eval(h)", "review")
+
+    asyncio.run(sequential_reviews())
+    if stuck.max_active == 1 and len(stuck.timeouts) == 2 and stuck.stats["fallbacks"] == 3:
+        print("PASS: Timed-out calls kept their slot until the worker thread returned.")
+    else:
+        print(f"FAIL: Expected 2 calls one at a time, got {len(stuck.timeouts)} (max {stuck.max_active} concurrent)")
+
+    queued = StuckTransportClient(model_url=url, max_batch_size=1, max_concurrency=1, timeout=0.5)
+
+    async def queued_reviews():
+        await asyncio.gather(queued.analyze("i = eval(j)", "review"), queued.analyze("k = eval(l)", "review"))
+
+    asyncio.run(queued_reviews())
+    if len(queued.timeouts) == 2 and queued.timeouts[0] <= 0.5 and queued.timeouts[1] <= 0.5 - 0.25:
+        print(f"PASS: The transport timeout is the time left ({', '.join(f'{t:.2f}s' for t in queued.timeouts)}).")
+    else:
+        print(f"FAIL: Expected the second call to get the time left, got {queued.timeouts}")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    test_ai_client()
@@ -0,0 +1,132 @@
+import ast
+import json
+from backend.core.analyzer import StaticAnalyzer, generate_violation_id
+
+# Runs in-process (no server needed)
+
+with open("backend/policies/rules.json") as f:
+    RULE = next(p for p in json.load(f) if p["id"] == "error_handling")
+
+SOURCE = '''import logging
+
+try:
+    risky()
+except:
+    pass
+
+try:
+    risky()
+except ValueError as e:
+    pass  # ignored on purpose
+except (KeyError, IndexError):
+    logging.warning("lookup failed")
+except TypeError:
+    ...
+except OSError:
+    pass
+    logging.error("unreachable")
+else:
+    pass
+finally:
+    pass
+
+def load(path):
+    try:
+        return open(path).read()
+    except FileNotFoundError:
+        try:
+            return fallback()
+        except Exception:
+            pass
+
+class Client:
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception: pass
+
+async def stream():
+    try:
+        await step()
+    except* ValueError:
+        pass
+
+handler = lambda: None
+'''
+
+class LegacyExceptCheck(ast.NodeVisitor):
+    """The hand-written error_handling check that the declarative query replaced"""
+    def __init__(self):
+        self.records = []
+
+    def visit_ExceptHandler(self, node):
+        if len(node.body) == 1 and isinstance(node.body[0], ast.Pass):
+            self.records.append(("error_handling", node.lineno, "Empty except block detected"))
+        self.generic_visit(node)
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def test_ast_query():
+    print("Testing the declarative ExceptHandler query against the hand-written check...")
+    check("error_handling is a body_only ExceptHandler query",
+          RULE["type"] == "ast" and RULE["query"]["node"] == "ExceptHandler" and RULE["query"]["body_only"] == "Pass")
+
+    legacy = LegacyExceptCheck()
+    legacy.visit(ast.parse(SOURCE))
+    analyzer = StaticAnalyzer(cache=None)
+
+    # 1. Same (rule, line, message) records, hence the same violation ids
+    records = sorted(analyzer.analyze_records(SOURCE, [RULE]))
+    check("Query finds the same empty except blocks", records == sorted(legacy.records),
+          f"query {records}, legacy {sorted(legacy.records)}")
+    check("Both flag the expected handlers", [r[1] for r in records] == [5, 10, 30, 37, 42], str(records))
+    violations = sorted(analyzer.analyze(SOURCE, [RULE]), key=lambda v: v.line)
+    check("Violation ids match the hand-written check",
+          [v.id for v in violations] == [generate_violation_id(*r) for r in sorted(legacy.records, key=lambda r: r[1])])
+
+    # 2. Each handler on its own, so one misplaced match cannot hide another
+    tree = ast.parse(SOURCE)
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Try, ast.TryStar)):
+            snippet = ast.unparse(node)
+            single = LegacyExceptCheck()
+            single.visit(ast.parse(snippet))
+            if sorted(analyzer.analyze_records(snippet, [RULE])) != sorted(single.records):
+                check("Query matches the hand-written check per try statement", False, snippet)
+                break
+    else:
+        check("Query matches the hand-written check per try statement", True)
+
+    # 3. inside/not_inside look at ancestors only; depth counts the node itself
+    nested = '''def outer():
+    for x in a:
+        for y in b:
+            pass
+    def inner():
+        pass
+
+for z in c:
+    pass
+'''
+    def lines(query):
+        policy = {"id": "q", "type": "ast", "severity": "LOW", "description": "Query", "query": query}
+        return [r[1] for r in analyzer.analyze_records(nested, [policy])]
+
+    found = lines({"node": "FunctionDef", "inside": "FunctionDef"})
+    check("inside: only the nested function is flagged", found == [5], str(found))
+    found = lines({"node": "For", "not_inside": "For"})
+    check("not_inside: outermost loops are flagged", found == [2, 8], str(found))
+    found = lines({"node": "For", "inside": "For"})
+    check("inside: a loop is not its own ancestor", found == [3], str(found))
+    found = lines({"node": "For", "depth": {"of": ["For"], "gt": 1}})
+    check("depth counts the node itself", found == [3], str(found))
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_ast_query()
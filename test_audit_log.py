@@ -0,0 +1,68 @@
+import sqlite3
+import time
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def login(email, password="password123"):
+    try:
+        requests.post(f"{BASE_URL}/auth/register", json={"email": email, "password": password, "name": "Test"})
+    except:
+        pass
+    token = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_audit_log():
+    print("Testing the review audit log...")
+    headers = login("test_audit_user@example.com")
+    code = "import time\n\nasync def handler():\n    time.sleep(1)\n    password = 'abcdefghijklmnopqrstuvwxyz'\n"
+
+    # 1. Reviews return the id of their (write-behind) audit entry
+    resp = requests.post(f"{BASE_URL}/review", headers=headers, json={
+        "code": code, "policies": ["no_secrets", "blocking_calls"], "filename": "handler.py"})
+    audit = resp.json()["audit"]
+    diff = requests.post(f"{BASE_URL}/review/diff", headers=headers, json={
+        "original_code": "x = 1\n", "modified_code": code, "policies": ["no_secrets"]}).json()["audit"]
+    if resp.status_code == 200 and audit.get("audit_id") and audit["file"] == "handler.py" and diff.get("audit_id"):
+        print("PASS: Review responses carry their audit id and file name.")
+    else:
+        print(f"FAIL: Expected an audit id, got {resp.status_code}: {audit}")
+
+    # 2. Only admins read the log
+    resp = requests.get(f"{BASE_URL}/admin/audit", headers=headers)
+    if resp.status_code == 403:
+        print("PASS: Non-admin refused.")
+    else:
+        print(f"FAIL: Expected 403 for a non-admin, got {resp.status_code}")
+
+    # 3. The entries reach the database within a few flush intervals
+    admin_email = "test_audit_admin@example.com"
+    admin_headers = login(admin_email)
+    with sqlite3.connect("sql_app.db") as conn:
+        conn.execute("UPDATE users SET role = 'ADMIN' WHERE email = ?", (admin_email,))
+
+    entries = {}
+    for _ in range(20):
+        data = requests.get(f"{BASE_URL}/admin/audit?limit=50", headers=admin_headers).json()
+        entries = {e["id"]: e for e in data["entries"]}
+        if audit.get("audit_id") in entries and diff.get("audit_id") in entries:
+            break
+        time.sleep(0.25)
+
+    entry = entries.get(audit.get("audit_id"))
+    if entry and entry["file"] == "handler.py" and entry["endpoint"] == "/review" \
+            and entry["violations"] == sum(entry["severity_counts"].values()) == 2 \
+            and entry["policies"] == "no_secrets,blocking_calls" and entry["total_ms"] >= entry["analysis_ms"]:
+        print(f"PASS: Audit entry written ({entry['risk_level']}, {entry['severity_counts']}, {entry['total_ms']} ms).")
+    else:
+        print(f"FAIL: Audit entry missing or wrong: {entry}")
+    if diff.get("audit_id") in entries and entries[diff["audit_id"]]["endpoint"] == "/review/diff":
+        print("PASS: Diff review audited.")
+    else:
+        print("FAIL: Diff review audit entry missing.")
+
+if __name__ == "__main__":
+    try:
+        test_audit_log()
+    except requests.exceptions.ConnectionError:
+        print("Server is not running.")
@@ -0,0 +1,138 @@
+import os
+import random
+import tempfile
+import time
+from backend.core import line_index
+from backend.core.analysis_context import AnalysisContext
+from backend.core.analyzer import BUFFER_SCAN_THRESHOLD, StaticAnalyzer
+from backend.core.deadline import Deadline
+
+# Runs in-process (no server needed)
+
+POLICIES = [
+    {"id": "no_secrets", "type": "regex", "severity": "HIGH", "description": "No hardcoded secrets",
+     "pattern": "(?i)(api_key|secret|password|token)\\s*=\\s*['\"][a-zA-Z0-9_\\-]{20,}['\"]"},
+    {"id": "no_eval", "type": "regex", "severity": "HIGH", "description": "No eval", "pattern": "\\beval\\("},
+    {"id": "no_print", "type": "regex", "severity": "LOW", "description": "No print", "pattern": "print\\("},
+]
+
+CHUNK = '''import os
+API_KEY = "abcdefghijklmnopqrstuvwxyz123456"
+# password = "abcdefghijklmnopqrstuvwxyz123456" in a comment does not count
+def f(x):
+    print(x)  # print( again in a comment
+    s = "eval(x) in a string"
+    return eval(x)
+'''
+
+# Anchored and whitespace-hungry patterns, where line and buffer scans are most likely to differ
+EDGE_POLICIES = POLICIES + [
+    {"id": "line_start", "type": "regex", "severity": "LOW", "description": "Import at line start", "pattern": "^import\\b"},
+    {"id": "line_end", "type": "regex", "severity": "LOW", "description": "Call at line end", "pattern": "\\)$"},
+    {"id": "trailing", "type": "regex", "severity": "LOW", "description": "Trailing space", "pattern": "print\\(\\w*\\)\\s+"},
+]
+
+EDGE_CASES = {
+    "CRLF line endings": "import os\r\nprint(x)\r\ny = eval(x)\r\n# eval(x)\r\nprint(y)\r\n",
+    "no final newline": "x = 1\nimport os\nprint(x)",
+    "no final newline, CRLF": "import os\r\nprint(x)\r\neval(x)",
+    "matches at line start": "eval(a)\nprint(b)\nimport sys\n  import os\nprint(c) \n",
+    "match on the first and last byte": "eval(x)\nz = 0\nprint(x)",
+    "non-ASCII before matches": "s = 'héllo'  # ünïcode\nprint(s)\nt = eval('ß')\n",
+    "blank and empty lines": "\n\n\nprint(x)\n\r\n\n",
+}
+
+FRAGMENTS = ["import os", "print(x)", "print(x) ", "y = eval(x)", "# eval(x)", "s = 'print(x)'", "",
+             "  import sys", "token = 'abcdefghijklmnopqrstuvwxyz'", "def f():", "    return eval(y)"]
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def large_source():
+    code = CHUNK * (BUFFER_SCAN_THRESHOLD // len(CHUNK) + 1)
+    assert len(code) >= BUFFER_SCAN_THRESHOLD
+    return code
+
+def line_pairs(records):
+    return sorted((rule_id, line) for rule_id, line, _ in records)
+
+def scans_agree(analyzer, code):
+    """(rule, line) pairs from the line scan, the str buffer scan and the bytes buffer scan"""
+    expected = line_pairs(analyzer._scan_lines(AnalysisContext(code), EDGE_POLICIES))
+    from_text = line_pairs(analyzer._scan_buffer(code, EDGE_POLICIES, AnalysisContext(code)))
+    from_bytes = line_pairs(analyzer._scan_buffer(code.encode(), EDGE_POLICIES))
+    return expected == from_text == from_bytes, expected, from_text, from_bytes
+
+def test_buffer_scan():
+    print("Testing the whole-buffer regex scan...")
+    analyzer = StaticAnalyzer(cache=None)
+    code = large_source()
+    expected = analyzer._scan_lines(AnalysisContext(code), POLICIES)
+
+    # 1. Sources at the buffer threshold take the buffer path and match the line scan
+    records = analyzer.analyze_records(code, POLICIES)
+    check("analyze_records on a 1 MiB source matches the line scan", records == expected,
+          f"{len(records)} vs {len(expected)} records")
+
+    # 2. The same with a deadline that does not expire
+    deadline = Deadline(60)
+    records = analyzer._scan_buffer(code, POLICIES, AnalysisContext(code), deadline)
+    check("Buffer scan under a live deadline matches the line scan", records == expected and not deadline.incomplete)
+
+    # 3. An expired deadline stops the scan and marks every regex policy incomplete
+    deadline = Deadline(1e-9)
+    time.sleep(0.001)
+    records = analyzer._scan_buffer(code, POLICIES, AnalysisContext(code), deadline)
+    check("Expired deadline skips the buffer scan", records == [] and deadline.incomplete == [p['id'] for p in POLICIES],
+          str(deadline.incomplete))
+
+    # 4. Bytes buffers and files on disk (mmap) give the same records
+    by_model = sorted((v.rule_id, v.line) for v in analyzer.scan_buffer(code.encode(), POLICIES))
+    check("scan_buffer over bytes matches the line scan", by_model == sorted((r, l) for r, l, _ in expected))
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(code)
+    try:
+        from_file = sorted((v.rule_id, v.line) for v in analyzer.analyze_file(f.name, POLICIES))
+    finally:
+        os.unlink(f.name)
+    check("analyze_file (mmap) matches the line scan", from_file == sorted((r, l) for r, l, _ in expected))
+
+    # 5. Line endings, missing final newlines and anchored matches give the same (rule, line) pairs
+    for name, code in EDGE_CASES.items():
+        ok, expected, from_text, from_bytes = scans_agree(analyzer, code)
+        check(f"Buffer scan matches the line scan: {name}", ok and expected != [],
+              f"lines {expected}, text {from_text}, bytes {from_bytes}")
+
+    # 6. The same over random mixes of those lines
+    rng = random.Random(30)
+    for _ in range(300):
+        code = "".join(rng.choice(FRAGMENTS) + rng.choice(["\n", "\r\n"]) for _ in range(rng.randint(1, 12)))
+        if rng.random() < 0.5:
+            code = code.rstrip("\r\n")
+        ok, expected, from_text, from_bytes = scans_agree(analyzer, code)
+        if not ok:
+            check("Buffer scan matches the line scan on random sources", False,
+                  f"{code!r}: lines {expected}, text {from_text}, bytes {from_bytes}")
+            break
+    else:
+        check("Buffer scan matches the line scan on random sources", True)
+
+    # 7. Without NumPy (e.g. the pre-commit hook under -S) the line index falls back to a list
+    saved = line_index.np
+    try:
+        line_index.np = None
+        records = analyzer.analyze_records(large_source(), POLICIES)
+        check("Buffer scan without NumPy matches the line scan", records == analyzer._scan_lines(AnalysisContext(large_source()), POLICIES))
+        disagree = [name for name, code in EDGE_CASES.items() if not scans_agree(analyzer, code)[0]]
+        check("Buffer scan without NumPy matches the line scan on the edge cases", not disagree, str(disagree))
+    finally:
+        line_index.np = saved
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_buffer_scan()
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+from backend.core.analysis_context import AnalysisContext
+from backend.core.call_graph import module_records, project_records
+from backend.core.job_queue import JobQueue, JobWorker
+
+# Runs in-process (no server needed)
+
+with open("backend/policies/rules.json") as f:
+    RULE = next(p for p in json.load(f) if p["id"] == "blocking_calls")
+
+MODULE = '''import asyncio
+import time
+import requests
+
+def pause():
+    time.sleep(1)
+
+def helper():
+    pause()
+
+def fetch(url):
+    return requests.get(url)
+
+async def direct():
+    time.sleep(1)
+
+async def indirect():
+    helper()
+
+async def via_wildcard():
+    fetch("u")
+    requests.post("u")
+
+async def offloaded():
+    await asyncio.to_thread(time.sleep, 1)
+    await asyncio.to_thread(helper)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, helper)
+    await loop.run_in_executor(None, lambda: time.sleep(1))
+    await asyncio.sleep(1)
+
+async def calls_coroutine():
+    await direct()
+
+def sync_entry():
+    helper()
+'''
+
+API = '''from .util import slow
+from pkg import util
+
+async def handler():
+    slow()
+    util.slow()
+    util.quick()
+'''
+
+UTIL = '''import time
+
+def slow():
+    time.sleep(2)
+
+def quick():
+    return 1
+'''
+
+PROJECT = [("pkg/__init__.py", ""), ("pkg/api.py", API), ("pkg/util.py", UTIL)]
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def lines(records):
+    return sorted(line for _, line, _ in records)
+
+def test_call_graph():
+    print("Testing blocking-call detection through the call graph...")
+    records = module_records(AnalysisContext(MODULE), [RULE])
+    by_line = {line: message for _, line, message in records}
+
+    # 1. Direct and indirect blocking calls, reported on the call inside the coroutine
+    check("Direct time.sleep() in a coroutine reported", "in async def direct" in by_line.get(15, ""), str(by_line))
+    check("Sync helper chain to time.sleep() reported",
+          by_line.get(18) == "Blocking call time.sleep() reachable from async def indirect via helper() -> pause() -> time.sleep()",
+          str(by_line.get(18)))
+
+    # 2. requests.* matches any name under requests, directly or through a helper
+    check("requests.* wildcard matches requests.post()", "requests.post()" in by_line.get(22, ""), str(by_line))
+    check("requests.* wildcard matches requests.get() via a helper", "fetch() -> requests.get()" in by_line.get(21, ""),
+          str(by_line))
+
+    # 3. Work handed to a thread, awaited coroutines and sync callers are not reported
+    check("to_thread / run_in_executor / lambdas / coroutine calls not reported", lines(records) == [15, 18, 21, 22],
+          str(lines(records)))
+
+    # 4. Cross-file imports resolve within a project, and only there
+    project = project_records([(path, AnalysisContext(code)) for path, code in PROJECT], [RULE])
+    check("Relative and absolute imports resolved across files", [lines(r) for r in project] == [[], [5, 6], []],
+          str(project))
+    check("Chain names the imported function", "via pkg.util.slow() -> time.sleep()" in project[1][0][2], project[1][0][2])
+    check("A single file cannot see into its imports", module_records(AnalysisContext(API), [RULE]) == [])
+
+    # 5. A review job resolves the same calls, since call-graph policies run over all its files
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        queue = JobQueue(path)
+        job_id = queue.submit(1, [list(f) for f in PROJECT], ["blocking_calls"])
+        JobWorker(queue, owner="test").process(queue.claim("test"))
+        result = queue.get(job_id)["result"]
+        found = {file_path: sorted(r[1] for r in records) for file_path, records in result["files"]}
+        check("Review job reports cross-file blocking calls",
+              found == {"pkg/__init__.py": [], "pkg/api.py": [5, 6], "pkg/util.py": []}, str(found))
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_call_graph()
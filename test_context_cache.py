@@ -0,0 +1,72 @@
+import tracemalloc
+import gc
+from backend.core import analysis_context
+from backend.core.analysis_context import AnalysisContext, context_cache_bytes, get_context
+
+# Runs in-process (no server needed)
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def source(n: int, functions: int = 200) -> str:
+    return f"# source {n}\n" + "".join(
+        f"def f{i}(x, y='s{i}'):\n    # comment {i}\n    return [x * k for k in range({i})] + [y]\n"
+        for i in range(functions)
+    )
+
+def build(ctx: AnalysisContext):
+    ctx.lines, ctx.line_index, ctx.non_code_spans, ctx.tree
+
+def test_context_cache():
+    print("Testing the analysis context cache limits...")
+    saved = (analysis_context.CONTEXT_CACHE_SIZE, analysis_context.CONTEXT_CACHE_BYTES,
+             analysis_context.CONTEXT_CACHE_MAX_CHARS)
+    analysis_context._context_cache.clear()
+    try:
+        # 1. The estimate is close to what the artifacts really hold
+        code = source(0)
+        build(AnalysisContext(source(-1)))  # first use imports and compiles; not part of a context
+        gc.collect()
+        tracemalloc.start()
+        ctx = AnalysisContext(code)
+        build(ctx)
+        gc.collect()
+        measured, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        estimate = ctx.estimated_bytes()
+        check("Size estimate within 2x of the measured footprint", measured / 2 <= estimate <= measured * 2,
+              f"estimated {estimate}, measured {measured}")
+
+        # 2. Contexts whose artifacts exceed the byte budget are evicted, oldest first
+        analysis_context.CONTEXT_CACHE_SIZE = 1000
+        analysis_context.CONTEXT_CACHE_BYTES = estimate * 3
+        contexts = []
+        for n in range(10):
+            ctx = get_context(source(n))
+            build(ctx)
+            contexts.append(ctx)
+        get_context("x = 1\n")  # re-checks the budget now that the artifacts exist
+        total = context_cache_bytes()
+        check("Cached contexts stay within CONTEXT_CACHE_BYTES", total <= analysis_context.CONTEXT_CACHE_BYTES,
+              f"{total} > {analysis_context.CONTEXT_CACHE_BYTES}")
+        check("Most recent source still cached", get_context(source(9)) is contexts[9])
+        check("Oldest source evicted", get_context(source(0)) is not contexts[0])
+
+        # 3. Sources over CONTEXT_CACHE_MAX_CHARS are never cached
+        analysis_context.CONTEXT_CACHE_MAX_CHARS = 1000
+        big = source(42)
+        check("Large source not cached", get_context(big) is not get_context(big))
+        check("Small source still shared", get_context("y = 2\n") is get_context("y = 2\n"))
+    finally:
+        (analysis_context.CONTEXT_CACHE_SIZE, analysis_context.CONTEXT_CACHE_BYTES,
+         analysis_context.CONTEXT_CACHE_MAX_CHARS) = saved
+        analysis_context._context_cache.clear()
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_context_cache()
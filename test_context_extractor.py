@@ -0,0 +1,147 @@
+import ast
+import asyncio
+import time
+from backend.core import ai_client
+from backend.core.ai_client import AIClient
+from backend.core.context_extractor import ContextExtractor, estimate_tokens
+from backend.core.deadline import Deadline
+
+# Runs in-process (no server needed)
+
+SOURCE = '''import os
+import subprocess
+
+LIMIT = 10
+
+def helper(x):
+    return x + LIMIT
+
+def run(cmd):
+    data = helper(1)
+    result = eval(cmd)
+    os.system(cmd)
+    return result
+
+def outer(items):
+    total = 0
+    def inner(item):
+        return eval(item)
+    for item in items:
+        total += inner(item)
+    subprocess.call(items)
+    return total
+'''
+
+class Finding:
+    def __init__(self, line, severity, status="OPEN"):
+        self.line = line
+        self.severity = severity
+        self.status = status
+
+# Lines 11 and 12 share run(); 18 is in inner(), whose region overlaps outer()'s for line 21
+FINDINGS = [Finding(11, "HIGH"), Finding(12, "MEDIUM"), Finding(18, "HIGH"), Finding(21, "LOW")]
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def selected_cost(code, regions):
+    lines = code.split('\n')
+    return sum(estimate_tokens(lines[i - 1]) + 1 for r in regions for i in range(r.start, r.end + 1))
+
+def test_context_extractor():
+    print("Testing token-budgeted context extraction...")
+    tree = ast.parse(SOURCE)
+
+    # 1. With room for everything, overlapping regions are merged into sorted, disjoint ranges
+    extracted = ContextExtractor(token_budget=1000).extract(SOURCE, tree, FINDINGS)
+    spans = [(r.start, r.end, r.flagged_lines) for r in extracted.regions]
+    check("Nothing dropped under a large budget", extracted.dropped_lines == [])
+    check("Findings in one function share a region", (9, 13, [11, 12]) in spans, str(spans))
+    check("Nested inner()/outer() regions merged", (15, 22, [18, 21]) in spans, str(spans))
+    check("Regions sorted and non-overlapping",
+          all(a.end + 1 < b.start for a, b in zip(extracted.regions, extracted.regions[1:])), str(spans))
+    check("Referenced import and helper signature included",
+          any(r.start <= 1 <= r.end for r in extracted.regions) and any(r.start <= 6 <= r.end for r in extracted.regions))
+    check("Unreferenced module lines left out", not any(r.start <= 4 <= r.end for r in extracted.regions))
+
+    # 2. The selected lines never cost more than the budget, and each finding is kept or dropped
+    flagged = sorted(f.line for f in FINDINGS)
+    for budget in range(0, 120, 6):
+        extracted = ContextExtractor(token_budget=budget).extract(SOURCE, tree, FINDINGS)
+        kept = sorted(line for r in extracted.regions for line in r.flagged_lines)
+        if selected_cost(SOURCE, extracted.regions) > budget or sorted(kept + extracted.dropped_lines) != flagged:
+            check(f"Budget {budget} respected", False,
+                  f"cost {selected_cost(SOURCE, extracted.regions)}, kept {kept}, dropped {extracted.dropped_lines}")
+            break
+    else:
+        check("Budget respected and findings accounted for at every budget", True)
+
+    # 3. A tight budget keeps the highest-severity finding, narrowed to its statement
+    extracted = ContextExtractor(token_budget=12).extract(SOURCE, tree, FINDINGS)
+    check("Tight budget keeps the HIGH finding's statement",
+          [(r.start, r.end, r.kind) for r in extracted.regions] == [(11, 11, "statement")]
+          and extracted.dropped_lines == [12, 18, 21], repr(extracted.regions))
+
+    # 4. When nothing fits, every finding is dropped and no context is sent
+    extracted = ContextExtractor(token_budget=3).extract(SOURCE, tree, FINDINGS)
+    check("Nothing fits: all findings dropped",
+          extracted.regions == [] and extracted.text == "" and extracted.dropped_lines == flagged)
+
+    # 5. Code that does not parse falls back to line windows
+    broken = SOURCE.replace("def run(cmd):", "def run(cmd)")
+    extracted = ContextExtractor(token_budget=1000).extract(broken, None, [Finding(11, "HIGH")])
+    check("Unparsed code uses a window around the finding",
+          [(r.start, r.end) for r in extracted.regions] == [(8, 14)], repr(extracted.regions))
+
+    # 6. AIClient.review sends one snippet per flagged region (static fallback without a backend)
+    client = AIClient(model_url=None)
+    extracted, findings = asyncio.run(client.review(SOURCE, tree, FINDINGS))
+    check("AIClient.review sends only the flagged regions",
+          client.stats["requests"] == 2 and findings == ["Critical security risk: eval() detected."] * 2,
+          f"{client.stats}, {findings}")
+
+    # 7. The /review AI step sends the open findings only, and nothing once the deadline has passed
+    from backend.main import review_with_ai
+
+    saved = ai_client._ai_client
+    try:
+        shared = ai_client._ai_client = AIClient(model_url=None)
+        insights = asyncio.run(review_with_ai(SOURCE, FINDINGS, Deadline(30)))
+        spans = [(i.start_line, i.end_line, i.flagged_lines, i.finding) for i in insights]
+        check("Review insights cover each flagged region",
+              spans == [(9, 13, [11, 12], "Critical security risk: eval() detected."),
+                        (15, 22, [18, 21], "Critical security risk: eval() detected.")], str(spans))
+        dismissed = [Finding(f.line, f.severity, "FALSE_POSITIVE") if f.line in (11, 12) else f for f in FINDINGS]
+        insights = asyncio.run(review_with_ai(SOURCE, dismissed, Deadline(30)))
+        check("False positives are not sent to the model", [i.flagged_lines for i in insights] == [[18, 21]], str(insights))
+        expired = Deadline(1e-9)
+        time.sleep(0.001)
+        requests = shared.stats["requests"]
+        check("Nothing is sent once the review deadline has passed",
+              asyncio.run(review_with_ai(SOURCE, FINDINGS, expired)) == [] and shared.stats["requests"] == requests)
+
+        class StalledBackend(AIClient):
+            def _post_batch(self, batch, timeout):
+                time.sleep(0.5)
+                return [None] * len(batch)
+
+        ai_client._ai_client = StalledBackend(model_url="http://127.0.0.1:9/v1/analyze", timeout=5)
+
+        async def stalled_review():
+            started = time.monotonic()
+            return await review_with_ai(SOURCE, FINDINGS, Deadline(0.2)), time.monotonic() - started
+
+        insights, elapsed = asyncio.run(stalled_review())
+        check("A stalled model is left out when the review deadline passes", insights == [] and elapsed < 0.4,
+              f"{insights} after {elapsed:.2f}s")
+    finally:
+        ai_client._ai_client = saved
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_context_extractor()
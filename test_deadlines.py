@@ -0,0 +1,64 @@
+import time
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def login(email, password="password123"):
+    try:
+        requests.post(f"{BASE_URL}/auth/register", json={"email": email, "password": password, "name": "Test"})
+    except:
+        pass
+    token = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def large_source():
+    # Unique per call so no cached context or result makes it fast
+    body = "def f(items):\n    seen = []\n    for x in items:\n        if x not in seen:\n            seen.append(x)\n    return seen\n"
+    return f"# {time.time()}\n" + body * 3000
+
+def test_deadlines():
+    print("Testing review deadlines...")
+    headers = login("test_deadline_user@example.com")
+    policies = ["no_secrets", "nested_loops", "error_handling", "blocking_calls"]
+
+    # 1. Without a client timeout the review is complete
+    resp = requests.post(f"{BASE_URL}/review", json={"code": "x = 1\n", "policies": policies}, headers=headers)
+    data = resp.json()
+    if resp.status_code == 200 and data["partial"] is False and "X-Review-Partial" not in resp.headers:
+        print("PASS: Review within the default deadline is complete.")
+    else:
+        print(f"FAIL: Expected a complete review, got {resp.status_code}: {resp.text[:200]}")
+
+    # 2. A deadline too short for the analysis yields a marked partial result or a 504
+    resp = requests.post(f"{BASE_URL}/review", json={"code": large_source(), "policies": policies},
+                         headers={**headers, "X-Review-Timeout": "0.001"})
+    if resp.status_code == 504:
+        print("PASS: Review past its deadline answered 504.")
+    elif resp.status_code == 200 and resp.json()["partial"] and resp.headers.get("X-Review-Partial"):
+        print(f"PASS: Partial review returned (incomplete: {resp.json()['incomplete_policies']}).")
+    else:
+        print(f"FAIL: Expected 504 or a partial review, got {resp.status_code}: {resp.text[:200]}")
+
+    # 3. The same for a diff review
+    original = large_source()
+    modified = original.replace("seen = []", "seen = set()")
+    resp = requests.post(f"{BASE_URL}/review/diff", json={"original_code": original, "modified_code": modified,
+                                                           "policies": policies},
+                         headers={**headers, "X-Review-Timeout": "0.001"})
+    if resp.status_code == 504 or (resp.status_code == 200 and resp.json()["partial"]):
+        print(f"PASS: Diff review past its deadline stopped early ({resp.status_code}).")
+    else:
+        print(f"FAIL: Expected 504 or a partial diff review, got {resp.status_code}: {resp.text[:200]}")
+
+    # 4. Missing diff fields are still a client error
+    resp = requests.post(f"{BASE_URL}/review/diff", json={"original_code": "x = 1"}, headers=headers)
+    if resp.status_code == 422:
+        print("PASS: Incomplete diff request rejected with 422.")
+    else:
+        print(f"FAIL: Expected 422, got {resp.status_code}")
+
+if __name__ == "__main__":
+    try:
+        test_deadlines()
+    except requests.exceptions.ConnectionError:
+        print("Server is not running.")
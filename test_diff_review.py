@@ -0,0 +1,123 @@
+import asyncio
+import difflib
+import random
+import time
+from fastapi import HTTPException
+from backend.core.deadline import EXPIRED, Deadline
+from backend.routers import review
+from backend.routers.review import changed_lines, review_sources
+
+# Runs in-process (no server needed)
+
+LINES = ["import os", "def f(x):", "    return x", "    x += 1", "", "class A:", "    pass", "# note", "y = f(2)",
+         "    if x:", "        print(x)", "for i in items:", "z = y * 2"]
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def differ_changes(original_lines, modified_lines):
+    """Changed lines and counts from difflib.Differ output, as the diff review computed them before"""
+    changed, added, removed, current = [], 0, 0, 0
+    for line in difflib.Differ().compare(original_lines, modified_lines):
+        if line[0] == ' ':
+            current += 1
+        elif line[0] == '-':
+            removed += 1
+        elif line[0] == '+':
+            current += 1
+            changed.append(current)
+            added += 1
+    return changed, added, removed
+
+def edit(rng, lines):
+    lines = list(lines)
+    for _ in range(rng.randint(1, 6)):
+        i = rng.randint(0, len(lines))
+        op = rng.random()
+        if op < 0.35 or not lines:
+            lines.insert(i, rng.choice(LINES))
+        elif op < 0.7:
+            del lines[min(i, len(lines) - 1)]
+        else:
+            lines[min(i, len(lines) - 1)] = rng.choice(LINES) + "  # changed"
+    return lines
+
+class CountingDeadline(Deadline):
+    """Expires after a fixed number of checks, to stop the diff part way through"""
+    def __init__(self, checks: int):
+        super().__init__()
+        self.checks = checks
+
+    @property
+    def expired(self) -> bool:
+        self.checks -= 1
+        if self.checks < 0 and self.reason is None:
+            self.reason = EXPIRED
+        return self.reason is not None
+
+def test_diff_review():
+    print("Testing diff change detection and diff review deadlines...")
+    rng = random.Random(48)
+
+    # 1. Same changed lines and counts as the Differ-based diff it replaces
+    for _ in range(500):
+        original = [rng.choice(LINES) for _ in range(rng.randint(0, 60))]
+        modified = edit(rng, original)
+        expected = differ_changes(original, modified)
+        got = changed_lines(original, modified, Deadline())
+        if got != expected:
+            check("changed_lines matches the Differ output", False, f"{original} -> {modified}: {got} vs {expected}")
+            break
+    else:
+        check("changed_lines matches the Differ output on random edits", True)
+
+    # 2. Lines autojunk ignores in large files (here the blank lines) are not reported as changed
+    original = [line for i in range(200) for line in (f"v{i} = {i}", "")]
+    modified = [line for i in range(200) for line in (f"v{i} = {i} + 1", "")]
+    changes = changed_lines(original, modified, Deadline())
+    check("Common unchanged lines inside a rewritten block are not changed",
+          changes == differ_changes(original, modified) and changes[0] == list(range(1, 400, 2)), str(changes[1:]))
+    saved = review.DIFF_REFINE_MAX_PAIRS
+    try:
+        review.DIFF_REFINE_MAX_PAIRS = 0
+        check("Blocks over DIFF_REFINE_MAX_PAIRS count every line", changed_lines(original, modified, Deadline())[1:] == (400, 400))
+    finally:
+        review.DIFF_REFINE_MAX_PAIRS = saved
+
+    # 3. The diff stops at the deadline: already expired, or part way through the blocks
+    expired = Deadline(1e-9)
+    time.sleep(0.001)
+    check("Expired deadline returns no diff", changed_lines(original, modified, expired) is None)
+    original = [f"a{i}" for i in range(2000)]
+    modified = [f"a{i}" if i % 10 else f"b{i}" for i in range(2000)]
+    check("Deadline passing between blocks stops the diff", changed_lines(original, modified, CountingDeadline(5)) is None)
+    check("Deadline that never passes completes the diff", changed_lines(original, modified, CountingDeadline(10 ** 6)) is not None)
+
+    # 4. Large rewrites stay fast: blocks over DIFF_REFINE_MAX_PAIRS are not matched again
+    original = [f"line_{i} = {i}" for i in range(20000)]
+    modified = [f"line_{i} = {i} + 1" for i in range(20000)]
+    started = time.monotonic()
+    changes = changed_lines(original, modified, Deadline(30))
+    elapsed = time.monotonic() - started
+    check("20k-line rewrite diffed within a second", changes is not None and changes[1] == 20000 and elapsed < 1.0,
+          f"{elapsed:.2f}s")
+
+    # 5. A diff review whose deadline passes answers 504, or 499 once the client has left
+    policies = [{"id": "no_eval", "type": "regex", "severity": "HIGH", "description": "No eval", "pattern": "eval\\("}]
+    for name, deadline, status in [("expired", CountingDeadline(0), 504), ("disconnected", Deadline(), 499)]:
+        if status == 499:
+            deadline.cancel()
+        try:
+            asyncio.run(review_sources(None, "x = 1\n", "x = eval(y)\n", policies, None, None, deadline))
+            check(f"Diff review with a {name} deadline answers {status}", False, "no exception")
+        except HTTPException as e:
+            check(f"Diff review with a {name} deadline answers {status}", e.status_code == status, str(e.status_code))
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_diff_review()
@@ -0,0 +1,64 @@
+import json
+import requests
+from websockets.sync.client import connect
+
+BASE_URL = "http://127.0.0.1:8000"
+WS_URL = "ws://127.0.0.1:8000"
+
+def test_live_session():
+    print("Testing live review sessions...")
+
+    email = "test_live@example.com"
+    password = "password123"
+    try:
+        requests.post(f"{BASE_URL}/auth/register", json={"email": email, "password": password, "name": "Test"})
+    except:
+        pass
+    token = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+
+    code = "def handler(x):\n    return x\n" * 500
+    with connect(f"{WS_URL}/review/live?token={token}") as ws:
+        # 1. Opening a session returns the full snapshot
+        ws.send(json.dumps({"type": "open", "code": code, "policies": ["no_secrets", "error_handling"]}))
+        snapshot = json.loads(ws.recv())
+        if snapshot["type"] == "snapshot" and snapshot["violations"] == []:
+            print("PASS: Clean document opened with no violations.")
+        else:
+            print(f"FAIL: Unexpected snapshot: {snapshot}")
+
+        # 2. Inserting a hardcoded secret comes back as an added violation
+        ws.send(json.dumps({"type": "edit", "version": 1, "edits": [{
+            "range": {"start": {"line": 1, "character": 0}, "end": {"line": 1, "character": 0}},
+            "text": "    api_key = 'abcdefghijklmnopqrstuvwxyz123456'\n",
+        }]}))
+        delta = json.loads(ws.recv())
+        added = [(v["rule_id"], v["line"]) for v in delta["added"]]
+        if delta["type"] == "delta" and delta["version"] == 1 and ("no_secrets", 2) in added:
+            print(f"PASS: Secret reported incrementally in {delta['elapsed_ms']} ms.")
+        else:
+            print(f"FAIL: Expected a no_secrets violation on line 2, got {delta}")
+
+        # 3. Inserting lines above moves the violation instead of re-adding it
+        ws.send(json.dumps({"type": "edit", "version": 2, "edits": [{
+            "range": {"start": {"line": 0, "character": 0}, "end": {"line": 0, "character": 0}},
+            "text": "import os\n\n",
+        }]}))
+        delta = json.loads(ws.recv())
+        if not delta["added"] and not delta["removed"] and [m["line"] for m in delta["moved"]] == [4]:
+            print("PASS: Violation moved with the edit.")
+        else:
+            print(f"FAIL: Expected a single move to line 4, got {delta}")
+
+        # 4. Malformed edits are reported without closing the session
+        ws.send(json.dumps({"type": "edit", "version": 3, "edits": [{"range": {"start": {}}}]}))
+        error = json.loads(ws.recv())
+        if error["type"] == "error":
+            print("PASS: Malformed edit rejected.")
+        else:
+            print(f"FAIL: Expected an error, got {error}")
+
+if __name__ == "__main__":
+    try:
+        test_live_session()
+    except requests.exceptions.ConnectionError:
+        print("Server is not running.")
@@ -0,0 +1,107 @@
+import json
+import random
+from backend.core import prefilter
+from backend.core.analyzer import compile_pattern
+from backend.core.prefilter import compile_prefilter, required_literals
+
+# Runs in-process (no server needed)
+
+with open("backend/policies/rules.json") as f:
+    RULE_PATTERNS = [p["pattern"] for p in json.load(f) if p.get("type") == "regex"]
+
+PATTERNS = RULE_PATTERNS + [
+    r"(?i)secret_key\s*=",                  # case-insensitive, whole pattern
+    r"(?i:api)_token",                      # case-insensitive group only
+    r"time\.sleep|requests\.(get|post)\(",  # alternation
+    r"req(uests|uire)\b",                   # alternation sharing a prefix
+    r"(?:abc)+d",                           # repeated literal
+    r"(foo)?bar\(",                         # optional group before the literal
+    r"api",                                 # literal that prefixes another pattern's
+    r"\d{3,}",                              # no literal at all
+    r"[a-z]+\(\)",                          # character classes only
+    r"ab|xyz",                              # a branch below MIN_LITERAL_LENGTH
+    r"^import\s+\w+$",                      # anchored
+]
+
+FRAGMENTS = [
+    "import os", "import  logging", "logger.info(x)", "time.sleep(1)", "Time.Sleep(1)", "requests.get(u)",
+    "requests.post(u)", "require x", "SECRET_KEY = 'x'", "Secret_Key=1", "API_token", "Api_Token", "api_TOKEN",
+    "abcabcd", "abd", "foobar(", "bar(", "API_KEY = 'abcdefghijklmnopqrstuvwxyz'", "token = \"ABCDEFGHIJKLMNOPQRSTUV\"",
+    "x = 12345", "f()", "ab", "xyz", "print(x)", "# api", "s = 'apis'", "\u212aelvin = 1", "SECRET_\u212aEY = 1", "café = 'secret_key='",
+]
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def missed_lines(patterns, code):
+    """(pattern, line) pairs the full regex matches but the prefilter did not offer"""
+    candidates = compile_prefilter(patterns).candidate_lines(code)
+    missed = []
+    for pattern, lines in zip(patterns, candidates):
+        if lines is None:
+            continue
+        offered = set(lines)
+        compiled = compile_pattern(pattern)
+        for i, line in enumerate(code.split('\n')):
+            if i not in offered and compiled.search(line):
+                missed.append((pattern, i))
+    return missed
+
+def check_backend(name):
+    prefilter._prefilters.clear()
+    rng = random.Random(43)
+
+    # 1. Random sources: the prefilter never hides a line the full regex matches
+    for _ in range(300):
+        lines = [" ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 15))]
+        code = "\n".join(lines)
+        if rng.random() < 0.3:
+            code = code.upper() if rng.random() < 0.5 else code.lower()
+        missed = missed_lines(PATTERNS, code)
+        if missed:
+            check(f"[{name}] No matching line dropped", False, f"{missed[:3]} in {code!r}")
+            break
+    else:
+        check(f"[{name}] No matching line dropped on random sources", True)
+
+    # 2. The prefilter does narrow literal patterns, and leaves literal-free ones unfiltered
+    code = "x = 1\ntime.sleep(1)\nSECRET_KEY = 'v'\ny = 2\n"
+    candidates = dict(zip(PATTERNS, compile_prefilter(PATTERNS).candidate_lines(code)))
+    check(f"[{name}] Alternation narrowed to its lines", candidates[r"time\.sleep|requests\.(get|post)\("] == [1])
+    check(f"[{name}] Case-insensitive literal narrowed to its lines", candidates[r"(?i)secret_key\s*="] == [2])
+    check(f"[{name}] Patterns without a literal run on every line",
+          candidates[r"\d{3,}"] is None and candidates[r"[a-z]+\(\)"] is None and candidates[r"ab|xyz"] is None)
+
+    # 3. Non-ASCII sources disable case-insensitive gating (the Kelvin sign matches k under re.I)
+    code = "x = 1\nsecret_\u212aey = 2\n"
+    candidates = dict(zip(PATTERNS, compile_prefilter(PATTERNS).candidate_lines(code)))
+    check(f"[{name}] Non-ASCII case folding not missed",
+          missed_lines(PATTERNS, code) == [] and candidates[r"(?i)secret_key\s*="] is None)
+
+def test_prefilter():
+    print("Testing the literal prefilter against the full regexes...")
+    check("Alternation requires one of its branches",
+          required_literals(r"time\.sleep|requests\.(get|post)\(") == ({"time.sleep", "requests."}, False))
+    check("Case-insensitive literals are lowercased", required_literals(r"(?i)Secret_Key") == ({"secret_key"}, True))
+    check("No literal required", required_literals(r"[a-z]+\(\)") is None and required_literals(r"(foo)?x") is None)
+
+    saved = prefilter.ahocorasick
+    try:
+        if saved is not None:
+            check_backend("Aho-Corasick")
+        else:
+            print("SKIP: pyahocorasick is not installed; Aho-Corasick backend not tested")
+        prefilter.ahocorasick = None
+        check_backend("trie regex")
+    finally:
+        prefilter.ahocorasick = saved
+        prefilter._prefilters.clear()
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_prefilter()
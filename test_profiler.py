@@ -0,0 +1,70 @@
+import sqlite3
+import threading
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def login(email, password="password123"):
+    try:
+        requests.post(f"{BASE_URL}/auth/register", json={"email": email, "password": password, "name": "Test"})
+    except:
+        pass
+    token = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_profiler():
+    print("Testing the admin sampling profiler...")
+
+    # 1. Regular users are refused
+    headers = login("test_profiler_user@example.com")
+    resp = requests.post(f"{BASE_URL}/admin/profile?seconds=0.1", headers=headers)
+    if resp.status_code == 403:
+        print("PASS: Non-admin refused.")
+    else:
+        print(f"FAIL: Expected 403 for a non-admin, got {resp.status_code}")
+
+    # 2. Promote a user to ADMIN in the server's local database (run from the repo root)
+    admin_email = "test_profiler_admin@example.com"
+    admin_headers = login(admin_email)
+    with sqlite3.connect("sql_app.db") as conn:
+        conn.execute("UPDATE users SET role = 'ADMIN' WHERE email = ?", (admin_email,))
+
+    # 3. Profile the next reviews; stacks are annotated with stage and rule
+    code = "api_key = 'abcdefghijklmnopqrstuvwxyz123456'\n" + "def f(x):\n    return [i * x for i in range(10)]\n" * 3000
+    result = {}
+
+    def profile():
+        result["resp"] = requests.post(
+            f"{BASE_URL}/admin/profile?requests=3&seconds=20&interval_ms=1", headers=admin_headers
+        )
+
+    thread = threading.Thread(target=profile)
+    thread.start()
+    while thread.is_alive():
+        requests.post(f"{BASE_URL}/review", json={"code": code, "policies": ["no_secrets", "nested_loops"]}, headers=headers)
+        thread.join(0.05)
+
+    resp = result["resp"]
+    if resp.status_code != 200:
+        print(f"FAIL: Profile request failed with {resp.status_code}: {resp.text}")
+        return
+    stacks = resp.text.splitlines()
+    print(f"Profiled {resp.headers['X-Profile-Requests']} requests, {resp.headers['X-Profile-Samples']} samples")
+    if stacks and any(s.startswith("[stage:") for s in stacks):
+        print("PASS: Folded stacks annotated with pipeline stages.")
+    else:
+        print(f"FAIL: Expected [stage:...] roots, got {stacks[:3]}")
+
+    # 4. Speedscope output for a fixed duration
+    resp = requests.post(f"{BASE_URL}/admin/profile?seconds=0.5&format=speedscope", headers=admin_headers)
+    profile = resp.json()
+    if resp.status_code == 200 and profile["profiles"][0]["type"] == "sampled":
+        print("PASS: Speedscope profile returned.")
+    else:
+        print(f"FAIL: Expected a speedscope profile, got {resp.status_code}")
+
+if __name__ == "__main__":
+    try:
+        test_profiler()
+    except requests.exceptions.ConnectionError:
+        print("Server is not running.")
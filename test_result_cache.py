@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from backend.core import result_cache
+from backend.core.analysis_context import AnalysisContext
+from backend.core.analyzer import StaticAnalyzer
+from backend.core.result_cache import EVICTION_CHECK_INTERVAL, ResultCache, policy_fingerprint
+
+# Runs in-process (no server needed)
+
+POLICIES = [
+    {"id": "no_eval", "type": "regex", "severity": "HIGH", "description": "No eval", "pattern": "\\beval\\("},
+    {"id": "no_print", "type": "regex", "severity": "LOW", "description": "No print", "pattern": "print\\("},
+]
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def keys(cache):
+    return {row[0] for row in cache._conn().execute("SELECT key FROM results")}
+
+def test_result_cache():
+    print("Testing the persistent analysis result cache...")
+    directory = tempfile.mkdtemp()
+    try:
+        cache = ResultCache(os.path.join(directory, "cache.db"))
+
+        # 1. Records round-trip, small (marshal) and large (zlib-compressed) alike
+        small = [("no_eval", 3, "No eval detected")]
+        large = [("no_print", i, f"No print detected {i}") for i in range(500)]
+        cache.put("small", small)
+        cache.put("large", large)
+        check("Small record list round-trips", cache.get("small") == small)
+        check("Large record list round-trips compressed", cache.get("large") == large
+              and cache._conn().execute("SELECT value FROM results WHERE key = 'large'").fetchone()[0][:1] == b"z")
+        check("Unknown key misses", cache.get("missing") is None)
+        cache._conn().execute("UPDATE results SET value = ? WHERE key = 'small'", (b"zgarbage",))
+        check("Damaged entry reads as a miss", cache.get("small") is None)
+
+        # 2. Eviction drops the least recently used entries first, and a read counts as a use
+        cache._conn().execute("DELETE FROM results")
+        for i, name in enumerate(["a", "b", "c", "d"]):
+            cache.put(name, small)
+            cache._conn().execute("UPDATE results SET last_used = ? WHERE key = ?", (1000 + i, name))
+        cache.get("a")  # older than TOUCH_INTERVAL, so this refreshes its last_used
+        entry_size = cache._conn().execute("SELECT size FROM results WHERE key = 'a'").fetchone()[0]
+        # Eviction trims to 90% of max_bytes: room for three of the four entries
+        cache.max_bytes = entry_size * 3 + entry_size // 2
+        cache.evict()
+        check("Least recently used entries evicted, recently read one kept", keys(cache) == {"a", "c", "d"}, str(keys(cache)))
+
+        # 3. Writes keep the cache under max_bytes without explicit evict() calls
+        i = 0
+        while i < EVICTION_CHECK_INTERVAL or cache._writes % EVICTION_CHECK_INTERVAL:
+            cache.put(f"bulk-{i}", small)
+            i += 1
+        total = cache._conn().execute("SELECT SUM(size) FROM results").fetchone()[0]
+        check("Periodic eviction brings the size back under max_bytes", total <= cache.max_bytes and "bulk-0" not in keys(cache),
+              f"{total} > {cache.max_bytes}")
+
+        # 4. Through the analyzer: a hit for the same source and policies, a miss when a policy changes
+        cache.max_bytes = result_cache.ANALYSIS_CACHE_MAX_BYTES
+        analyzer = StaticAnalyzer(cache=cache)
+        code = "x = eval(y)\nprint(x)\n"
+        first = analyzer.analyze_records(code, POLICIES)
+        key = cache.key(AnalysisContext(code).content_hash, POLICIES)
+        check("Analysis results stored under the source and policy key", cache.get(key) == first and len(first) == 2)
+        cache.put(key, [("no_eval", 99, "planted")])
+        check("Same source and policies served from the cache", analyzer.analyze_records(code, POLICIES) == [("no_eval", 99, "planted")])
+
+        changed = [dict(POLICIES[0], pattern="\\bexec\\("), POLICIES[1]]
+        check("Changed policy definition changes the fingerprint", policy_fingerprint(changed) != policy_fingerprint(POLICIES))
+        records = analyzer.analyze_records(code, changed)
+        check("Changed policy misses the cache", records == [("no_print", 2, "No print detected")], str(records))
+        check("Policy order does not change the key", cache.key("h", POLICIES) == cache.key("h", POLICIES[::-1]))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_result_cache()
@@ -0,0 +1,80 @@
+import time
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def login(email, password="password123"):
+    try:
+        requests.post(f"{BASE_URL}/auth/register", json={"email": email, "password": password, "name": "Test"})
+    except:
+        pass
+    token = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def wait_for(job_id, headers, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"{BASE_URL}/review/jobs/{job_id}", headers=headers).json()
+        if job["status"] in ("done", "failed", "cancelled"):
+            return job
+        time.sleep(0.2)
+    return job
+
+def test_review_jobs():
+    print("Testing background review jobs...")
+    headers = login("test_jobs_user@example.com")
+
+    # 1. A multi-file job is accepted and completes with per-file results
+    files = [
+        {"path": "slow.py", "code": "import time\n\ndef wait():\n    time.sleep(5)\n"},
+        {"path": "handler.py", "code": "from slow import wait\n\nasync def handle():\n    wait()\n"},
+        {"path": "clean.py", "code": "def add(a, b):\n    return a + b\n"},
+    ]
+    resp = requests.post(f"{BASE_URL}/review/jobs", json={"files": files, "policies": ["blocking_calls"]}, headers=headers)
+    if resp.status_code != 202:
+        print(f"FAIL: Expected 202 on submit, got {resp.status_code}: {resp.text}")
+        return
+    job_id = resp.json()["id"]
+    print(f"Submitted job {job_id} ({resp.headers.get('Location')})")
+
+    job = wait_for(job_id, headers)
+    if job["status"] != "done":
+        print(f"FAIL: Job ended as {job['status']}: {job.get('error')}")
+        return
+    by_path = {f["path"]: f for f in job["result"]["files"]}
+    # The blocking call in slow.py is reported where the coroutine in handler.py reaches it
+    if ([v["line"] for v in by_path["handler.py"]["violations"]] == [4]
+            and not by_path["slow.py"]["violations"] and not by_path["clean.py"]["violations"]):
+        print(f"PASS: Job done, overall risk {job['result']['risk_score']} ({job['progress']['files_done']}/{job['progress']['files_total']} files).")
+    else:
+        print(f"FAIL: Unexpected results: {job['result']}")
+
+    # 2. Other users cannot see the job
+    other = login("test_jobs_other@example.com")
+    resp = requests.get(f"{BASE_URL}/review/jobs/{job_id}", headers=other)
+    if resp.status_code == 404:
+        print("PASS: Jobs are private to their owner.")
+    else:
+        print(f"FAIL: Expected 404 for another user, got {resp.status_code}")
+
+    # 3. A large job can be cancelled
+    code = "def f(x):\n    for i in range(x):\n        print(i)\n" * 20000
+    resp = requests.post(f"{BASE_URL}/review/jobs", json={"files": [{"path": f"m{i}.py", "code": code + f"# {i}\n"} for i in range(50)],
+                                                         "policies": ["nested_loops"], "priority": -5}, headers=headers)
+    big_id = resp.json()["id"]
+    resp = requests.delete(f"{BASE_URL}/review/jobs/{big_id}", headers=headers)
+    job = wait_for(big_id, headers)
+    if resp.status_code == 200 and job["status"] == "cancelled":
+        print(f"PASS: Cancelled after {job['progress']['files_done']} of {job['progress']['files_total']} files.")
+    else:
+        print(f"FAIL: Cancel returned {resp.status_code}, job is {job['status']}")
+
+    # 4. Malformed submissions are refused up front
+    resp = requests.post(f"{BASE_URL}/review/jobs", json={"policies": ["no_secrets"]}, headers=headers)
+    if resp.status_code == 422:
+        print("PASS: Submission without sources rejected.")
+    else:
+        print(f"FAIL: Expected 422, got {resp.status_code}")
+
+if __name__ == "__main__":
+    test_review_jobs()
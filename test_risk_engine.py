@@ -0,0 +1,68 @@
+import random
+from backend.core.analyzer import ViolationRecord
+from backend.core.risk_engine import RiskEngine
+
+# Runs in-process (no server needed)
+
+POLICIES = [
+    {"id": "no_secrets", "severity": "HIGH", "description": "No hardcoded secrets"},
+    {"id": "no_eval", "severity": "HIGH", "description": "No eval"},
+    {"id": "error_handling", "severity": "MEDIUM", "description": "No bare except"},
+    {"id": "no_print", "severity": "LOW", "description": "No print"},
+    {"id": "custom_rule", "severity": "CRITICAL", "description": "Severity outside the known set"},
+]
+
+failures = []
+
+def check(name, ok, detail=""):
+    print(f"{'PASS' if ok else 'FAIL'}: {name}{' - ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+
+def random_groups(rng, n_groups):
+    groups = []
+    for _ in range(n_groups):
+        group = []
+        for line in range(rng.randint(0, 9)):
+            status = "FALSE_POSITIVE" if rng.random() < 0.2 else "OPEN"
+            group.append(ViolationRecord(rng.choice(POLICIES), line + 1, "", status))
+        groups.append(group)
+    return groups
+
+def matches(engine, groups, policies=None):
+    return engine.score_groups(groups, policies) == [engine.calculate_score(g, policies) for g in groups]
+
+def test_risk_engine():
+    print("Testing batch risk scoring against per-group scoring...")
+    rng = random.Random(29)
+    engine = RiskEngine()
+
+    # 1. Default weights, false positives, unknown severities, empty groups and scores clamped at 0
+    groups = random_groups(rng, 200) + [[], [ViolationRecord(POLICIES[0], i, "") for i in range(8)]]
+    check("score_groups matches calculate_score per group", matches(engine, groups))
+    check("Heavily violated group clamped to 0", engine.score_groups(groups[-1:]) == [(0, "HIGH RISK")])
+
+    # 2. Level thresholds: 80 is LOW RISK, 50 is MEDIUM RISK, below that HIGH RISK
+    boundaries = [[ViolationRecord(POLICIES[0], 1, "")],  # 80
+                  [ViolationRecord(POLICIES[2], i, "") for i in range(5)],  # 50
+                  [ViolationRecord(POLICIES[3], i, "") for i in range(11)]]  # 45
+    check("Level boundaries agree", matches(engine, boundaries)
+          and [l for _, l in engine.score_groups(boundaries)] == ["LOW RISK", "MEDIUM RISK", "HIGH RISK"])
+
+    # 3. risk_weight overrides the severity weight for that rule only, including 0
+    overridden = [dict(p) for p in POLICIES]
+    overridden[1]["risk_weight"] = 0
+    overridden[3]["risk_weight"] = 35
+    check("risk_weight overrides agree", matches(engine, groups, overridden))
+    single = [[ViolationRecord(POLICIES[1], 1, ""), ViolationRecord(POLICIES[3], 2, "")]]
+    check("risk_weight replaces the severity deduction", engine.score_groups(single, overridden) == [(65, "MEDIUM RISK")],
+          str(engine.score_groups(single, overridden)))
+
+    # 4. Custom engine weights flow through both paths
+    custom = RiskEngine({"high": 30, "low": 1})
+    check("Custom severity weights agree", matches(custom, groups) and matches(custom, groups, overridden))
+
+    assert not failures, failures
+
+if __name__ == "__main__":
+    test_risk_engine()
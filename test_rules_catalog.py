@@ -0,0 +1,57 @@
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def test_rules_catalog():
+    print("Testing cacheable rule catalog...")
+
+    # 1. First fetch returns the catalog with validators
+    resp = requests.get(f"{BASE_URL}/rules")
+    etag = resp.headers.get("ETag")
+    data = resp.json()
+    print(f"Policy version: {data['version']} ({len(data['rules'])} rules)")
+    print(f"Cache-Control: {resp.headers.get('Cache-Control')}")
+
+    if resp.status_code != 200 or not etag:
+        print("FAIL: Catalog response is missing an ETag.")
+        return
+
+    # 2. Revalidation with the same ETag must not re-download the body
+    resp = requests.get(f"{BASE_URL}/rules", headers={"If-None-Match": etag})
+    if resp.status_code == 304 and not resp.content:
+        print("PASS: Catalog revalidated with 304 Not Modified.")
+    else:
+        print(f"FAIL: Expected 304, got {resp.status_code}")
+
+    # 3. Remediation guidance is served from the same snapshot
+    email = "test_xai@example.com"
+    password = "password123"
+    try:
+        requests.post(f"{BASE_URL}/auth/register", json={"email": email, "password": password, "name": "Test"})
+    except:
+        pass
+    token = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    payload = {"violations": [{"rule_id": "no_secrets"}, {"rule_id": "no_secrets"}]}
+    resp = requests.post(f"{BASE_URL}/remediation", json=payload, headers=headers)
+    suggestions = resp.json()
+    rule = next(r for r in data["rules"] if r["id"] == "no_secrets")
+
+    if len(suggestions) == 1 and suggestions[0]["suggestion"] == rule["fix_recommendation"]:
+        print("PASS: Remediation derived from rules.json.")
+    else:
+        print(f"FAIL: Unexpected remediation payload: {suggestions}")
+
+    resp = requests.post(f"{BASE_URL}/remediation", json=payload,
+                         headers={**headers, "If-None-Match": resp.headers.get("ETag")})
+    if resp.status_code == 304:
+        print("PASS: Remediation revalidated with 304 Not Modified.")
+    else:
+        print(f"FAIL: Expected 304, got {resp.status_code}")
+
+if __name__ == "__main__":
+    try:
+        test_rules_catalog()
+    except requests.exceptions.ConnectionError:
+        print("Server is not running.")
@@ -0,0 +1,106 @@
+import gzip
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+SOURCE = '''import requests
+
+API_KEY = "abcdefghijklmnopqrstuvwxyz123456"
+
+def dedupe(items):
+    seen = []
+    for x in items:
+        if x not in seen:
+            seen.append(x)
+    return seen
+
+def load():
+    try:
+        return requests.get("http://example.com")
+    except:
+        pass
+'''
+
+POLICIES = ["no_secrets", "nested_loops", "error_handling"]
+
+def login(email, password="password123"):
+    try:
+        requests.post(f"{BASE_URL}/auth/register", json={"email": email, "password": password, "name": "Test"})
+    except:
+        pass
+    token = requests.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def found(resp):
+    return sorted((v["rule_id"], v["line"]) for v in resp.json()["violations"])
+
+def test_uploads():
+    print("Testing raw, compressed and multipart review uploads...")
+    headers = login("test_uploads@example.com")
+    expected = found(requests.post(f"{BASE_URL}/review", json={"code": SOURCE, "policies": POLICIES}, headers=headers))
+    query = {"policies": ",".join(POLICIES)}
+
+    # 1. Raw source body
+    resp = requests.post(f"{BASE_URL}/review/upload", params=query, data=SOURCE.encode(),
+                         headers={**headers, "Content-Type": "text/x-python"})
+    if resp.status_code == 200 and found(resp) == expected and expected:
+        print(f"PASS: Raw upload matches the JSON review ({len(expected)} violations).")
+    else:
+        print(f"FAIL: Raw upload returned {resp.status_code}: {resp.text[:200]}")
+
+    # 2. Gzip-compressed raw body, sent in chunks
+    body = gzip.compress(SOURCE.encode())
+    chunks = (body[i:i + 50] for i in range(0, len(body), 50))
+    resp = requests.post(f"{BASE_URL}/review/upload", params=query, data=chunks,
+                         headers={**headers, "Content-Type": "text/x-python", "Content-Encoding": "gzip"})
+    if resp.status_code == 200 and found(resp) == expected:
+        print("PASS: Chunked gzip upload matches the JSON review.")
+    else:
+        print(f"FAIL: Gzip upload returned {resp.status_code}: {resp.text[:200]}")
+
+    # 3. Multipart with a gzip file part and policies as form fields
+    resp = requests.post(f"{BASE_URL}/review/upload", headers=headers,
+                         files=[("policies", (None, p)) for p in POLICIES] +
+                               [("code", ("service.py", gzip.compress(SOURCE.encode()), "application/gzip"))])
+    if resp.status_code == 200 and found(resp) == expected and resp.json()["audit"]["file"] == "service.py":
+        print("PASS: Multipart upload matches the JSON review and keeps the file name.")
+    else:
+        print(f"FAIL: Multipart upload returned {resp.status_code}: {resp.text[:200]}")
+
+    # 4. Multipart diff review
+    original = SOURCE.replace('API_KEY = "abcdefghijklmnopqrstuvwxyz123456"', 'API_KEY = None')
+    expected_diff = requests.post(f"{BASE_URL}/review/diff", headers=headers, json={
+        "original_code": original, "modified_code": SOURCE, "policies": POLICIES}).json()
+    resp = requests.post(f"{BASE_URL}/review/diff/upload", params=query, headers=headers,
+                         files={"original_code": ("a.py", original), "modified_code": ("b.py", SOURCE)})
+    if resp.status_code == 200 and found(resp) == sorted((v["rule_id"], v["line"]) for v in expected_diff["violations"]) \
+            and resp.json()["risk_delta"] == expected_diff["risk_delta"]:
+        print("PASS: Multipart diff upload matches the JSON diff review.")
+    else:
+        print(f"FAIL: Diff upload returned {resp.status_code}: {resp.text[:200]}")
+
+    # 5. Unreadable uploads are rejected with the right status
+    cases = [
+        ("unknown encoding", 415, {"Content-Type": "text/x-python", "Content-Encoding": "br-x"}, b"x = 1\n"),
+        ("corrupt gzip", 400, {"Content-Type": "text/x-python", "Content-Encoding": "gzip"}, b"not gzip"),
+        ("gzip bomb", 413, {"Content-Type": "text/x-python", "Content-Encoding": "gzip"}, gzip.compress(b"\n" * 50_000_000)),
+        ("unknown content type", 415, {"Content-Type": "image/png"}, b"x"),
+    ]
+    for name, status, extra, body in cases:
+        resp = requests.post(f"{BASE_URL}/review/upload", params=query, data=body, headers={**headers, **extra})
+        if resp.status_code == status:
+            print(f"PASS: {name} rejected with {status} ({resp.json()['detail']}).")
+        else:
+            print(f"FAIL: Expected {status} for {name}, got {resp.status_code}")
+
+    resp = requests.post(f"{BASE_URL}/review/diff/upload", headers=headers, files={"modified_code": ("b.py", SOURCE)})
+    if resp.status_code == 422:
+        print("PASS: Diff upload without the original rejected with 422.")
+    else:
+        print(f"FAIL: Expected 422 for a missing part, got {resp.status_code}")
+
+if __name__ == "__main__":
+    try:
+        test_uploads()
+    except requests.exceptions.ConnectionError:
+        print("Server is not running.")
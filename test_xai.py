@@ -70,6 +70,24 @@ def main():
     else:
         print("\nFAIL: XAI fields are missing.")
 
+    # 4. With ai_review, the function around the finding is sent to the AI model
+    # (the deterministic engine answers when no AI_MODEL_URL is configured)
+    if data.get("ai_insights"):
+        print(f"FAIL: AI insights returned without ai_review: {data['ai_insights']}")
+    payload = {
+        "code": code.replace('    print("Hello")', "    return eval(api_key)"),
+        "policies": ["no_secrets"],
+        "ai_review": True
+    }
+    response = requests.post(f"{BASE_URL}/review", json=payload, headers=headers)
+    insights = response.json().get("ai_insights") if response.status_code == 200 else None
+    print(f"AI insights: {insights}")
+    if insights == [{"start_line": 2, "end_line": 4, "flagged_lines": [3],
+                     "finding": "Critical security risk: eval() detected."}]:
+        print("SUCCESS: AI review covered the enclosing function.")
+    else:
+        print(f"FAIL: Unexpected AI review ({response.status_code}): {insights}")
+
 if __name__ == "__main__":
     try:
         test_xai()